@@ -0,0 +1,570 @@
+"""
+Almacenamiento en SQLite para el Sistema de Inventario y Ventas.
+Se activa con la variable de entorno STOCK_ALMACEN=sqlite (ver main.py).
+Solo usa la biblioteca estándar (sqlite3), con la base en modo WAL.
+Los montos (precios, totales, subtotales) se guardan en centavos enteros; hacia
+main.py entran y salen en pesos, como en los archivos JSON.
+"""
+
+import datetime
+import json
+import sqlite3
+
+import dinero
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+CREATE TABLE IF NOT EXISTS productos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    nombre_clave TEXT NOT NULL,
+    precio INTEGER NOT NULL,  -- centavos
+    stock INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos(nombre_clave);
+CREATE INDEX IF NOT EXISTS idx_productos_stock ON productos(stock);
+CREATE TABLE IF NOT EXISTS codigos (
+    codigo TEXT PRIMARY KEY,
+    producto_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_codigos_producto ON codigos(producto_id);
+CREATE TABLE IF NOT EXISTS ventas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha TEXT NOT NULL,
+    total INTEGER NOT NULL,   -- centavos
+    cliente TEXT,
+    proxima_visita TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas(fecha);
+CREATE TABLE IF NOT EXISTS items_venta (
+    venta_id INTEGER NOT NULL REFERENCES ventas(id),
+    nombre TEXT NOT NULL,
+    cantidad INTEGER NOT NULL,
+    subtotal INTEGER NOT NULL -- centavos
+);
+CREATE INDEX IF NOT EXISTS idx_items_venta ON items_venta(venta_id);
+CREATE INDEX IF NOT EXISTS idx_items_nombre ON items_venta(nombre);
+CREATE TABLE IF NOT EXISTS usuarios (
+    nombre TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    rol TEXT NOT NULL,
+    fallos INTEGER NOT NULL DEFAULT 0,
+    bloqueado_hasta TEXT
+);
+CREATE TABLE IF NOT EXISTS clientes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    proxima_visita TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_clientes_visita ON clientes(proxima_visita);
+CREATE TABLE IF NOT EXISTS reservas (
+    terminal TEXT NOT NULL,
+    producto_id INTEGER NOT NULL,
+    cantidad INTEGER NOT NULL,
+    momento TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reservas_terminal ON reservas(terminal);
+CREATE TABLE IF NOT EXISTS sesiones_caja (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    caja TEXT NOT NULL,
+    usuario TEXT NOT NULL,
+    apertura TEXT NOT NULL,
+    cierre TEXT,
+    monto_inicial INTEGER NOT NULL,
+    ventas INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    contado INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_sesiones_apertura ON sesiones_caja(apertura);
+CREATE INDEX IF NOT EXISTS idx_sesiones_caja ON sesiones_caja(caja, cierre);
+CREATE TABLE IF NOT EXISTS eventos_inventario (
+    n INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_eventos_fecha ON eventos_inventario(fecha);
+CREATE TABLE IF NOT EXISTS instantaneas_inventario (
+    n INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    estado TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_instantaneas_fecha ON instantaneas_inventario(fecha);
+"""
+
+def conectar(ruta):
+    """Abre (o crea) la base en modo WAL y asegura el esquema."""
+    con = sqlite3.connect(ruta, timeout=10, check_same_thread=False)
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    _montos_a_centavos(con)
+    con.executescript(ESQUEMA)
+    _agregar_columnas(con)
+    return con
+
+def _montos_a_centavos(con):
+    """Pasa a centavos enteros los montos de una base de una versión anterior (guardados como REAL en pesos).
+
+    Cada tabla se copia a una nueva con las columnas INTEGER; los índices los vuelve a crear ESQUEMA.
+    El total de una venta que no cuadra con sus subtotales por menos de un centavo por ítem (restos
+    de sumar pesos en float) se toma de la suma de los subtotales.
+    """
+    tablas = [t for t in ("productos", "ventas", "items_venta")
+              if any(f["type"] == "REAL" for f in con.execute(f"PRAGMA table_info({t})"))]
+    if not tablas:
+        return
+    con.create_function("centavos", 1, dinero.centavos, deterministic=True)
+    with con:
+        con.execute("BEGIN IMMEDIATE")
+        for tabla in tablas:
+            columnas = [(f["name"], f["type"]) for f in con.execute(f"PRAGMA table_info({tabla})")]
+            definicion = con.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,)).fetchone()[0]
+            secuencia = con.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabla,)).fetchone() if tabla == "ventas" else None
+            con.execute(definicion.replace(f"CREATE TABLE {tabla}", f"CREATE TABLE {tabla}_nueva", 1).replace(" REAL ", " INTEGER "))
+            valores = ", ".join(f"centavos({nombre})" if tipo == "REAL" else nombre for nombre, tipo in columnas)
+            con.execute(f"INSERT INTO {tabla}_nueva ({', '.join(n for n, _ in columnas)}) SELECT {valores} FROM {tabla}")
+            con.execute(f"DROP TABLE {tabla}")
+            con.execute(f"ALTER TABLE {tabla}_nueva RENAME TO {tabla}")
+            if secuencia is not None:
+                con.execute("UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = ?", (secuencia[0], tabla))
+        cambios = [(suma, venta) for venta, total, suma, items in con.execute(
+                       "SELECT v.id, v.total, sum(i.subtotal), count(*) FROM ventas v "
+                       "JOIN items_venta i ON i.venta_id = v.id GROUP BY v.id")
+                   if total != suma and abs(total - suma) <= items]
+        con.executemany("UPDATE ventas SET total = ? WHERE id = ?", cambios)
+        _ventas_reescritas(con)
+
+def _agregar_columnas(con):
+    """Agrega a una base de una versión anterior las columnas que le faltan."""
+    columnas = {f["name"] for f in con.execute("PRAGMA table_info(usuarios)")}
+    with con:
+        if "fallos" not in columnas:
+            con.execute("ALTER TABLE usuarios ADD COLUMN fallos INTEGER NOT NULL DEFAULT 0")
+        if "bloqueado_hasta" not in columnas:
+            con.execute("ALTER TABLE usuarios ADD COLUMN bloqueado_hasta TEXT")
+
+def version_datos(con):
+    """Cambia cada vez que otra conexión (otra caja) confirma cambios en la base."""
+    return con.execute("PRAGMA data_version").fetchone()[0]
+
+def es_nueva(con):
+    """True si la base todavía no recibió la importación inicial."""
+    return leer_meta(con, "importado") is None
+
+def leer_meta(con, clave, defecto=None):
+    fila = con.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+    return json.loads(fila["valor"]) if fila else defecto
+
+def guardar_meta(con, clave, valor):
+    with con:
+        con.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)",
+                    (clave, json.dumps(valor, ensure_ascii=False)))
+
+# ---------------- inventario ---------------- #
+
+def cargar_inventario(con):
+    codigos = {}
+    for fila in con.execute("SELECT codigo, producto_id FROM codigos ORDER BY rowid"):
+        codigos.setdefault(fila["producto_id"], []).append(fila["codigo"])
+    filas = con.execute("SELECT id, nombre, precio, stock FROM productos ORDER BY id")
+    inventario = [dict(f, precio=dinero.pesos(f["precio"]), codigos=codigos.get(f["id"], [])) for f in filas]
+    return inventario, leer_meta(con, "siguiente_id", 1)
+
+def _guardar_codigos(con, pid, codigos):
+    con.execute("DELETE FROM codigos WHERE producto_id = ?", (pid,))
+    con.executemany("INSERT INTO codigos (codigo, producto_id) VALUES (?, ?)", [(c, pid) for c in codigos])
+
+def guardar_inventario(con, inventario, siguiente_id):
+    """Reemplaza el inventario completo en una sola transacción."""
+    with con:
+        con.execute("DELETE FROM productos")
+        con.execute("DELETE FROM codigos")
+        con.executemany(
+            "INSERT INTO productos (id, nombre, nombre_clave, precio, stock) VALUES (?, ?, ?, ?, ?)",
+            [(p["id"], p["nombre"], p["nombre"].casefold(), dinero.centavos(p["precio"]), p["stock"]) for p in inventario])
+        con.executemany("INSERT INTO codigos (codigo, producto_id) VALUES (?, ?)",
+                        [(c, p["id"]) for p in inventario for c in p.get("codigos", [])])
+        con.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('siguiente_id', ?)", (json.dumps(siguiente_id),))
+
+def agregar_producto(con, producto):
+    """Inserta un producto con el siguiente ID libre (lo asigna en `producto`); devuelve el próximo ID."""
+    with con:
+        con.execute("BEGIN IMMEDIATE")
+        maximo = con.execute("SELECT max(id) FROM productos").fetchone()[0] or 0
+        producto["id"] = max(leer_meta(con, "siguiente_id", 1), maximo + 1)
+        con.execute(
+            "INSERT INTO productos (id, nombre, nombre_clave, precio, stock) VALUES (?, ?, ?, ?, ?)",
+            (producto["id"], producto["nombre"], producto["nombre"].casefold(), dinero.centavos(producto["precio"]),
+             producto["stock"]))
+        _guardar_codigos(con, producto["id"], producto.get("codigos", []))
+        con.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('siguiente_id', ?)", (json.dumps(producto["id"] + 1),))
+    return producto["id"] + 1
+
+def restaurar_producto(con, producto):
+    """Vuelve a insertar un producto con su ID (al deshacer una baja)."""
+    with con:
+        con.execute(
+            "INSERT INTO productos (id, nombre, nombre_clave, precio, stock) VALUES (?, ?, ?, ?, ?)",
+            (producto["id"], producto["nombre"], producto["nombre"].casefold(), dinero.centavos(producto["precio"]),
+             producto["stock"]))
+        _guardar_codigos(con, producto["id"], producto.get("codigos", []))
+
+COLUMNAS_PRODUCTO = ("nombre", "precio", "stock")
+
+def actualizar_producto(con, pid, campos):
+    """Actualiza solo las columnas indicadas de una fila, sin pisar el resto (p. ej. el stock de otra caja)."""
+    with con:
+        _actualizar_producto(con, pid, campos)
+
+def actualizar_productos(con, cambios):
+    """Aplica varios (id, campos) en una sola transacción."""
+    with con:
+        for pid, campos in cambios:
+            _actualizar_producto(con, pid, campos)
+
+def aplicar_lote(con, cambios):
+    """Suma deltas de stock y fija precios, [(id, delta, precio)], en una sola transacción.
+
+    El stock se suma en la base (no se pisa lo que vendió otra caja); si alguno quedaría
+    negativo se deshace todo. Devuelve {id: stock resultante}.
+    """
+    stocks = {}
+    with con:
+        con.execute("BEGIN IMMEDIATE")
+        for pid, delta, precio in cambios:
+            con.execute("UPDATE productos SET stock = stock + ?, precio = ? WHERE id = ?", (delta, dinero.centavos(precio), pid))
+            stocks[pid] = con.execute("SELECT stock FROM productos WHERE id = ?", (pid,)).fetchone()["stock"]
+        negativos = [str(pid) for pid, stock in stocks.items() if stock < 0]
+        if negativos:
+            raise ValueError(f"El stock quedaría negativo (ID: {', '.join(negativos)}).")
+    return stocks
+
+def _actualizar_producto(con, pid, campos):
+    if "codigos" in campos:
+        _guardar_codigos(con, pid, campos["codigos"])
+    columnas = [c for c in campos if c in COLUMNAS_PRODUCTO]
+    valores = [dinero.centavos(campos[c]) if c == "precio" else campos[c] for c in columnas]
+    if "nombre" in columnas:
+        columnas.append("nombre_clave")
+        valores.append(campos["nombre"].casefold())
+    if not columnas:
+        return
+    asignaciones = ", ".join(f"{c} = ?" for c in columnas)
+    con.execute(f"UPDATE productos SET {asignaciones} WHERE id = ?", (*valores, pid))
+
+def borrar_producto(con, pid):
+    with con:
+        con.execute("DELETE FROM productos WHERE id = ?", (pid,))
+        con.execute("DELETE FROM codigos WHERE producto_id = ?", (pid,))
+
+# ---------------- ventas ---------------- #
+
+def _insertar_venta(con, venta):
+    cur = con.execute(
+        "INSERT INTO ventas (fecha, total, cliente, proxima_visita) VALUES (?, ?, ?, ?)",
+        (venta["fecha"], dinero.centavos(venta["total"]), venta.get("cliente", ""), venta.get("proxima_visita", "")))
+    con.executemany(
+        "INSERT INTO items_venta (venta_id, nombre, cantidad, subtotal) VALUES (?, ?, ?, ?)",
+        [(cur.lastrowid, i["nombre"], i["cantidad"], dinero.centavos(i["subtotal"])) for i in venta["items"]])
+    return cur.lastrowid
+
+def registrar_venta(con, venta, terminal, sesion_id=None, centavos=0, evento=None, reloj=None):
+    """Guarda la venta, confirma las reservas de la caja, la suma a su sesión abierta y agrega
+    su `evento` de inventario (si se da) en una misma transacción; devuelve su id.
+    Con `reloj`, la fecha de la venta se toma ya con la base bloqueada (los ids siguen el orden de las fechas)."""
+    with con:
+        con.execute("BEGIN IMMEDIATE")
+        if reloj is not None:
+            venta["fecha"] = reloj()
+        venta_id = _insertar_venta(con, venta)
+        con.execute("DELETE FROM reservas WHERE terminal = ?", (terminal,))
+        if sesion_id is not None:
+            con.execute("UPDATE sesiones_caja SET ventas = ventas + 1, total = total + ? WHERE id = ?",
+                        (centavos, sesion_id))
+        if evento is not None:
+            _insertar_evento(con, evento)
+    return venta_id
+
+def _ventas_reescritas(con):
+    """Anota que cambiaron ventas ya guardadas (no solo se agregaron): invalida los acumulados guardados."""
+    fila = con.execute("SELECT valor FROM meta WHERE clave = 'version_ventas'").fetchone()
+    con.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('version_ventas', ?)",
+                (json.dumps(json.loads(fila["valor"]) + 1 if fila else 1),))
+
+def ultimo_id_venta(con):
+    return con.execute("SELECT coalesce(max(id), 0) FROM ventas").fetchone()[0]
+
+def guardar_ventas(con, ventas):
+    """Reemplaza todas las ventas (se usa al importar)."""
+    with con:
+        _ventas_reescritas(con)
+        con.execute("DELETE FROM items_venta")
+        con.execute("DELETE FROM ventas")
+        for venta in ventas:
+            _insertar_venta(con, venta)
+
+def _armar_ventas(filas_ventas, filas_items, por_fecha=False):
+    """Une ventas e ítems (ambos ordenados por id de venta, o por fecha e id con `por_fecha`) en una sola pasada."""
+    if por_fecha:
+        clave_venta, clave_item = (lambda f: (f["fecha"], f["id"])), (lambda f: (f["fecha_venta"], f["venta_id"]))
+    else:
+        clave_venta, clave_item = (lambda f: f["id"]), (lambda f: f["venta_id"])
+    items = iter(filas_items)
+    item = next(items, None)
+    for fila in filas_ventas:
+        venta = {"fecha": fila["fecha"], "items": [], "total": dinero.pesos(fila["total"]),
+                 "cliente": fila["cliente"] or "", "proxima_visita": fila["proxima_visita"] or ""}
+        while item is not None and clave_item(item) < clave_venta(fila):
+            item = next(items, None)
+        while item is not None and item["venta_id"] == fila["id"]:
+            venta["items"].append({"nombre": item["nombre"], "cantidad": item["cantidad"],
+                                   "subtotal": dinero.pesos(item["subtotal"])})
+            item = next(items, None)
+        yield venta
+
+def cargar_ventas(con, desde_id=0, hasta_id=None):
+    """Devuelve, como flujo y en orden de registro, las ventas con desde_id < id <= hasta_id."""
+    if hasta_id is None:
+        hasta_id = ultimo_id_venta(con)
+    filas_ventas = con.execute(
+        "SELECT * FROM ventas WHERE id > ? AND id <= ? ORDER BY id", (desde_id, hasta_id))
+    filas_items = con.cursor().execute(
+        "SELECT * FROM items_venta WHERE venta_id > ? AND venta_id <= ? ORDER BY venta_id, rowid", (desde_id, hasta_id))
+    return _armar_ventas(filas_ventas, filas_items)
+
+def agregar_ventas(con, ventas):
+    """Agrega varias ventas (p. ej. importadas de un CSV) en una sola transacción."""
+    with con:
+        for venta in ventas:
+            _insertar_venta(con, venta)
+
+def iterar_ventas(con, fecha_inicio=None, fecha_fin=None):
+    """Flujo de ventas entre dos fechas 'YYYY-MM-DD' opcionales (inclusive), en orden cronológico como el diario
+    JSON (una venta importada después puede ser más vieja que otras con menor id); usa el índice por fecha."""
+    condiciones, parametros = [], []
+    if fecha_inicio:
+        condiciones.append("v.fecha >= ?")
+        parametros.append(fecha_inicio)
+    if fecha_fin:
+        condiciones.append("v.fecha < ?")
+        parametros.append((datetime.date.fromisoformat(fecha_fin) + datetime.timedelta(days=1)).isoformat())
+    donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    filas_ventas = con.execute(f"SELECT * FROM ventas v {donde} ORDER BY v.fecha, v.id", parametros)
+    filas_items = con.cursor().execute(
+        # CROSS JOIN: se recorre ventas por el índice de fechas y no hace falta ordenar todos los ítems
+        f"SELECT i.*, v.fecha AS fecha_venta FROM ventas v CROSS JOIN items_venta i ON i.venta_id = v.id {donde} "
+        "ORDER BY v.fecha, v.id, i.rowid", parametros)
+    return _armar_ventas(filas_ventas, filas_items, por_fecha=True)
+
+def nombres_vendidos(con):
+    """Los nombres distintos con que se vendieron productos (recorre el índice por nombre)."""
+    return [f[0] for f in con.execute("SELECT DISTINCT nombre FROM items_venta")]
+
+def ventas_con_productos(con, nombres):
+    """Flujo de ventas, en orden de registro, con solo sus ítems de esos nombres exactos."""
+    marcas = ", ".join("?" * len(nombres))
+    filas_items = con.execute(
+        f"SELECT * FROM items_venta WHERE nombre IN ({marcas}) ORDER BY venta_id, rowid", nombres).fetchall()
+    filas_ventas = con.execute(
+        f"SELECT * FROM ventas WHERE id IN (SELECT venta_id FROM items_venta WHERE nombre IN ({marcas})) ORDER BY id", nombres)
+    return _armar_ventas(filas_ventas, filas_items)
+
+def ventas_entre(con, fecha_inicio, fecha_fin):
+    """Ventas entre dos fechas 'YYYY-MM-DD' inclusive."""
+    return list(iterar_ventas(con, fecha_inicio, fecha_fin))
+
+def totales_desde(con, momento):
+    """(cantidad, total en centavos) de las ventas con fecha >= `momento`, por el índice de fechas."""
+    fila = con.execute("SELECT count(*), coalesce(sum(total), 0) FROM ventas WHERE fecha >= ?", (momento,)).fetchone()
+    return fila[0], fila[1]
+
+# ---------------- reservas de stock entre cajas ---------------- #
+
+def reservar(con, pid, cantidad, terminal, momento):
+    """Descuenta stock solo si alcanza y anota la reserva; devuelve el stock resultante o None."""
+    with con:
+        cur = con.execute("UPDATE productos SET stock = stock - ? WHERE id = ? AND stock >= ?",
+                          (cantidad, pid, cantidad))
+        if cur.rowcount == 0:
+            return None
+        con.execute("INSERT INTO reservas (terminal, producto_id, cantidad, momento) VALUES (?, ?, ?, ?)",
+                    (terminal, pid, cantidad, momento))
+        return con.execute("SELECT stock FROM productos WHERE id = ?", (pid,)).fetchone()["stock"]
+
+def liberar_reservas(con, terminal, vencen_antes_de):
+    """Devuelve al stock las reservas de `terminal` (todas si es None) y las anteriores a la fecha dada."""
+    if terminal is None:
+        condicion, parametros = "1", ()
+    else:
+        condicion, parametros = "terminal = ? OR momento < ?", (terminal, vencen_antes_de)
+    with con:
+        filas = con.execute(f"SELECT rowid, producto_id, cantidad FROM reservas WHERE {condicion}", parametros).fetchall()
+        con.executemany("UPDATE productos SET stock = stock + ? WHERE id = ?",
+                        [(f["cantidad"], f["producto_id"]) for f in filas])
+        con.executemany("DELETE FROM reservas WHERE rowid = ?", [(f["rowid"],) for f in filas])
+    return len(filas)
+
+def reservas_de(con, terminal):
+    """[(id, cantidad)] reservados por la caja, en el orden en que se reservaron."""
+    return [(f["producto_id"], f["cantidad"])
+            for f in con.execute("SELECT producto_id, cantidad FROM reservas WHERE terminal = ? ORDER BY rowid", (terminal,))]
+
+def reservado_por_producto(con):
+    """{id: unidades reservadas por todas las cajas}."""
+    return {f["producto_id"]: f["total"]
+            for f in con.execute("SELECT producto_id, sum(cantidad) AS total FROM reservas GROUP BY producto_id")}
+
+# ---------------- usuarios y clientes ---------------- #
+
+def cargar_usuarios(con):
+    return [dict(f) for f in con.execute("SELECT nombre, password, rol, fallos, bloqueado_hasta FROM usuarios ORDER BY rowid")]
+
+def _fila_usuario(u):
+    return (u["nombre"], u["password"], u["rol"], u.get("fallos", 0), u.get("bloqueado_hasta"))
+
+def guardar_usuarios(con, usuarios):
+    with con:
+        con.execute("DELETE FROM usuarios")
+        con.executemany("INSERT INTO usuarios (nombre, password, rol, fallos, bloqueado_hasta) VALUES (?, ?, ?, ?, ?)",
+                        [_fila_usuario(u) for u in usuarios])
+
+def guardar_usuario(con, usuario):
+    """Agrega o actualiza un solo usuario (sin pisar los cambios de otras cajas en los demás)."""
+    with con:
+        con.execute("INSERT INTO usuarios (nombre, password, rol, fallos, bloqueado_hasta) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(nombre) DO UPDATE SET password = excluded.password, rol = excluded.rol, "
+                    "fallos = excluded.fallos, bloqueado_hasta = excluded.bloqueado_hasta", _fila_usuario(usuario))
+
+def cargar_clientes(con):
+    return [dict(f) for f in con.execute("SELECT id, nombre, proxima_visita FROM clientes ORDER BY id")]
+
+def _clientes_cambiados(con):
+    """Anota que cambiaron los clientes: las demás cajas los releen al ver otra version_clientes()."""
+    fila = con.execute("SELECT valor FROM meta WHERE clave = 'version_clientes'").fetchone()
+    con.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('version_clientes', ?)",
+                (json.dumps(json.loads(fila["valor"]) + 1 if fila else 1),))
+
+def version_clientes(con):
+    """Cambia solo cuando alguna caja modifica los clientes (no con cada venta, como data_version)."""
+    return leer_meta(con, "version_clientes", 0)
+
+def guardar_clientes(con, clientes):
+    """Reemplaza todos los clientes conservando sus id (al importar o al unir repetidos)."""
+    with con:
+        _clientes_cambiados(con)
+        con.execute("DELETE FROM clientes")
+        con.executemany("INSERT INTO clientes (id, nombre, proxima_visita) VALUES (?, ?, ?)",
+                        [(c.get("id"), c["nombre"], c["proxima_visita"]) for c in clientes])
+
+def guardar_cliente(con, cliente):
+    """Agrega un cliente nuevo (sin id) o actualiza uno existente; devuelve su id."""
+    with con:
+        _clientes_cambiados(con)
+        if cliente.get("id") is None:
+            return con.execute("INSERT INTO clientes (nombre, proxima_visita) VALUES (?, ?)",
+                               (cliente["nombre"], cliente["proxima_visita"])).lastrowid
+        con.execute("UPDATE clientes SET nombre = ?, proxima_visita = ? WHERE id = ?",
+                    (cliente["nombre"], cliente["proxima_visita"], cliente["id"]))
+        return cliente["id"]
+
+# ---------------- sesiones de caja ---------------- #
+
+_CAMPOS_SESION = ("id", "caja", "usuario", "apertura", "cierre", "monto_inicial", "ventas", "total", "contado")
+
+def abrir_sesion(con, sesion):
+    """Guarda una sesión de caja nueva; devuelve su id."""
+    with con:
+        cur = con.execute(
+            "INSERT INTO sesiones_caja (caja, usuario, apertura, cierre, monto_inicial, ventas, total, contado) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [sesion[c] for c in _CAMPOS_SESION[1:]])
+    return cur.lastrowid
+
+def guardar_sesiones(con, sesiones):
+    """Agrega sesiones con su id (se usa al importar)."""
+    with con:
+        con.executemany(
+            f"INSERT OR REPLACE INTO sesiones_caja ({', '.join(_CAMPOS_SESION)}) VALUES ({', '.join('?' * len(_CAMPOS_SESION))})",
+            [[s[c] for c in _CAMPOS_SESION] for s in sesiones])
+
+def sesion_abierta(con, caja):
+    fila = con.execute("SELECT * FROM sesiones_caja WHERE caja = ? AND cierre IS NULL ORDER BY id DESC LIMIT 1",
+                       (caja,)).fetchone()
+    return dict(fila) if fila else None
+
+def cerrar_sesion(con, sesion):
+    with con:
+        con.execute("UPDATE sesiones_caja SET cierre = ?, contado = ? WHERE id = ?",
+                    (sesion["cierre"], sesion["contado"], sesion["id"]))
+
+def sesiones_cerradas(con, fecha_inicio=None, fecha_fin=None, caja=None):
+    """Sesiones cerradas abiertas entre dos fechas 'YYYY-MM-DD' opcionales (inclusive), usando el índice por apertura."""
+    condiciones, parametros = ["cierre IS NOT NULL"], []
+    if fecha_inicio:
+        condiciones.append("apertura >= ?")
+        parametros.append(fecha_inicio)
+    if fecha_fin:
+        condiciones.append("apertura < ?")
+        parametros.append((datetime.date.fromisoformat(fecha_fin) + datetime.timedelta(days=1)).isoformat())
+    if caja:
+        condiciones.append("caja = ?")
+        parametros.append(caja)
+    filas = con.execute(f"SELECT * FROM sesiones_caja WHERE {' AND '.join(condiciones)} ORDER BY apertura, id", parametros)
+    return [dict(f) for f in filas]
+
+def migrar_caja_anterior(con):
+    """Devuelve el último registro de la tabla `caja` de antes de las sesiones (y la borra), o None."""
+    if con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'caja'").fetchone() is None:
+        return None
+    fila = con.execute("SELECT fecha, monto_inicial FROM caja ORDER BY fecha DESC LIMIT 1").fetchone()
+    with con:
+        con.execute("DROP TABLE caja")
+    return dict(fila) if fila else None
+
+# ---------------- historial del inventario ---------------- #
+# Los eventos y las instantáneas de historial.py; el número de evento hace de posición.
+
+def agregar_evento(con, evento):
+    """Guarda el evento con el siguiente número (lo asigna en `evento`) y lo devuelve."""
+    with con:
+        con.execute("BEGIN IMMEDIATE")
+        return _insertar_evento(con, evento)
+
+def _insertar_evento(con, evento):
+    n = (con.execute("SELECT max(n) FROM eventos_inventario").fetchone()[0] or 0) + 1
+    con.execute("INSERT INTO eventos_inventario (n, fecha, datos) VALUES (?, ?, ?)",
+                (n, evento["fecha"], json.dumps({"n": n, **evento}, ensure_ascii=False, separators=(",", ":"))))
+    evento["n"] = n
+    return n
+
+def guardar_eventos(con, eventos):
+    """Agrega eventos que ya tienen número (se usa al importar)."""
+    with con:
+        con.executemany("INSERT OR REPLACE INTO eventos_inventario (n, fecha, datos) VALUES (?, ?, ?)",
+                        [(e["n"], e["fecha"], json.dumps(e, ensure_ascii=False, separators=(",", ":"))) for e in eventos])
+
+def eventos_desde(con, n, hasta=None):
+    """(evento, número) de los eventos posteriores al número `n`, hasta la fecha `hasta` si se da."""
+    if hasta is None:
+        filas = con.execute("SELECT n, datos FROM eventos_inventario WHERE n > ? ORDER BY n", (n,))
+    else:
+        filas = con.execute("SELECT n, datos FROM eventos_inventario WHERE n > ? AND fecha <= ? ORDER BY n", (n, hasta))
+    for fila in filas:
+        yield json.loads(fila["datos"]), fila["n"]
+
+def guardar_instantanea(con, estado):
+    """Guarda un estado de historial.a_json()."""
+    with con:
+        con.execute("INSERT OR REPLACE INTO instantaneas_inventario (n, fecha, estado) VALUES (?, ?, ?)",
+                    (estado["n"], estado["fecha"], json.dumps(estado, ensure_ascii=False, separators=(",", ":"))))
+
+def leer_instantanea(con, hasta=None):
+    """La última instantánea con fecha <= `hasta` (o la última), como la guardó guardar_instantanea(), o None."""
+    if hasta is None:
+        fila = con.execute("SELECT estado FROM instantaneas_inventario ORDER BY n DESC LIMIT 1").fetchone()
+    else:
+        fila = con.execute("SELECT estado FROM instantaneas_inventario WHERE fecha <= ? ORDER BY fecha DESC, n DESC LIMIT 1",
+                           (hasta,)).fetchone()
+    return json.loads(fila["estado"]) if fila else None
@@ -0,0 +1,256 @@
+"""
+Motor de análisis por columnas para reportes sobre años de ventas.
+
+Las ventas se guardan en columnas (arreglos de `array`, una fila por ítem vendido y
+otra serie con el total de cada venta) en lugar de diccionarios anidados: día como
+ordinal, código del producto, cantidad y subtotal. Si NumPy está instalado las
+agrupaciones, el ranking de productos, los percentiles y las medias móviles se
+calculan vectorizados sobre esas mismas columnas (sin copiarlas); si no, se usa el
+mismo cálculo en Python puro, en el mismo orden, así que los resultados coinciden.
+(Este módulo no depende de main.py: recibe las ventas ya cargadas.)
+
+Uso:  python analitica.py [--archivo registro_ventas.txt] [--periodo dia|semana|mes]
+                          [--desde YYYY-MM-DD] [--hasta YYYY-MM-DD] [--top 10]
+                          [--ventana 7] [--sin-numpy]
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import math
+import os
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+USAR_NUMPY = np is not None
+PERCENTILES = (50, 90, 99)
+
+# ---------------- columnas ---------------- #
+
+def nueva_tabla():
+    """Tabla vacía: columnas por ítem, columnas por venta y el diccionario de productos."""
+    return {
+        "dia": array("l"),           # ordinal del día de cada ítem
+        "producto": array("l"),      # código del producto (posición en "nombres")
+        "cantidad": array("q"),
+        "subtotal": array("d"),
+        "venta_dia": array("l"),     # ordinal del día de cada venta
+        "venta_total": array("d"),
+        "nombres": [],               # código -> nombre (el primero con que se vendió)
+        "codigos": {},               # nombre.casefold() -> código
+    }
+
+def agregar(tabla, ventas):
+    """Agrega ventas ({"fecha", "items", "total"}) al final de las columnas."""
+    ordinales = {}
+    codigos = tabla["codigos"]
+    for venta in ventas:
+        fecha = venta["fecha"][:10]
+        dia = ordinales.get(fecha)
+        if dia is None:
+            dia = ordinales[fecha] = datetime.date.fromisoformat(fecha).toordinal()
+        tabla["venta_dia"].append(dia)
+        tabla["venta_total"].append(venta["total"])
+        for item in venta["items"]:
+            clave = item["nombre"].casefold()
+            codigo = codigos.get(clave)
+            if codigo is None:
+                codigo = codigos[clave] = len(tabla["nombres"])
+                tabla["nombres"].append(item["nombre"])
+            tabla["dia"].append(dia)
+            tabla["producto"].append(codigo)
+            tabla["cantidad"].append(item["cantidad"])
+            tabla["subtotal"].append(item["subtotal"])
+    return tabla
+
+def cantidad_ventas(tabla):
+    return len(tabla["venta_dia"])
+
+def desde_diario(ruta):
+    """Arma la tabla leyendo un diario de ventas JSON Lines sin cargarlo entero en memoria."""
+    tabla = nueva_tabla()
+    with open(ruta, "r", encoding="utf-8") as f:
+        lote = []
+        for linea in f:
+            try:
+                lote.append(json.loads(linea))
+            except ValueError:
+                continue
+            if len(lote) >= 5000:
+                agregar(tabla, lote)
+                lote = []
+        agregar(tabla, lote)
+    return tabla
+
+def _columna(tabla, nombre):
+    """La columna como arreglo de NumPy (vista del mismo búfer) o tal cual sin NumPy."""
+    if USAR_NUMPY:
+        return np.frombuffer(tabla[nombre], dtype=tabla[nombre].typecode)
+    return tabla[nombre]
+
+def _ordinal(fecha):
+    if not fecha:
+        return None
+    try:
+        return datetime.date.fromisoformat(fecha).toordinal()
+    except (TypeError, ValueError):
+        raise ValueError("Formato de fecha incorrecto. Use YYYY-MM-DD.") from None
+
+def _seleccion(tabla, dias, columnas, desde, hasta):
+    """Las columnas pedidas, recortadas a los días entre `desde` y `hasta` (inclusive)."""
+    desde, hasta = _ordinal(desde), _ordinal(hasta)
+    dias = _columna(tabla, dias)
+    columnas = [_columna(tabla, c) for c in columnas]
+    if desde is None and hasta is None:
+        return [dias] + columnas
+    desde = desde if desde is not None else -math.inf
+    hasta = hasta if hasta is not None else math.inf
+    if USAR_NUMPY:
+        mascara = (dias >= desde) & (dias <= hasta)
+        return [dias[mascara]] + [c[mascara] for c in columnas]
+    elegidas = [i for i, d in enumerate(dias) if desde <= d <= hasta]
+    return [[dias[i] for i in elegidas]] + [[c[i] for i in elegidas] for c in columnas]
+
+# ---------------- agrupaciones ---------------- #
+
+def clave_periodo(ordinal, periodo):
+    """Clave de día ('YYYY-MM-DD'), semana ('YYYY-Wn') o mes ('YYYY-MM'), igual que los acumulados de main.py."""
+    dia = datetime.date.fromordinal(ordinal)
+    if periodo == "dia":
+        return dia.isoformat()
+    if periodo == "semana":
+        return f"{dia.year}-W{dia.isocalendar()[1]}"
+    if periodo == "mes":
+        return f"{dia.year}-{dia.month:02d}"
+    raise ValueError("Periodo no válido.")
+
+def _sumar_por_dia(dias, totales):
+    """(días distintos en orden, suma de cada uno)."""
+    if USAR_NUMPY:
+        unicos, inversa = np.unique(dias, return_inverse=True)
+        return unicos.tolist(), np.bincount(inversa, weights=totales, minlength=len(unicos)).tolist()
+    sumas = {}
+    for dia, total in zip(dias, totales):
+        sumas[dia] = sumas.get(dia, 0.0) + total
+    unicos = sorted(sumas)
+    return unicos, [sumas[d] for d in unicos]
+
+def por_periodo(tabla, periodo="dia", desde=None, hasta=None):
+    """Ingresos por día, semana o mes como [(clave, total)] ordenados por clave."""
+    if periodo not in ("dia", "semana", "mes"):
+        raise ValueError("Periodo no válido.")
+    dias, totales = _seleccion(tabla, "venta_dia", ["venta_total"], desde, hasta)
+    unicos, sumas = _sumar_por_dia(dias, totales)
+    if periodo == "dia":
+        return [(clave_periodo(d, "dia"), s) for d, s in zip(unicos, sumas)]
+    # Pocos miles de días a lo sumo: se reagrupan por semana o mes en orden cronológico
+    resultado = {}
+    for dia, suma in zip(unicos, sumas):
+        clave = clave_periodo(dia, periodo)
+        resultado[clave] = resultado.get(clave, 0.0) + suma
+    return sorted(resultado.items())
+
+def mas_vendidos(tabla, n=10, criterio="cantidad", desde=None, hasta=None):
+    """Los `n` productos con más unidades (o ingreso) como [{"nombre", "cantidad", "ingreso"}]."""
+    if criterio not in ("cantidad", "ingreso"):
+        raise ValueError("Criterio no válido (cantidad o ingreso).")
+    _, productos, cantidades, subtotales = _seleccion(tabla, "dia", ["producto", "cantidad", "subtotal"], desde, hasta)
+    largo = len(tabla["nombres"])
+    if USAR_NUMPY:
+        por_cantidad = np.bincount(productos, weights=cantidades, minlength=largo)
+        por_ingreso = np.bincount(productos, weights=subtotales, minlength=largo)
+        valores = por_cantidad if criterio == "cantidad" else por_ingreso
+        orden = np.argsort(-valores, kind="stable")[:n].tolist()
+        por_cantidad, por_ingreso = por_cantidad.tolist(), por_ingreso.tolist()
+    else:
+        por_cantidad = [0.0] * largo
+        por_ingreso = [0.0] * largo
+        for codigo, cantidad, subtotal in zip(productos, cantidades, subtotales):
+            por_cantidad[codigo] += cantidad
+            por_ingreso[codigo] += subtotal
+        valores = por_cantidad if criterio == "cantidad" else por_ingreso
+        orden = sorted(range(largo), key=lambda c: -valores[c])[:n]
+    return [{"nombre": tabla["nombres"][c], "cantidad": int(por_cantidad[c]), "ingreso": por_ingreso[c]}
+            for c in orden if por_cantidad[c] > 0]
+
+def percentiles(tabla, ps=PERCENTILES, desde=None, hasta=None):
+    """Percentiles del total por venta (interpolación lineal, como numpy.percentile): {p: valor}."""
+    _, totales = _seleccion(tabla, "venta_dia", ["venta_total"], desde, hasta)
+    if len(totales) == 0:
+        return {}
+    if USAR_NUMPY:
+        return dict(zip(ps, np.percentile(totales, ps).tolist()))
+    valores = sorted(totales)
+    n = len(valores)
+    resultado = {}
+    for p in ps:
+        # Misma cuenta que NumPy (método 'linear') para dar exactamente el mismo valor
+        virtual = (n - 1) * (p / 100)
+        if virtual >= n - 1:
+            resultado[p] = valores[-1]
+            continue
+        anterior = math.floor(virtual)
+        t = virtual - anterior
+        a, b = valores[anterior], valores[anterior + 1]
+        diferencia = b - a
+        resultado[p] = b - diferencia * (1 - t) if t >= 0.5 else a + diferencia * t
+    return resultado
+
+def media_movil(tabla, ventana=7, desde=None, hasta=None):
+    """Promedio de ingresos de los últimos `ventana` días (contando los días sin ventas) como [(fecha, promedio)]."""
+    if ventana < 1:
+        raise ValueError("La ventana debe ser de al menos un día.")
+    dias, totales = _seleccion(tabla, "venta_dia", ["venta_total"], desde, hasta)
+    if len(dias) == 0:
+        return []
+    inicio = int(min(dias))
+    largo = int(max(dias)) - inicio + 1
+    if largo < ventana:
+        return []
+    if USAR_NUMPY:
+        diarios = np.bincount(dias - inicio, weights=totales, minlength=largo)
+        acumulado = np.concatenate(([0.0], np.cumsum(diarios)))
+        medias = ((acumulado[ventana:] - acumulado[:-ventana]) / ventana).tolist()
+    else:
+        diarios = [0.0] * largo
+        for dia, total in zip(dias, totales):
+            diarios[dia - inicio] += total
+        acumulado = [0.0] + list(itertools.accumulate(diarios))
+        medias = [(acumulado[i + ventana] - acumulado[i]) / ventana for i in range(largo - ventana + 1)]
+    return [(datetime.date.fromordinal(inicio + ventana - 1 + i).isoformat(), m) for i, m in enumerate(medias)]
+
+# ---------------- línea de comandos ---------------- #
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análisis de ventas por columnas")
+    parser.add_argument("--archivo", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "registro_ventas.txt"))
+    parser.add_argument("--periodo", choices=("dia", "semana", "mes"), default="mes")
+    parser.add_argument("--desde", help="YYYY-MM-DD")
+    parser.add_argument("--hasta", help="YYYY-MM-DD")
+    parser.add_argument("--top", type=int, default=10, help="cantidad de productos en el ranking")
+    parser.add_argument("--ventana", type=int, default=7, help="días de la media móvil")
+    parser.add_argument("--sin-numpy", action="store_true", help="calcular en Python puro aunque NumPy esté instalado")
+    args = parser.parse_args()
+    if args.sin_numpy:
+        USAR_NUMPY = False
+
+    tabla = desde_diario(args.archivo)
+    print(f"{cantidad_ventas(tabla)} ventas, {len(tabla['dia'])} ítems ({'NumPy' if USAR_NUMPY else 'Python puro'})")
+    print(f"\n--- Ingresos por {args.periodo} ---")
+    for clave, total in por_periodo(tabla, args.periodo, args.desde, args.hasta):
+        print(f"{clave}: ${total:.2f}")
+    print(f"\n--- {args.top} productos más vendidos ---")
+    for i, datos in enumerate(mas_vendidos(tabla, args.top, desde=args.desde, hasta=args.hasta), 1):
+        print(f"{i:>3}. {datos['nombre']}: {datos['cantidad']} unidades | ${datos['ingreso']:.2f}")
+    print("\n--- Total por venta ---")
+    for p, valor in percentiles(tabla, desde=args.desde, hasta=args.hasta).items():
+        print(f"p{p}: ${valor:.2f}")
+    medias = media_movil(tabla, args.ventana, args.desde, args.hasta)
+    print(f"\n--- Media móvil de {args.ventana} días (últimos 14) ---")
+    for fecha, valor in medias[-14:]:
+        print(f"{fecha}: ${valor:.2f}")
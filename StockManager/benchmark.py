@@ -0,0 +1,240 @@
+"""
+Banco de pruebas de rendimiento del sistema de inventario y ventas.
+
+Genera catálogos y años de ventas sintéticos en los formatos de archivo actuales
+(inventario.json y el diario registro_ventas.txt) en una carpeta temporal, mide
+las rutas críticas de main.py sin los menús interactivos y muestra una tabla.
+
+Uso:
+  python benchmark.py [--productos 1000,10000,100000] [--anios 2] [--ventas-dia 100]
+                      [--repeticiones 3] [--almacen json|sqlite]
+                      [--salida resultados.json] [--comparar anterior.json]
+
+Con --salida los resultados quedan en JSON; con --comparar se agrega una columna
+con la relación contra una corrida anterior (> 1 = más lento ahora).
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import main
+
+NOMBRES = ["arroz", "azúcar", "café", "harina", "aceite", "leche", "fideos", "yerba", "sal", "té",
+           "galletas", "jabón", "queso", "pan", "atún", "lentejas", "porotos", "avena", "cacao", "miel"]
+
+
+# ---------------- datos sintéticos ---------------- #
+
+def generar_inventario(directorio, cantidad, semilla=1):
+    azar = random.Random(semilla)
+    inventario = [{"id": i, "nombre": f"{NOMBRES[i % len(NOMBRES)]} {i}",
+                   "precio": round(azar.uniform(100, 5000), 2), "stock": azar.randint(0, 500),
+                   "codigos": [codigo_de(i)]}
+                  for i in range(1, cantidad + 1)]
+    with open(os.path.join(directorio, "inventario.json"), "w", encoding="utf-8") as f:
+        json.dump({"inventario": inventario, "siguiente_id": cantidad + 1}, f, ensure_ascii=False, indent=2)
+    return inventario
+
+
+def codigo_de(i):
+    """EAN-13 sintético (prefijo 779) para el producto `i`."""
+    digitos = f"779{i:09d}"
+    return digitos + str(main.digito_verificador(digitos))
+
+
+def generar_ventas(directorio, inventario, anios, ventas_dia, semilla=2):
+    """Escribe el diario de ventas en orden cronológico; devuelve cuántas ventas generó."""
+    azar = random.Random(semilla)
+    inicio = datetime.datetime(2020, 1, 1, 9, 0, 0)
+    dias = int(anios * 365)
+    total_ventas = 0
+    with open(os.path.join(directorio, "registro_ventas.txt"), "w", encoding="utf-8") as f:
+        for d in range(dias):
+            base = inicio + datetime.timedelta(days=d)
+            segundos = sorted(azar.randrange(0, 12 * 3600) for _ in range(ventas_dia))
+            for s in segundos:
+                items = []
+                for p in azar.sample(inventario, azar.randint(1, min(4, len(inventario)))):
+                    cantidad = azar.randint(1, 5)
+                    items.append({"nombre": p["nombre"], "cantidad": cantidad, "subtotal": p["precio"] * cantidad})
+                venta = {"fecha": (base + datetime.timedelta(seconds=s)).strftime("%Y-%m-%d %H:%M:%S"),
+                         "items": items, "total": sum(i["subtotal"] for i in items),
+                         "cliente": "", "proxima_visita": ""}
+                f.write(json.dumps(venta, ensure_ascii=False, separators=(",", ":")) + "\n")
+                total_ventas += 1
+    return total_ventas
+
+
+def apuntar_a(directorio, almacen):
+    """Redirige todas las rutas de datos de main.py a `directorio`."""
+    for nombre in dir(main):
+        valor = getattr(main, nombre)
+        if nombre.isupper() and isinstance(valor, str) and os.path.dirname(valor) == main.BASE_DIR:
+            setattr(main, nombre, os.path.join(directorio, os.path.basename(valor)))
+    main.BASE_DIR = directorio
+    main.ALMACEN = almacen
+    main._conexion = None
+    main._historial, main._historial_posicion, main._historial_iniciado = None, 0, False
+    main.VENTANA_ESCRITURA = 3600  # las escrituras diferidas se miden aparte con vaciar_pendientes()
+
+
+# ---------------- medición ---------------- #
+
+def medir(funcion, repeticiones):
+    """Ejecuta `funcion` varias veces (con la salida por pantalla descartada); devuelve tiempos en ms."""
+    tiempos = []
+    for _ in range(repeticiones):
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def correr_tamano(cantidad, args):
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="bench_stock_") as directorio:
+        inventario = generar_inventario(directorio, cantidad)
+        total_ventas = generar_ventas(directorio, inventario, args.anios, args.ventas_dia)
+        del inventario
+        apuntar_a(directorio, args.almacen)
+
+        def anotar(operacion, tiempos, por_operacion=1):
+            resultados.append({
+                "operacion": operacion,
+                "almacen": args.almacen,
+                "productos": cantidad,
+                "ventas": total_ventas,
+                "mediana_ms": statistics.median(tiempos) / por_operacion,
+                "min_ms": min(tiempos) / por_operacion,
+            })
+
+        # La primera carga hace la importación/migración y arma los acumulados: se mide aparte
+        anotar("primera carga (cargar_inventario + cargar_ventas)",
+               medir(lambda: (main.cargar_inventario(), main.cargar_ventas()), 1))
+        main.vaciar_pendientes()
+        anotar("cargar_inventario", medir(main.cargar_inventario, args.repeticiones))
+        anotar("cargar_ventas (con copia binaria)", medir(main.cargar_ventas, args.repeticiones))
+        anotar("cargar_ventas (sin copia, lee todo)",
+               medir(lambda: (os.path.exists(main.VENTAS_CACHE) and os.remove(main.VENTAS_CACHE), main.cargar_ventas()),
+                     args.repeticiones))
+
+        ids = [p["id"] for p in main.inventario]
+        azar = random.Random(3)
+        for p in main.inventario:
+            p["stock"] = 10 ** 9  # que ninguna venta falle por stock
+        main.indexar_inventario()
+        main.guardar_inventario()
+        main.vaciar_pendientes()
+        lote = 200
+
+        def vender_lote():
+            for _ in range(lote):
+                main.vender([(azar.choice(ids), 1) for _ in range(azar.randint(1, 4))])
+        anotar("registrar_venta (por venta)", medir(vender_lote, args.repeticiones), lote)
+        anotar("fijar_stock (con evento de historial, por operación)",
+               medir(lambda: [main.fijar_stock(azar.choice(ids), 10 ** 9 - azar.randint(0, 9)) for _ in range(lote)],
+                     args.repeticiones), lote)
+        momento = main.timestamp()
+        anotar("inventario_al (historial con instantáneas)", medir(lambda: main.inventario_al(momento), args.repeticiones))
+        anotar("guardar_inventario", medir(lambda: (main.guardar_inventario(), main.vaciar_pendientes()), args.repeticiones))
+        anotar("guardar_ventas (compactación)", medir(main.guardar_ventas, args.repeticiones))
+        anotar("reporte_ventas", medir(main.datos_reporte_general, args.repeticiones))
+        for periodo in ("dia", "semana", "mes"):
+            anotar(f"ventas_por_periodo({periodo})",
+                   medir(lambda: main.ventas_por_periodo(periodo), args.repeticiones))
+        fechas = sorted(main.resumen["dia"])
+        mitad = fechas[len(fechas) // 2]
+        anotar("ventas por fecha (1 día)", medir(lambda: main.datos_ventas_por_fecha(mitad, mitad), args.repeticiones))
+        nombre = main.inventario[0]["nombre"]
+        anotar("historial_ventas_producto", medir(lambda: main.datos_historial_producto(nombre), args.repeticiones))
+        anotar("buscar_productos (primera, arma el índice)", medir(lambda: main.buscar_productos("azucar"), 1))
+        anotar("buscar_productos", medir(lambda: main.buscar_productos("harna 12"), args.repeticiones))
+        codigos = [codigo_de(azar.choice(ids)) for _ in range(lote)]
+        anotar("lectura de código de barras (por lectura)",
+               medir(lambda: [main.buscar_por_codigo(main.normalizar_codigo(c)) for c in codigos], args.repeticiones), lote)
+        anotar("análisis por columnas (primera, arma las columnas)", medir(main.datos_analisis, 1))
+        anotar("análisis por columnas", medir(main.datos_analisis, args.repeticiones))
+        anotar("productos_nunca_vendidos", medir(main.datos_nunca_vendidos, args.repeticiones))
+        anotar("exportar_ventas (CSV)",
+               medir(lambda: main.exportar_ventas(os.path.join(directorio, "ventas.csv")), args.repeticiones))
+        main.vaciar_pendientes()
+        if main._conexion is not None:
+            main._conexion.close()
+            main._conexion = None
+    return resultados
+
+
+# ---------------- presentación ---------------- #
+
+def clave(resultado):
+    """Identifica una medición para compararla entre corridas."""
+    return (resultado["operacion"], resultado.get("almacen", "json"), resultado["productos"], resultado["ventas"])
+
+
+def mostrar_tabla(resultados, anteriores=None):
+    previos = {}
+    for r in anteriores or []:
+        previos[clave(r)] = r["mediana_ms"]
+    ancho = max(len(r["operacion"]) for r in resultados)
+    titulo = f"{'Operación':<{ancho}} | {'Productos':>9} | {'Ventas':>9} | {'Mediana ms':>11} | {'Mín ms':>10}"
+    if previos:
+        titulo += f" | {'vs anterior':>11}"
+    print(titulo)
+    print("-" * len(titulo))
+    for r in resultados:
+        linea = (f"{r['operacion']:<{ancho}} | {r['productos']:>9} | {r['ventas']:>9} | "
+                 f"{r['mediana_ms']:>11.3f} | {r['min_ms']:>10.3f}")
+        if previos:
+            anterior = previos.get(clave(r))
+            linea += f" | {r['mediana_ms'] / anterior:>10.2f}x" if anterior else f" | {'—':>11}"
+        print(linea)
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Mide las rutas críticas de inventario y ventas")
+    parser.add_argument("--productos", default="1000,10000",
+                        help="tamaños de catálogo separados por coma (por ejemplo 1000,100000,1000000)")
+    parser.add_argument("--anios", type=float, default=2, help="años de ventas a generar")
+    parser.add_argument("--ventas-dia", type=int, default=100, help="ventas por día")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--almacen", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="resultados JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    resultados = []
+    for cantidad in (int(x) for x in args.productos.split(",") if x.strip()):
+        print(f"Generando {cantidad} productos y {args.anios} años de ventas...", file=sys.stderr)
+        resultados.extend(correr_tamano(cantidad, args))
+
+    anteriores = None
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            anteriores = json.load(f)["resultados"]
+    mostrar_tabla(resultados, anteriores)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({
+                "fecha": main.timestamp(),
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+                "parametros": vars(args),
+                "resultados": resultados,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
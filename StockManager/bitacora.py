@@ -0,0 +1,251 @@
+"""
+Bitácora de eventos del Sistema de Inventario y Ventas, en JSON Lines.
+
+Cada registro es una línea {"fecha", "evento", "usuario"?, "producto"?, "detalle"?}.
+Los registros se encolan y un hilo los escribe por tandas, así la caja no espera
+al disco. El archivo activo se rota al pasar de TAMANO_MAXIMO o al cambiar el día;
+los segmentos viejos quedan comprimidos como bitacora.<desde>_<hasta>.jsonl.gz, con
+el rango de fechas en el nombre para que las consultas abran solo los necesarios.
+
+Consulta:  python bitacora.py [--usuario U] [--evento E] [--producto ID]
+                              [--desde "YYYY-MM-DD[ HH:MM:SS]"] [--hasta ...]
+                              [--archivo bitacora.jsonl] [--json]
+"""
+
+import argparse
+import contextlib
+import glob
+import gzip
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+
+import metricas
+
+TAMANO_MAXIMO = 5 * 1024 * 1024  # bytes del archivo activo antes de rotarlo
+
+# ---------------- segmentos rotados ---------------- #
+
+def _sello(fecha):
+    """'2025-05-18 00:54:48' -> '20250518T005448' (para nombres de archivo)."""
+    return fecha.replace("-", "").replace(":", "").replace(" ", "T")
+
+def _fecha_de_sello(sello):
+    if not re.fullmatch(r"\d{8}T\d{6}", sello):
+        raise ValueError(sello)
+    return f"{sello[:4]}-{sello[4:6]}-{sello[6:8]} {sello[9:11]}:{sello[11:13]}:{sello[13:15]}"
+
+def nombre_segmento(ruta, desde, hasta):
+    """Nombre libre para el segmento comprimido que cubre de `desde` a `hasta`."""
+    base, ext = os.path.splitext(ruta)
+    destino = f"{base}.{_sello(desde)}_{_sello(hasta)}{ext}.gz"
+    n = 2
+    while os.path.exists(destino):
+        destino = f"{base}.{_sello(desde)}_{_sello(hasta)}-{n}{ext}.gz"
+        n += 1
+    return destino
+
+def segmentos(ruta):
+    """Segmentos rotados de `ruta` como (desde, hasta, archivo), ordenados por fecha."""
+    base, ext = os.path.splitext(ruta)
+    prefijo = os.path.basename(base) + "."
+    encontrados = []
+    for archivo in glob.glob(f"{glob.escape(base)}.*_*{ext}.gz"):
+        rango = os.path.basename(archivo)[len(prefijo):-len(ext) - 3]
+        desde, _, hasta = rango.partition("_")
+        try:
+            encontrados.append((_fecha_de_sello(desde), _fecha_de_sello(hasta.split("-")[0]), archivo))
+        except ValueError:
+            continue
+    return sorted(encontrados)
+
+def _fecha_de_linea(linea):
+    try:
+        return json.loads(linea)["fecha"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def rango_de_fechas(ruta):
+    """(primera, última) fecha de un archivo de bitácora sin comprimir, o None si está vacío."""
+    try:
+        with open(ruta, "rb") as f:
+            primera = _fecha_de_linea(f.readline())
+            if primera is None:
+                return None
+            # La última línea completa está al final: se lee solo la cola del archivo
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 4096))
+            lineas = f.read().splitlines()
+    except OSError:
+        return None
+    ultima = next((fecha for fecha in map(_fecha_de_linea, reversed(lineas)) if fecha), primera)
+    return primera, ultima
+
+def guardar_segmento(origen, desde, hasta, ruta):
+    """Comprime `origen` como segmento de `ruta` y lo borra."""
+    destino = nombre_segmento(ruta, desde, hasta)
+    with open(origen, "rb") as f, gzip.open(f"{destino}.tmp", "wb") as g:
+        shutil.copyfileobj(f, g)
+    os.replace(f"{destino}.tmp", destino)
+    os.remove(origen)
+    return destino
+
+# ---------------- escritura ---------------- #
+
+class Escritor(threading.Thread):
+    """Hilo que escribe los registros encolados por tandas y rota el archivo cuando corresponde."""
+
+    def __init__(self, ruta, bloqueo=None, tamano_maximo=TAMANO_MAXIMO):
+        super().__init__(daemon=True)
+        self.ruta = ruta
+        self.bloqueo = bloqueo or contextlib.nullcontext  # fábrica del bloqueo entre procesos
+        self.tamano_maximo = tamano_maximo
+        self.cola = queue.Queue()
+
+    def registrar(self, registro):
+        self.cola.put(registro)
+
+    def vaciar(self):
+        """Espera a que todo lo encolado esté escrito."""
+        if self.is_alive():
+            self.cola.join()
+
+    def run(self):
+        while True:
+            tanda = [self.cola.get()]
+            while True:
+                try:
+                    tanda.append(self.cola.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with metricas.medir("bitácora (escribir tanda)"):
+                    self.escribir(tanda)
+                metricas.contar("registros de bitácora", len(tanda))
+            except OSError:
+                pass  # sin disco no hay bitácora, pero la caja sigue funcionando
+            for _ in tanda:
+                self.cola.task_done()
+
+    def escribir(self, tanda):
+        datos = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in tanda)
+        with self.bloqueo():
+            self.rotar_si_hace_falta(tanda[0]["fecha"])
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(datos)
+
+    def rotar_si_hace_falta(self, fecha):
+        """Rota el archivo activo si ya es muy grande o si sus registros son de otro día."""
+        try:
+            tamano = os.path.getsize(self.ruta)
+        except OSError:
+            return
+        rango = rango_de_fechas(self.ruta)
+        if rango is None:
+            return
+        if tamano >= self.tamano_maximo or rango[0][:10] != fecha[:10]:
+            apartado = f"{self.ruta}.{os.getpid()}.rotando"
+            os.replace(self.ruta, apartado)
+            guardar_segmento(apartado, rango[0], rango[1], self.ruta)
+
+# ---------------- migración del formato anterior ---------------- #
+
+def migrar_texto(ruta_texto, ruta):
+    """Convierte la bitácora de texto ('fecha | evento | detalle') en un segmento comprimido."""
+    registros = []
+    with open(ruta_texto, "r", encoding="utf-8") as f:
+        for linea in f:
+            partes = linea.rstrip("\n").split(" | ")
+            if len(partes) < 2:
+                continue
+            evento, _, usuario = partes[1].partition(": ")  # formato más viejo: "Login: nombre"
+            registro = {"fecha": partes[0], "evento": evento}
+            resto = []
+            for parte in partes[2:]:
+                if parte.startswith("Usuario: "):
+                    usuario = parte[len("Usuario: "):]
+                else:
+                    resto.append(parte)
+            detalle = " | ".join(resto)
+            if usuario:
+                registro["usuario"] = usuario
+            if detalle:
+                registro["detalle"] = detalle
+            registros.append(registro)
+    if registros:
+        temporal = f"{ruta}.{os.getpid()}.migrando"
+        with open(temporal, "w", encoding="utf-8") as f:
+            for registro in registros:
+                f.write(json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n")
+        guardar_segmento(temporal, registros[0]["fecha"], registros[-1]["fecha"], ruta)
+    os.replace(ruta_texto, f"{ruta_texto}.bak")
+    return len(registros)
+
+# ---------------- consultas ---------------- #
+
+def _limites(desde, hasta):
+    """Completa fechas sin hora para que 'hasta' incluya el día entero."""
+    if desde and len(desde) == 10:
+        desde += " 00:00:00"
+    if hasta and len(hasta) == 10:
+        hasta += " 23:59:59"
+    return desde, hasta
+
+def consultar(ruta, usuario=None, evento=None, producto=None, desde=None, hasta=None):
+    """Registros que cumplen los filtros, en orden de fecha.
+
+    Solo se abren los segmentos rotados cuyo rango de fechas se cruza con el pedido.
+    """
+    desde, hasta = _limites(desde, hasta)
+    archivos = [archivo for inicio, fin, archivo in segmentos(ruta)
+                if (not desde or fin >= desde) and (not hasta or inicio <= hasta)]
+    if os.path.exists(ruta):
+        archivos.append(ruta)
+    usuario = usuario.casefold() if usuario else None
+    evento = evento.casefold() if evento else None
+    for archivo in archivos:
+        abrir = gzip.open if archivo.endswith(".gz") else open
+        with abrir(archivo, "rt", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    continue
+                fecha = registro.get("fecha", "")
+                if desde and fecha < desde:
+                    continue
+                if hasta and fecha > hasta:
+                    break  # cada archivo está en orden cronológico
+                if usuario and registro.get("usuario", "").casefold() != usuario:
+                    continue
+                if evento and registro.get("evento", "").casefold() != evento:
+                    continue
+                if producto is not None and registro.get("producto") != producto:
+                    continue
+                yield registro
+
+def formatear(registro):
+    partes = [registro["fecha"], registro["evento"]]
+    if "usuario" in registro:
+        partes.append(f"Usuario: {registro['usuario']}")
+    if "producto" in registro:
+        partes.append(f"ID: {registro['producto']}")
+    if registro.get("detalle"):
+        partes.append(registro["detalle"])
+    return " | ".join(partes)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consulta la bitácora de eventos")
+    parser.add_argument("--archivo", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "bitacora.jsonl"))
+    parser.add_argument("--usuario")
+    parser.add_argument("--evento")
+    parser.add_argument("--producto", type=int)
+    parser.add_argument("--desde", help="YYYY-MM-DD o 'YYYY-MM-DD HH:MM:SS'")
+    parser.add_argument("--hasta", help="YYYY-MM-DD o 'YYYY-MM-DD HH:MM:SS'")
+    parser.add_argument("--json", action="store_true", help="mostrar los registros tal cual (JSON Lines)")
+    args = parser.parse_args()
+    for registro in consultar(args.archivo, args.usuario, args.evento, args.producto, args.desde, args.hasta):
+        print(json.dumps(registro, ensure_ascii=False) if args.json else formatear(registro))
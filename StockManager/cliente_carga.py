@@ -0,0 +1,111 @@
+"""
+Cliente de carga para servidor.py: lanza ventas concurrentes y mide el rendimiento.
+
+Uso:  python cliente_carga.py --usuario NOMBRE --password CLAVE [--host 127.0.0.1] [--puerto 8765]
+                              [--hilos 8] [--ventas 200] [--lecturas 0.2]
+
+Cada hilo usa su propia conexión persistente. Con --lecturas se mezcla esa fracción
+de pedidos de reporte entre las ventas. Al final informa ventas por segundo y
+latencias p50/p99.
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import math
+import random
+import threading
+import time
+
+cabeceras_autorizacion = {}  # Authorization: Basic ... con el usuario de --usuario/--password
+
+
+def percentil(valores, p):
+    """Percentil por el método del rango más cercano (valores ya ordenados)."""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, math.ceil(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+
+def pedir(conexion, metodo, ruta, datos=None):
+    cuerpo = json.dumps(datos).encode("utf-8") if datos is not None else None
+    cabeceras = dict(cabeceras_autorizacion, **({"Content-Type": "application/json"} if cuerpo else {}))
+    conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+    respuesta = conexion.getresponse()
+    return respuesta.status, json.loads(respuesta.read() or b"null")
+
+
+def trabajador(host, puerto, ids, cantidad, lecturas, resultados, bloqueo):
+    conexion = http.client.HTTPConnection(host, puerto, timeout=30)
+    propias = {"ventas": [], "lecturas": [], "errores": 0}
+    for _ in range(cantidad):
+        if random.random() < lecturas:
+            inicio = time.perf_counter()
+            estado, _ = pedir(conexion, "GET", "/reportes/general")
+            propias["lecturas"].append(time.perf_counter() - inicio)
+            if estado != 200:
+                propias["errores"] += 1
+            continue
+        items = [{"id": random.choice(ids), "cantidad": 1} for _ in range(random.randint(1, 3))]
+        inicio = time.perf_counter()
+        estado, _ = pedir(conexion, "POST", "/ventas", {"items": items, "cliente": "carga"})
+        propias["ventas"].append(time.perf_counter() - inicio)
+        if estado != 201:
+            propias["errores"] += 1
+    conexion.close()
+    with bloqueo:
+        for clave in ("ventas", "lecturas"):
+            resultados[clave].extend(propias[clave])
+        resultados["errores"] += propias["errores"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio de ventas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--ventas", type=int, default=200, help="pedidos por hilo")
+    parser.add_argument("--lecturas", type=float, default=0.0, help="fracción de pedidos de reporte (0 a 1)")
+    parser.add_argument("--usuario", required=True, help="usuario del sistema con el que se venden")
+    parser.add_argument("--password", required=True)
+    args = parser.parse_args()
+    credencial = base64.b64encode(f"{args.usuario}:{args.password}".encode("utf-8")).decode("ascii")
+    cabeceras_autorizacion["Authorization"] = f"Basic {credencial}"
+
+    conexion = http.client.HTTPConnection(args.host, args.puerto, timeout=30)
+    estado, productos = pedir(conexion, "GET", "/productos")
+    conexion.close()
+    if estado != 200:
+        print(f"El servicio respondió {estado}: {productos['error']}")
+        return
+    ids = [p["id"] for p in productos if p["stock"] > 0]
+    if not ids:
+        print("No hay productos con stock para vender.")
+        return
+
+    resultados = {"ventas": [], "lecturas": [], "errores": 0}
+    bloqueo = threading.Lock()
+    hilos = [threading.Thread(target=trabajador,
+                              args=(args.host, args.puerto, ids, args.ventas, args.lecturas, resultados, bloqueo))
+             for _ in range(args.hilos)]
+    inicio = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    duracion = time.perf_counter() - inicio
+
+    print(f"Duración: {duracion:.2f} s con {args.hilos} hilos")
+    print(f"Errores (incluye stock insuficiente): {resultados['errores']}")
+    for clave, titulo in (("ventas", "Ventas"), ("lecturas", "Reportes")):
+        tiempos = sorted(resultados[clave])
+        if not tiempos:
+            continue
+        print(f"{titulo}: {len(tiempos)} | {len(tiempos) / duracion:.1f} por segundo | "
+              f"p50 {percentil(tiempos, 50) * 1000:.2f} ms | p99 {percentil(tiempos, 99) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
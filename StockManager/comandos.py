@@ -0,0 +1,258 @@
+"""
+Comandos sin interfaz para el Sistema de Inventario y Ventas (main.py).
+Permiten correr reportes, exportaciones, importaciones y cambios de inventario desde
+scripts o tareas programadas: sin menús, sin colores, sin limpiar la pantalla y sin
+pedir el monto inicial de caja. Usan las mismas operaciones que los menús y
+servidor.py, y cada comando carga solo los datos que necesita.
+
+Uso:  python comandos.py [--formato json|csv] <comando> ...
+
+Comandos:
+  reporte [general|fecha|producto|nunca-vendidos|periodo|cierres|reposicion|analisis]
+          [--periodo dia|semana|mes] [--desde YYYY-MM-DD] [--hasta YYYY-MM-DD]
+          [--nombre PRODUCTO] [--caja CAJA] [--top N] [--ventana N]      (por defecto: periodo)
+  exportar-csv [--archivo ventas.csv] [--desde] [--hasta] [--producto] [--incremental]
+  importar-csv ventas|precios ARCHIVO
+  producto alta --nombre N --precio P --stock S [--codigo C ...]
+  producto listar [--bajo N | --al YYYY-MM-DD[ HH:MM:SS]]
+  producto deshacer | rehacer     último cambio de inventario (ver historial.py)
+  stock fijar ID CANTIDAD
+  venta repetir ARCHIVO      una venta por línea (JSON Lines), como en POST /ventas:
+                             {"items": [{"id", "codigo" o "nombre", "cantidad"}], "cliente"?, "proxima_visita"?}
+
+También se aceptan los nombres en inglés: report, export-csv, import-csv, product add|list,
+product undo|redo, stock set, sale replay, y las opciones --period, --from y --to.
+
+El resultado sale por la salida estándar en JSON (o CSV con --formato csv); los avisos de
+la carga de datos van a la salida de errores. Si algo falla el código de salida es 1.
+Los tiempos de cada comando se agregan a metricas.jsonl al terminar (ver metricas.py).
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+
+import csv_ventas
+import main
+
+REPORTES = ("general", "fecha", "producto", "nunca-vendidos", "periodo", "cierres", "reposicion", "analisis")
+
+CARGAS = {
+    "inventario": main.cargar_inventario,
+    "ventas": main.cargar_ventas,
+    "caja": main.cargar_caja,
+}
+
+
+def cargar(*datos):
+    """Carga los datos pedidos (en ese orden); sus avisos no se mezclan con la salida."""
+    with contextlib.redirect_stdout(sys.stderr):
+        for nombre in datos:
+            CARGAS[nombre]()
+
+
+def ruta(texto):
+    """Las rutas de los comandos son relativas a la carpeta actual, no a la del programa."""
+    return os.path.abspath(texto) if texto else None
+
+# ---------------- comandos ---------------- #
+
+def reporte(args):
+    if args.tipo != "cierres":
+        cargar("inventario", "ventas")
+    if args.tipo == "general":
+        return main.datos_reporte_general()
+    if args.tipo == "fecha":
+        datos = main.datos_ventas_por_fecha(args.desde, args.hasta)
+        if args.formato == "csv":
+            return [dict(zip(("fecha", "producto", "cantidad", "subtotal", "venta"), fila))
+                    for fila in csv_ventas.filas_de_ventas(csv_ventas.numerar(datos["ventas"]))]
+        return datos
+    if args.tipo == "producto":
+        datos = main.datos_historial_producto(args.nombre or "")
+        return datos["ventas"] if args.formato == "csv" else datos
+    if args.tipo == "nunca-vendidos":
+        return [{"nombre": nombre} for nombre in main.datos_nunca_vendidos()]
+    if args.tipo == "periodo":
+        return [{"periodo": clave, "total": total}
+                for clave, total in main.datos_ventas_por_periodo(args.periodo or "dia", args.desde, args.hasta)]
+    if args.tipo == "cierres":
+        return main.datos_cierres(args.desde, args.hasta, args.caja)
+    if args.tipo == "reposicion":
+        return main.datos_reposicion()
+    if args.formato == "csv":
+        raise ValueError("El análisis de ventas solo se puede pedir en JSON.")
+    return main.datos_analisis(args.desde, args.hasta, args.periodo or "mes", args.top, args.ventana)
+
+
+def exportar_csv(args):
+    archivo = ruta(args.archivo) or main.VENTAS_CSV
+    filas = main.exportar_ventas(archivo, args.desde, args.hasta, args.producto, args.incremental)
+    return {"archivo": archivo, "filas": filas}
+
+
+def importar_csv(args):
+    archivo = ruta(args.archivo)
+    if args.tipo == "ventas":
+        cargar("ventas")
+        importadas, repetidas = main.importar_ventas_csv(archivo)
+        return {"archivo": archivo, "importadas": importadas, "repetidas": repetidas}
+    cargar("inventario")
+    actualizados, desconocidas = main.importar_precios_csv(archivo)
+    return {"archivo": archivo, "actualizados": actualizados, "lineas_desconocidas": desconocidas}
+
+
+def producto_alta(args):
+    cargar("inventario")
+    return main.alta_producto(args.nombre, args.precio, args.stock, args.codigo)
+
+
+def producto_listar(args):
+    cargar("inventario")
+    if args.al:
+        return main.inventario_al(args.al)
+    if args.bajo is not None:
+        return main.productos_con_stock_menor(args.bajo)
+    return list(main.inventario)
+
+
+def producto_deshacer(args):
+    cargar("inventario")
+    return main.deshacer(rehacer=args.accion in ("rehacer", "redo"))
+
+
+def stock_fijar(args):
+    cargar("inventario")
+    return main.fijar_stock(args.id, args.cantidad)
+
+
+def venta_repetir(args):
+    """Registra las ventas del archivo en orden; una línea con error no frena a las siguientes."""
+    cargar("inventario", "ventas", "caja")  # las ventas se suman a la caja abierta de STOCK_TERMINAL, si hay
+    main.liberar_reservas(todas=not main.MULTITERMINAL)
+    resultados = []
+    with open(ruta(args.archivo), "r", encoding="utf-8") as f:
+        for numero, linea in enumerate(f, start=1):
+            if not linea.strip():
+                continue
+            try:
+                try:
+                    datos = json.loads(linea)
+                except ValueError:
+                    raise ValueError("La línea no es JSON válido.") from None
+                if not isinstance(datos, dict) or not all(isinstance(i, dict) for i in datos.get("items", [])):
+                    raise ValueError("Se esperaba {\"items\": [{\"id\", \"codigo\" o \"nombre\", \"cantidad\"}]}.")
+                items = [(main.id_de_item(i), i.get("cantidad")) for i in datos.get("items", [])]
+                venta = main.vender(items, datos.get("cliente", ""), datos.get("proxima_visita", ""))
+                resultados.append({"linea": numero, "fecha": venta["fecha"], "total": venta["total"], "error": None})
+            except (TypeError, ValueError) as e:  # un campo de otro tipo tampoco frena a las líneas siguientes
+                resultados.append({"linea": numero, "fecha": None, "total": None, "error": str(e)})
+    args.con_errores = any(r["error"] for r in resultados)
+    return resultados
+
+# ---------------- salida ---------------- #
+
+def escribir_json(datos, salida):
+    json.dump(datos, salida, ensure_ascii=False, indent=2)
+    salida.write("\n")
+
+
+def escribir_csv(datos, salida):
+    """Una fila por elemento (o una sola si el resultado es un objeto); lo anidado va como JSON."""
+    filas = datos if isinstance(datos, list) else [datos]
+    filas = [f if isinstance(f, dict) else {"valor": f} for f in filas]
+    columnas = list(dict.fromkeys(c for f in filas for c in f))
+    if not columnas:
+        return  # sin resultados
+    escritor = csv.DictWriter(salida, columnas, lineterminator="\n")
+    escritor.writeheader()
+    for f in filas:
+        escritor.writerow({c: json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else v
+                           for c, v in f.items()})
+
+# ---------------- argumentos ---------------- #
+
+def _fechas(parser):
+    parser.add_argument("--desde", "--from", help="YYYY-MM-DD")
+    parser.add_argument("--hasta", "--to", help="YYYY-MM-DD")
+
+
+def armar_parser():
+    parser = argparse.ArgumentParser(description="Comandos sin interfaz del sistema de inventario y ventas")
+    parser.add_argument("--formato", "--format", choices=("json", "csv"), default="json")
+    comandos = parser.add_subparsers(dest="comando", required=True, metavar="comando")
+
+    p = comandos.add_parser("reporte", aliases=["report"], help="reportes de ventas, caja y reposición")
+    p.add_argument("tipo", nargs="?", choices=REPORTES, default="periodo")
+    p.add_argument("--periodo", "--period", choices=("dia", "semana", "mes"),
+                   help="por defecto dia (mes en el análisis)")
+    _fechas(p)
+    p.add_argument("--nombre", help="producto del reporte 'producto'")
+    p.add_argument("--caja", help="solo los cierres de esa caja")
+    p.add_argument("--top", type=int, default=10, help="productos en el ranking del análisis")
+    p.add_argument("--ventana", type=int, default=7, help="días de la media móvil del análisis")
+    p.set_defaults(funcion=reporte)
+
+    p = comandos.add_parser("exportar-csv", aliases=["export-csv"], help="exportar ventas a CSV (.gz para comprimir)")
+    p.add_argument("--archivo", help=f"por defecto {os.path.basename(main.VENTAS_CSV)} junto a los datos")
+    _fechas(p)
+    p.add_argument("--producto")
+    p.add_argument("--incremental", action="store_true", help="solo agregar las ventas nuevas desde la última exportación")
+    p.set_defaults(funcion=exportar_csv)
+
+    p = comandos.add_parser("importar-csv", aliases=["import-csv"], help="importar ventas históricas o precios")
+    p.add_argument("tipo", choices=("ventas", "precios"))
+    p.add_argument("archivo")
+    p.set_defaults(funcion=importar_csv)
+
+    producto = comandos.add_parser("producto", aliases=["product"], help="alta, listado e historial de productos")
+    acciones = producto.add_subparsers(dest="accion", required=True, metavar="accion")
+    p = acciones.add_parser("alta", aliases=["add"])
+    p.add_argument("--nombre", "--name", required=True)
+    p.add_argument("--precio", "--price", type=float, required=True)
+    p.add_argument("--stock", type=int, required=True)
+    p.add_argument("--codigo", "--code", action="append", default=[], help="código de barras (se puede repetir)")
+    p.set_defaults(funcion=producto_alta)
+    p = acciones.add_parser("listar", aliases=["list"])
+    p.add_argument("--bajo", type=int, metavar="N", help="solo los productos con stock menor a N")
+    p.add_argument("--al", metavar="FECHA", help="el inventario como estaba en esa fecha (YYYY-MM-DD[ HH:MM:SS])")
+    p.set_defaults(funcion=producto_listar)
+    for accion, alias in (("deshacer", "undo"), ("rehacer", "redo")):
+        acciones.add_parser(accion, aliases=[alias]).set_defaults(funcion=producto_deshacer)
+
+    stock = comandos.add_parser("stock", help="cambiar el stock de un producto")
+    acciones = stock.add_subparsers(dest="accion", required=True, metavar="accion")
+    p = acciones.add_parser("fijar", aliases=["set"])
+    p.add_argument("id", type=int)
+    p.add_argument("cantidad", type=int)
+    p.set_defaults(funcion=stock_fijar)
+
+    venta = comandos.add_parser("venta", aliases=["sale"], help="registrar ventas desde un archivo")
+    acciones = venta.add_subparsers(dest="accion", required=True, metavar="accion")
+    p = acciones.add_parser("repetir", aliases=["replay"])
+    p.add_argument("archivo", help="JSON Lines, una venta por línea")
+    p.set_defaults(funcion=venta_repetir)
+    return parser
+
+
+def ejecutar(argv=None):
+    """Corre un comando y devuelve el código de salida (0 si todo salió bien)."""
+    args = armar_parser().parse_args(argv)
+    args.con_errores = False
+    main.iniciar_metricas()
+    try:
+        datos = args.funcion(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        main.vaciar_pendientes()
+    (escribir_csv if args.formato == "csv" else escribir_json)(datos, sys.stdout)
+    return 1 if args.con_errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(ejecutar())
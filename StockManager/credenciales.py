@@ -0,0 +1,114 @@
+"""
+Contraseñas con hash y sal para el Sistema de Inventario y Ventas.
+
+Cada contraseña se guarda como "scrypt$<log2 N>$<r>$<p>$<sal>$<hash>" (sal y hash en
+base64). Si la instalación de Python no trae hashlib.scrypt (OpenSSL sin scrypt) se usa
+"pbkdf2_sha256$<iteraciones>$<sal>$<hash>". Como el costo queda escrito en cada hash,
+se puede cambiar sin invalidar las contraseñas existentes: al entrar con un hash de otro
+costo, main.py lo vuelve a calcular con el actual.
+
+El costo se ajusta con la variable de entorno STOCK_COSTO_SCRYPT (log2 de N; 14 por
+defecto, unos 60 ms por intento en una PC común y 16 MiB de memoria) o
+STOCK_ITERACIONES_PBKDF2. Para elegirlo en la máquina de la caja:
+  python credenciales.py --calibrar 100     (milisegundos por intento)
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import time
+
+COSTO_SCRYPT = int(os.environ.get("STOCK_COSTO_SCRYPT", "14"))
+BLOQUE_SCRYPT = 8
+PARALELO_SCRYPT = 1
+ITERACIONES_PBKDF2 = int(os.environ.get("STOCK_ITERACIONES_PBKDF2", "600000"))
+LARGO_SAL = 16
+USAR_SCRYPT = hasattr(hashlib, "scrypt")
+
+def _b64(datos):
+    return base64.b64encode(datos).decode("ascii")
+
+def _scrypt(password, sal, costo, r, p):
+    # La memoria que usa scrypt es 128 * r * N bytes; se deja margen sobre el límite de OpenSSL
+    return hashlib.scrypt(password.encode("utf-8"), salt=sal, n=2 ** costo, r=r, p=p,
+                          maxmem=256 * r * p * 2 ** costo)
+
+def _pbkdf2(password, sal, iteraciones):
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), sal, iteraciones)
+
+def hashear(password, costo=None):
+    """Hash con sal nueva de `password`, con el costo actual (o el indicado)."""
+    sal = os.urandom(LARGO_SAL)
+    if USAR_SCRYPT:
+        costo = costo or COSTO_SCRYPT
+        clave = _scrypt(password, sal, costo, BLOQUE_SCRYPT, PARALELO_SCRYPT)
+        return f"scrypt${costo}${BLOQUE_SCRYPT}${PARALELO_SCRYPT}${_b64(sal)}${_b64(clave)}"
+    costo = costo or ITERACIONES_PBKDF2
+    return f"pbkdf2_sha256${costo}${_b64(sal)}${_b64(_pbkdf2(password, sal, costo))}"
+
+def es_hash(valor):
+    """True si `valor` ya es un hash de este módulo (y no una contraseña en texto plano)."""
+    partes = str(valor).split("$")
+    return (partes[0] == "scrypt" and len(partes) == 6) or (partes[0] == "pbkdf2_sha256" and len(partes) == 4)
+
+def verificar(password, guardado):
+    """True si `password` corresponde al hash `guardado` (comparación en tiempo constante)."""
+    try:
+        partes = guardado.split("$")
+        if partes[0] == "scrypt" and len(partes) == 6:
+            costo, r, p = int(partes[1]), int(partes[2]), int(partes[3])
+            calculado = _scrypt(password, base64.b64decode(partes[4]), costo, r, p)
+            esperado = base64.b64decode(partes[5])
+        elif partes[0] == "pbkdf2_sha256" and len(partes) == 4:
+            calculado = _pbkdf2(password, base64.b64decode(partes[2]), int(partes[1]))
+            esperado = base64.b64decode(partes[3])
+        else:
+            return False
+    except (ValueError, TypeError, AttributeError):
+        return False
+    return hmac.compare_digest(calculado, esperado)
+
+def necesita_rehash(guardado):
+    """True si el hash se calculó con otro algoritmo o costo que los actuales."""
+    partes = guardado.split("$")
+    if USAR_SCRYPT:
+        return partes[0] != "scrypt" or partes[1:4] != [str(COSTO_SCRYPT), str(BLOQUE_SCRYPT), str(PARALELO_SCRYPT)]
+    return partes[0] != "pbkdf2_sha256" or partes[1] != str(ITERACIONES_PBKDF2)
+
+# Hash de referencia para tardar lo mismo cuando el usuario no existe (no revela qué nombres hay)
+_HASH_FICTICIO = None
+
+def verificar_ficticio(password):
+    global _HASH_FICTICIO
+    if _HASH_FICTICIO is None:
+        _HASH_FICTICIO = hashear("")
+    verificar(password, _HASH_FICTICIO)
+    return False
+
+def calibrar(milisegundos):
+    """El mayor costo cuyo hash tarda a lo sumo `milisegundos` en esta máquina (log2 N o iteraciones)."""
+    if USAR_SCRYPT:
+        costo = 10
+        while costo < 22:
+            inicio = time.perf_counter()
+            _scrypt("calibrar", b"\0" * LARGO_SAL, costo + 1, BLOQUE_SCRYPT, PARALELO_SCRYPT)
+            if (time.perf_counter() - inicio) * 1000 > milisegundos:
+                break
+            costo += 1
+        return costo
+    inicio = time.perf_counter()
+    _pbkdf2("calibrar", b"\0" * LARGO_SAL, 100000)
+    return int(100000 * milisegundos / ((time.perf_counter() - inicio) * 1000))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Costo del hash de contraseñas")
+    parser.add_argument("--calibrar", type=float, default=100, metavar="MS",
+                        help="tiempo por intento de ingreso que se acepta en esta máquina (por defecto 100 ms)")
+    args = parser.parse_args()
+    costo = calibrar(args.calibrar)
+    if USAR_SCRYPT:
+        print(f"STOCK_COSTO_SCRYPT={costo}  (scrypt N=2^{costo}, {128 * BLOQUE_SCRYPT * 2 ** costo // 2 ** 20} MiB)")
+    else:
+        print(f"STOCK_ITERACIONES_PBKDF2={costo}")
@@ -0,0 +1,184 @@
+"""
+Exportación e importación de CSV por flujo para el Sistema de Inventario y Ventas.
+Las filas se leen y se escriben en bloques, así que exportar o importar años de
+ventas usa memoria constante. Si la ruta termina en .gz el archivo va comprimido.
+(Las funciones que tocan el inventario y las ventas están en main.py.)
+"""
+
+import csv
+import datetime
+import gzip
+import os
+
+import dinero
+
+# "Venta" numera las ventas de una misma fecha y hora (1, 2, ...): al importar, dos ventas del
+# mismo segundo siguen siendo dos. Va al final para poder seguir agregando a un CSV anterior.
+ENCABEZADO_VENTAS = ["Fecha", "Producto", "Cantidad", "Subtotal", "Venta"]
+BLOQUE = 5000  # filas por escritura (y cada cuántas filas se informa el avance)
+
+def abrir(ruta, modo):
+    """Abre un CSV de texto ('r', 'w' o 'a'), comprimido con gzip si la ruta termina en .gz."""
+    if ruta.endswith(".gz"):
+        return gzip.open(ruta, modo + "t", encoding="utf-8", newline="")
+    return open(ruta, modo, encoding="utf-8", newline="")
+
+def en_bloques(filas, tamano=BLOQUE):
+    tanda = []
+    for fila in filas:
+        tanda.append(fila)
+        if len(tanda) >= tamano:
+            yield tanda
+            tanda = []
+    if tanda:
+        yield tanda
+
+# ---------------- exportación ---------------- #
+
+def numerar(ventas):
+    """Flujo de (número, venta): las ventas de una misma fecha y hora se numeran 1, 2, ... en orden."""
+    anterior, numero = None, 0
+    for venta in ventas:
+        numero = numero + 1 if venta["fecha"] == anterior else 1
+        anterior = venta["fecha"]
+        yield numero, venta
+
+def filas_de_ventas(ventas, producto=None):
+    """Una fila por ítem vendido de un flujo de numerar(); con `producto` solo las de ese nombre
+    (sin distinguir mayúsculas)."""
+    clave = producto.strip().casefold() if producto else None
+    for numero, venta in ventas:
+        for item in venta["items"]:
+            if clave is None or item["nombre"].casefold() == clave:
+                yield [venta["fecha"], item["nombre"], item["cantidad"], f"{item['subtotal']:.2f}", numero]
+
+def escribir_filas(ruta, filas, encabezado, agregar=False, progreso=None):
+    """Escribe las filas por bloques y devuelve cuántas escribió.
+
+    Con `agregar` continúa el archivo existente (el encabezado solo va si está vacío);
+    si no, escribe un temporal y lo renombra al terminar, para no dejar un CSV a medias.
+    """
+    if agregar:
+        destino = ruta
+        nuevo = not os.path.exists(ruta) or os.path.getsize(ruta) == 0
+    else:
+        destino = f"{ruta}.{os.getpid()}.tmp{'.gz' if ruta.endswith('.gz') else ''}"
+        nuevo = True
+    escritas = 0
+    with abrir(destino, "a" if agregar else "w") as f:
+        escritor = csv.writer(f)
+        if nuevo:
+            escritor.writerow(encabezado)
+        for tanda in en_bloques(filas):
+            escritor.writerows(tanda)
+            escritas += len(tanda)
+            if progreso:
+                progreso(escritas)
+    if not agregar:
+        os.replace(destino, ruta)
+    return escritas
+
+# ---------------- importación ---------------- #
+
+def leer_filas(ruta, obligatorias, progreso=None):
+    """Flujo de (número de línea, {columna: valor}) con los encabezados en minúsculas.
+
+    Cada elemento de `obligatorias` es un nombre de columna o una tupla de alternativas.
+    """
+    with abrir(ruta, "r") as f:
+        lector = csv.reader(f)
+        encabezado = [c.strip().casefold() for c in next(lector, [])]
+        for columna in obligatorias:
+            opciones = columna if isinstance(columna, tuple) else (columna,)
+            if not any(c in encabezado for c in opciones):
+                raise ValueError(f"Falta la columna '{' o '.join(opciones)}' en {os.path.basename(ruta)}.")
+        for numero, fila in enumerate(lector, start=2):
+            if progreso and (numero - 1) % BLOQUE == 0:
+                progreso(numero - 1)
+            if not any(c.strip() for c in fila):
+                continue
+            yield numero, dict(zip(encabezado, (c.strip() for c in fila)))
+
+def _numero(texto, tipo, campo, numero):
+    try:
+        valor = tipo(texto.replace("$", "").replace(",", ".") if tipo is float else texto)
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f"Línea {numero}: valor de {campo} no válido ({texto!r}).") from None
+    if valor < 0:
+        raise ValueError(f"Línea {numero}: el {campo} debe ser positivo.")
+    return valor
+
+def _con_signo(texto, tipo, campo, numero):
+    """Número que puede ser negativo (deltas y porcentajes); vacío = 0."""
+    if not texto:
+        return tipo(0)
+    try:
+        return tipo(texto.replace("%", "").replace(",", ".") if tipo is float else texto.lstrip("+"))
+    except ValueError:
+        raise ValueError(f"Línea {numero}: valor de {campo} no válido ({texto!r}).") from None
+
+def leer_ventas(ruta, progreso=None):
+    """Flujo de ventas armadas desde un CSV con el formato de la exportación.
+
+    Las filas seguidas con la misma fecha y hora y el mismo número de venta forman una sola
+    venta (sin la columna Venta, como en los CSV anteriores, alcanza con la fecha y hora).
+    """
+    venta = None
+    actual = None  # (fecha, número de venta) de `venta`
+    for numero, fila in leer_filas(ruta, [c.casefold() for c in ENCABEZADO_VENTAS[:4]], progreso):
+        fecha = fila.get("fecha", "")
+        try:
+            datetime.datetime.strptime(fecha, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            raise ValueError(f"Línea {numero}: fecha no válida ({fecha!r}), use YYYY-MM-DD HH:MM:SS.") from None
+        nombre = fila.get("producto", "")
+        if not nombre:
+            raise ValueError(f"Línea {numero}: falta el producto.")
+        cantidad = _numero(fila.get("cantidad"), int, "cantidad", numero)
+        if cantidad == 0:
+            raise ValueError(f"Línea {numero}: la cantidad debe ser mayor a cero.")
+        subtotal = dinero.exacto(_numero(fila.get("subtotal"), float, "subtotal", numero))
+        if venta is not None and actual != (fecha, fila.get("venta", "")):
+            yield _con_total(venta)
+            venta = None
+        if venta is None:
+            venta = {"fecha": fecha, "items": [], "total": 0.0, "cliente": "", "proxima_visita": ""}
+            actual = (fecha, fila.get("venta", ""))
+        venta["items"].append({"nombre": nombre, "cantidad": cantidad, "subtotal": subtotal})
+    if venta is not None:
+        yield _con_total(venta)
+
+def _con_total(venta):
+    venta["total"] = dinero.pesos(dinero.sumar(item["subtotal"] for item in venta["items"]))
+    return venta
+
+def leer_precios(ruta, progreso=None):
+    """Flujo de (número de línea, id o None, nombre, precio) de una lista de precios de proveedor.
+
+    Columnas: 'precio' y 'id' o 'producto'/'nombre' para identificar el artículo.
+    """
+    for numero, fila in leer_filas(ruta, ["precio", ("id", "producto", "nombre")], progreso):
+        pid = fila.get("id") or None
+        if pid is not None:
+            pid = _numero(pid, int, "ID", numero)
+        nombre = fila.get("producto") or fila.get("nombre") or ""
+        if pid is None and not nombre:
+            raise ValueError(f"Línea {numero}: falta el ID o el nombre del producto.")
+        yield numero, pid, nombre, dinero.exacto(_numero(fila.get("precio"), float, "precio", numero))
+
+def leer_movimientos(ruta, progreso=None):
+    """Flujo de (número de línea, id o None, nombre, delta de stock, % de cambio de precio) de un lote.
+
+    Columnas: 'id' o 'producto'/'nombre', y 'stock' (unidades a sumar o restar, p. ej. +24 o -3)
+    y/o 'porcentaje' (cambio de precio, p. ej. 10 o -5).
+    """
+    for numero, fila in leer_filas(ruta, [("id", "producto", "nombre"), ("stock", "porcentaje")], progreso):
+        pid = fila.get("id") or None
+        if pid is not None:
+            pid = _numero(pid, int, "ID", numero)
+        nombre = fila.get("producto") or fila.get("nombre") or ""
+        if pid is None and not nombre:
+            raise ValueError(f"Línea {numero}: falta el ID o el nombre del producto.")
+        delta = _con_signo(fila.get("stock"), int, "stock", numero)
+        porcentaje = _con_signo(fila.get("porcentaje"), float, "porcentaje", numero)
+        yield numero, pid, nombre, delta, porcentaje
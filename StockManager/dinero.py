@@ -0,0 +1,53 @@
+"""
+Montos de dinero exactos para el Sistema de Inventario y Ventas.
+
+Todas las cuentas se hacen en centavos enteros; los archivos JSON y las pantallas
+siguen mostrando pesos con dos decimales. Pasar de pesos a centavos redondea una
+sola vez, con una regla fija (mitad hacia arriba, como en caja), a partir del
+decimal que se escribió y no del binario del float: 2.675 son 268 centavos.
+Sumar centavos es exacto y rápido, así que los totales no acumulan errores
+aunque se sumen millones de ventas.
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+CENTAVO = Decimal("0.01")
+REDONDEO = ROUND_HALF_UP
+
+def centavos(monto):
+    """Pesos (float, int, str o Decimal) -> centavos enteros, redondeando al centavo."""
+    try:
+        if isinstance(monto, int):
+            return monto * 100
+        if isinstance(monto, float):
+            rapido = round(monto * 100)
+            if rapido / 100 == monto:
+                return rapido  # camino rápido: el monto ya está en centavos justos (el caso común)
+            monto = repr(monto)  # el decimal más corto que representa al float, no su valor binario
+        return int((Decimal(monto) / CENTAVO).quantize(Decimal(1), rounding=REDONDEO))
+    except (InvalidOperation, ValueError, TypeError, OverflowError):
+        raise ValueError(f"Monto no válido ({monto!r}).") from None
+
+def pesos(centavos):
+    """Centavos -> pesos como float, para JSON y formatos con :.2f (exacto hasta billones)."""
+    return centavos / 100
+
+def exacto(monto):
+    """El monto redondeado al centavo, como float en pesos."""
+    return pesos(centavos(monto))
+
+def es_exacto(monto):
+    """True si el monto ya está expresado en centavos justos."""
+    return pesos(centavos(monto)) == monto
+
+def subtotal(precio, cantidad):
+    """Precio unitario (pesos) por cantidad, en centavos."""
+    return centavos(precio) * cantidad
+
+def con_porcentaje(monto, porcentaje):
+    """Monto (pesos) con un aumento o descuento porcentual, en centavos redondeados."""
+    return int((centavos(monto) * (1 + Decimal(repr(float(porcentaje))) / 100)).quantize(Decimal(1), rounding=REDONDEO))
+
+def sumar(montos):
+    """Suma de montos en pesos, en centavos (cada uno se redondea antes de sumar)."""
+    return sum(centavos(m) for m in montos)
@@ -0,0 +1,242 @@
+"""
+Historial del inventario como eventos, para el Sistema de Inventario y Ventas.
+
+Cada operación sobre el inventario se guarda como un evento de una línea JSON, con
+número correlativo, fecha y tipo:
+  alta     {"id", "producto"}                      producto nuevo (con su stock inicial)
+  baja     {"id", "producto"}                      producto eliminado (tal como estaba)
+  cambio   {"id", "campos", "antes"}               nombre, precio y/o códigos
+  stock    {"id", "delta"}                         ajuste de stock (se guarda la diferencia)
+  lote     {"cambios": [[id, delta, precio antes, precio]]}   lote de stock/precios o lista de precios
+  venta    {"items": [[id, cantidad]]}             stock que se llevó una venta
+  deshacer {"de": n} / rehacer {"de": n}           vuelven atrás (o repiten) el evento n
+El stock se guarda como diferencias, así deshacer un ajuste no pisa lo que se vendió
+después. El historial nunca se reescribe: deshacer también es un evento.
+Un alta o una baja guardan el producto entero, así que solo se deshacen (o rehacen)
+mientras ningún evento posterior tocó ese producto (ver verificar_deshacer).
+
+Cada INSTANTANEA_CADA eventos se guarda una instantánea del estado completo; para saber
+cómo estaba el inventario en una fecha se parte de la última instantánea anterior y solo
+se repasan los eventos que siguen, aunque haya años de historial.
+
+El estado de los eventos no descuenta las reservas de carritos abiertos: son transitorias
+y el stock sale del historial recién cuando la venta se confirma.
+(Este módulo no depende de main.py: las funciones de archivo reciben las rutas.)
+"""
+
+import bisect
+import json
+import os
+
+INSTANTANEA_CADA = 500  # eventos entre una instantánea y la siguiente
+MAX_DESHACER = 20       # operaciones que se pueden deshacer seguidas
+DESHACIBLES = ("alta", "baja", "cambio", "stock", "lote")
+
+# ---------------- estado ---------------- #
+
+def estado_inicial(productos, siguiente_id, fecha, n=0):
+    """Estado de partida del historial: {"n", "fecha", "siguiente_id", "productos": {id: producto},
+    "deshacer", "rehacer", "tocado": {id: n del último evento que cambió el producto}}."""
+    return {"n": n, "fecha": fecha, "siguiente_id": siguiente_id,
+            "productos": {p["id"]: dict(p, codigos=list(p.get("codigos", []))) for p in productos},
+            "deshacer": [], "rehacer": [], "tocado": {}}
+
+def ids_de(evento):
+    """IDs de los productos que cambia un evento (sin contar deshacer/rehacer)."""
+    tipo = evento["tipo"]
+    if tipo in ("alta", "baja", "cambio", "stock"):
+        return [evento["id"]]
+    if tipo == "lote":
+        return [c[0] for c in evento["cambios"]]
+    if tipo == "venta":
+        return [pid for pid, _ in evento["items"]]
+    return []
+
+def verificar_deshacer(estado, evento):
+    """ValueError si deshacer (o rehacer) `evento` restauraría un producto viejo.
+
+    Un alta o una baja vuelven a poner el producto tal como se guardó; si después otro evento
+    cambió su stock o sus datos, eso se perdería (las unidades vendidas volverían al stock).
+    """
+    if evento["tipo"] in ("alta", "baja") and estado.get("tocado", {}).get(evento["id"], evento["n"]) != evento["n"]:
+        raise ValueError(f"El producto (ID: {evento['id']}) cambió después de esa operación; "
+                         "ya no se puede deshacer ni rehacer.")
+
+def efectos(evento, inverso=False):
+    """Cambios elementales de un evento (o los que lo deshacen):
+    ("alta", producto), ("baja", id), ("campos", id, {campo: valor}) y ("stock", id, delta)."""
+    tipo = evento["tipo"]
+    signo = -1 if inverso else 1
+    if tipo == "alta":
+        return [("baja", evento["id"])] if inverso else [("alta", evento["producto"])]
+    if tipo == "baja":
+        return [("alta", evento["producto"])] if inverso else [("baja", evento["id"])]
+    if tipo == "cambio":
+        return [("campos", evento["id"], evento["antes"] if inverso else evento["campos"])]
+    if tipo == "stock":
+        return [("stock", evento["id"], signo * evento["delta"])]
+    if tipo == "lote":
+        cambios = []
+        # Al deshacer se recorre al revés: un mismo producto puede aparecer más de una vez
+        for pid, delta, antes, precio in (reversed(evento["cambios"]) if inverso else evento["cambios"]):
+            if delta:
+                cambios.append(("stock", pid, signo * delta))
+            if antes != precio:
+                cambios.append(("campos", pid, {"precio": antes if inverso else precio}))
+        return cambios
+    if tipo == "venta":
+        if inverso:
+            raise ValueError("Una venta no se deshace desde el historial.")
+        return [("stock", pid, -cantidad) for pid, cantidad in evento["items"]]
+    raise ValueError(f"Evento de inventario desconocido ({tipo}).")
+
+def _aplicar_efectos(productos, cambios):
+    for cambio in cambios:
+        if cambio[0] == "alta":
+            producto = cambio[1]
+            productos[producto["id"]] = dict(producto, codigos=list(producto.get("codigos", [])))
+        elif cambio[0] == "baja":
+            productos.pop(cambio[1], None)
+        elif cambio[1] in productos:  # el producto pudo borrarse antes en otra caja
+            if cambio[0] == "campos":
+                productos[cambio[1]].update(cambio[2])
+            else:
+                productos[cambio[1]]["stock"] += cambio[2]
+
+def _sacar(pila, n):
+    for i in range(len(pila) - 1, -1, -1):
+        if pila[i]["n"] == n:
+            return pila.pop(i)
+    return None
+
+def _tocar(estado, evento):
+    """Anota qué productos cambió `evento`; deshacer o rehacer un evento cuenta como ese mismo evento."""
+    tocado = estado.setdefault("tocado", {})
+    for pid in ids_de(evento):
+        tocado[pid] = evento["n"]
+
+def aplicar(estado, evento):
+    """Aplica un evento al estado (lo modifica en el lugar)."""
+    tipo = evento["tipo"]
+    if tipo == "deshacer":
+        original = _sacar(estado["deshacer"], evento["de"])
+        if original is not None:
+            _aplicar_efectos(estado["productos"], efectos(original, inverso=True))
+            _tocar(estado, original)
+            estado["rehacer"].append(original)
+    elif tipo == "rehacer":
+        original = _sacar(estado["rehacer"], evento["de"])
+        if original is not None:
+            _aplicar_efectos(estado["productos"], efectos(original))
+            _tocar(estado, original)
+            estado["deshacer"].append(original)
+    else:
+        _aplicar_efectos(estado["productos"], efectos(evento))
+        _tocar(estado, evento)
+        if tipo in DESHACIBLES:
+            estado["deshacer"].append(evento)
+            del estado["deshacer"][:-MAX_DESHACER]
+            estado["rehacer"].clear()
+        if tipo == "alta":
+            estado["siguiente_id"] = max(estado["siguiente_id"], evento["id"] + 1)
+    estado["n"], estado["fecha"] = evento["n"], evento["fecha"]
+
+def a_json(estado):
+    """El estado listo para json.dump (productos como lista ordenada por ID)."""
+    return dict(estado, productos=[estado["productos"][pid] for pid in sorted(estado["productos"])])
+
+def desde_json(datos):
+    # En JSON las claves de "tocado" son textos; las instantáneas anteriores no lo tienen
+    return dict(datos, productos={p["id"]: p for p in datos["productos"]},
+                tocado={int(pid): n for pid, n in datos.get("tocado", {}).items()})
+
+def describir(evento):
+    """Una línea para mostrar qué hizo un evento."""
+    tipo = evento["tipo"]
+    if tipo in ("alta", "baja"):
+        return f"{'Alta' if tipo == 'alta' else 'Baja'} de {evento['producto']['nombre']} (ID: {evento['id']})"
+    if tipo == "cambio":
+        return f"Cambio de {', '.join(evento['campos'])} (ID: {evento['id']})"
+    if tipo == "stock":
+        return f"Stock {evento['delta']:+d} (ID: {evento['id']})"
+    if tipo == "lote":
+        return f"Lote de {len(evento['cambios'])} productos"
+    if tipo == "venta":
+        return f"Venta de {sum(c for _, c in evento['items'])} unidades"
+    return f"{tipo.capitalize()} evento {evento['de']}"
+
+# ---------------- archivos (almacenamiento JSON) ---------------- #
+
+def agregar_evento(ruta, evento):
+    """Agrega el evento al final del archivo; devuelve la posición (bytes) después de él.
+
+    No se fuerza a disco (os.fsync): el historial es tan durable como el inventario, que
+    también se escribe de forma diferida, y así cada venta no paga dos escrituras forzadas.
+    """
+    with open(ruta, "ab") as f:
+        f.write((json.dumps(evento, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8"))
+        f.flush()
+        return f.tell()
+
+def leer_eventos(ruta, posicion=0, hasta=None):
+    """Eventos desde la posición dada, como (evento, posición siguiente); con `hasta`
+    ('YYYY-MM-DD hh:mm:ss') se detiene en el primero posterior a esa fecha."""
+    if not os.path.exists(ruta):
+        return
+    with open(ruta, "rb") as f:
+        f.seek(posicion)
+        for linea in f:
+            if not linea.endswith(b"\n"):
+                return  # línea a medio escribir: se lee la próxima vez
+            posicion += len(linea)
+            try:
+                evento = json.loads(linea)
+            except ValueError:
+                continue
+            if hasta is not None and evento["fecha"] > hasta:
+                return
+            yield evento, posicion
+
+def _nombre_instantanea(estado):
+    return f"{estado['fecha'].replace('-', '').replace(' ', '').replace(':', '')}-{estado['n']:09d}.json"
+
+def guardar_instantanea(carpeta, estado, posicion):
+    """Guarda el estado y la posición del archivo de eventos hasta donde llega."""
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, _nombre_instantanea(estado))
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"posicion": posicion, "estado": a_json(estado)}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporal, ruta)
+
+def leer_instantaneas(carpeta):
+    """Todas las instantáneas de la carpeta en orden (al importar a SQLite); saltea las dañadas."""
+    if not os.path.isdir(carpeta):
+        return
+    for nombre in sorted(n for n in os.listdir(carpeta) if n.endswith(".json")):
+        try:
+            with open(os.path.join(carpeta, nombre), "r", encoding="utf-8") as f:
+                yield desde_json(json.load(f)["estado"])
+        except (OSError, ValueError, KeyError):
+            continue
+
+def leer_instantanea(carpeta, hasta=None):
+    """(estado, posición) de la última instantánea con fecha <= `hasta` (o la última), o None.
+
+    Los nombres de archivo empiezan con la fecha, así que se ubica por bisección sin abrir las demás.
+    """
+    if not os.path.isdir(carpeta):
+        return None
+    nombres = sorted(n for n in os.listdir(carpeta) if n.endswith(".json"))
+    fin = len(nombres)
+    if hasta is not None:
+        clave = hasta.replace("-", "").replace(" ", "").replace(":", "")
+        fin = bisect.bisect_right(nombres, f"{clave}-999999999.json")
+    for nombre in reversed(nombres[:fin]):
+        try:
+            with open(os.path.join(carpeta, nombre), "r", encoding="utf-8") as f:
+                datos = json.load(f)
+            return desde_json(datos["estado"]), datos["posicion"]
+        except (OSError, ValueError, KeyError):
+            continue  # instantánea dañada: sirve la anterior
+    return None
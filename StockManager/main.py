@@ -11,10 +11,30 @@ Requisitos: Python 3.x – sin librerías externas
 import datetime
 import os
 import json
-import csv
+import hashlib
+import marshal
+import shutil
+import bisect
+import math
+import atexit
+import threading
+import contextlib
+import collections
+import socket
+import unicodedata
 from colorama import init, Fore, Style
 init(autoreset=True)
 import sys
+import almacen_sqlite
+import analitica
+import credenciales
+import csv_ventas
+import dinero
+import bitacora
+import historial
+import metricas
+import reposicion
+import ventas_compactas
 
 # --- Tecla rápida multiplataforma ---
 try:
@@ -33,6 +53,26 @@ except ImportError:
             termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
         return ch
 
+# --- Bloqueo de archivos entre procesos ---
+try:
+    import fcntl
+    def bloquear_archivo(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    def desbloquear_archivo(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+except ImportError:
+    def bloquear_archivo(f):
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+    def desbloquear_archivo(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
 # --- Rutas absolutas ---
 if getattr(sys, 'frozen', False):
     BASE_DIR = os.path.dirname(sys.executable)
@@ -40,12 +80,38 @@ else:
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 INVENTARIO_FILE = os.path.join(BASE_DIR, "inventario.json")
-VENTAS_FILE = os.path.join(BASE_DIR, "registro_ventas.txt")
+VENTAS_FILE = os.path.join(BASE_DIR, "registro_ventas.txt")          # diario JSON Lines (una venta por línea)
+VENTAS_ANTIGUO = os.path.join(BASE_DIR, "registro_ventas.json.bak")  # copia del formato anterior (arreglo JSON)
+VENTAS_CACHE = os.path.join(BASE_DIR, "ventas.cache")                # copia binaria de las ventas cargadas (se puede borrar)
 USUARIOS_FILE = os.path.join(BASE_DIR, "usuarios.json")
-CAJA_FILE = os.path.join(BASE_DIR, "caja.json")
+CAJA_FILE = os.path.join(BASE_DIR, "caja.json")                    # sesiones de caja abiertas
+CIERRES_FILE = os.path.join(BASE_DIR, "cierres_caja.jsonl")         # sesiones cerradas (reportes Z), una por línea
 VENTAS_CSV = os.path.join(BASE_DIR, "ventas.csv")
-LOG_FILE = os.path.join(BASE_DIR, "bitacora_sesiones.txt")
+EXPORTACION_FILE = os.path.join(BASE_DIR, "exportacion_ventas.json")  # última venta exportada a cada CSV
+LOG_FILE = os.path.join(BASE_DIR, "bitacora.jsonl")                 # bitácora de eventos (JSON Lines, se rota sola)
+LOG_ANTIGUO = os.path.join(BASE_DIR, "bitacora_sesiones.txt")       # bitácora de texto anterior (se migra una vez)
+RESUMEN_FILE = os.path.join(BASE_DIR, "resumen_ventas.json")        # acumulados para reportes
 CLIENTES_FILE = os.path.join(BASE_DIR, "clientes.json")
+EVENTOS_FILE = os.path.join(BASE_DIR, "eventos_inventario.jsonl")  # historial del inventario (ver historial.py)
+INSTANTANEAS_DIR = os.path.join(BASE_DIR, "instantaneas_inventario")  # estado del historial cada tantos eventos
+METRICAS_FILE = os.path.join(BASE_DIR, "metricas.jsonl")            # métricas de rendimiento (ver metricas.py)
+PERFILES_DIR = os.path.join(BASE_DIR, "perfiles")                   # perfiles cProfile pedidos por un admin
+DB_FILE = os.path.join(BASE_DIR, "stock.db")
+
+# Almacenamiento: "json" (archivos sueltos, por defecto) o "sqlite" (DB_FILE en modo WAL)
+ALMACEN = os.environ.get("STOCK_ALMACEN", "json").strip().lower()
+VENTANA_ESCRITURA = 2.0  # segundos en que varios cambios se agrupan en una sola escritura
+# Varias cajas sobre el mismo BASE_DIR: STOCK_MULTITERMINAL=1 y, opcionalmente, STOCK_TERMINAL=<nombre de la caja>
+MULTITERMINAL = os.environ.get("STOCK_MULTITERMINAL", "") == "1"
+TERMINAL = os.environ.get("STOCK_TERMINAL") or f"{socket.gethostname()}-{os.getpid()}"
+RESERVA_MINUTOS = 30     # una reserva de carrito más vieja que esto se devuelve al stock
+INTENTOS_LIBRES = 3      # contraseñas incorrectas seguidas antes de empezar a bloquear al usuario
+ESPERA_BASE = 5          # segundos de bloqueo tras el primer exceso; se duplica con cada nuevo fallo
+ESPERA_MAXIMA = 15 * 60
+DESCONOCIDOS_MAXIMO = 1000  # nombres inexistentes cuyos fallos se recuerdan (los más viejos se olvidan)
+PASSWORD_INICIAL = "admin"  # la del usuario admin que se crea sin usuarios; se pide cambiarla al entrar
+# Segundos entre volcados de métricas a METRICAS_FILE (0 = solo al salir); STOCK_PERFILAR=<operación> la perfila una vez
+METRICAS_CADA = int(os.environ.get("STOCK_METRICAS_CADA", metricas.VOLCADO_CADA))
 
 # ---------------- utilidades y presentación ---------------- #
 
@@ -88,6 +154,14 @@ Opciones principales:
 7. Reporte de ventas: Accede a reportes y estadísticas.
 8. Eliminar producto (solo admin): Borra un producto del inventario.
 9. Registrar usuario (solo admin): Crea nuevos usuarios.
+C. Registrar cliente: Da de alta un cliente y, si quieres, la fecha de su próxima visita.
+V. Próximas visitas: Lista los clientes con visita prevista entre dos fechas.
+L. Lote de stock / precios: Aplica un CSV de entradas de stock y cambios de precio, todo junto o nada.
+R. Sugerencias de reposición: Qué productos conviene reponer y cuánto, según su ritmo de venta.
+Z. Cierre de caja: Cierra la caja con el reporte Z (y, si quieres, abre otra).
+D. Deshacer / rehacer (solo admin): Vuelve atrás el último cambio de inventario (o lo repite).
+B. Consultar bitácora (solo admin): Busca eventos por usuario, tipo de evento, producto o fechas.
+P. Rendimiento (solo admin): Tiempos de cargas, guardados, ventas y reportes; perfil de una operación.
 0. Salir: Cierra el sistema.
 
 Consejos:
@@ -100,153 +174,2006 @@ def timestamp():
     """Devuelve fecha y hora actual en string ISO (YYYY‑MM‑DD HH:MM:SS)."""
     return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def escribir_log(linea, ruta):
-    """Agrega la línea al archivo indicado (creándolo si no existe)."""
-    with open(ruta, "a", encoding="utf-8") as f:
-        f.write(linea + "\n")
+usuario_actual = None  # usuario con la sesión abierta (para la bitácora)
+_bitacora = None       # hilo que escribe la bitácora
 
-def escribir_log_evento(evento, detalle=""):
-    """Registra un evento con fecha y hora en el archivo de bitácora."""
-    momento = timestamp()
-    linea = f"{momento} | {evento}"
+@metricas.medido("bitácora (encolar)")
+def escribir_log_evento(evento, detalle="", producto=None, usuario=None):
+    """Registra un evento en la bitácora; lo escribe un hilo aparte, sin frenar la caja."""
+    registro = {"fecha": timestamp(), "evento": evento}
+    if usuario or usuario_actual:
+        registro["usuario"] = usuario or usuario_actual["nombre"]
+    if producto is not None:
+        registro["producto"] = producto
     if detalle:
-        linea += f" | {detalle}"
-    escribir_log(linea, LOG_FILE)
+        registro["detalle"] = detalle
+    escritor_bitacora().registrar(registro)
 
-def exportar_ventas_csv(ventas):
-    with open(VENTAS_CSV, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["Fecha", "Producto", "Cantidad", "Subtotal"])
-        for venta in ventas:
-            for item in venta["items"]:
-                writer.writerow([venta["fecha"], item["nombre"], item["cantidad"], f"{item['subtotal']:.2f}"])
+def escritor_bitacora():
+    """Hilo de bitácora para LOG_FILE; la primera vez migra la bitácora de texto anterior."""
+    global _bitacora
+    if _bitacora is None or _bitacora.ruta != LOG_FILE:
+        vaciar_bitacora()
+        bloqueo = (lambda: bloqueo_archivo(LOG_FILE)) if MULTITERMINAL else None
+        with bloqueo() if bloqueo else contextlib.nullcontext():
+            if os.path.exists(LOG_ANTIGUO):
+                bitacora.migrar_texto(LOG_ANTIGUO, LOG_FILE)
+        _bitacora = bitacora.Escritor(LOG_FILE, bloqueo)
+        _bitacora.start()
+    return _bitacora
+
+def vaciar_bitacora():
+    """Espera a que los eventos encolados estén en disco (al cerrar sesión y al salir)."""
+    if _bitacora is not None:
+        _bitacora.vaciar()
+
+atexit.register(vaciar_bitacora)
+
+def iniciar_metricas():
+    """Empieza el volcado periódico de métricas (menús, servidor.py y comandos.py)."""
+    metricas.iniciar_volcado(METRICAS_FILE, METRICAS_CADA, {"terminal": TERMINAL, "almacen": ALMACEN})
+    if os.environ.get("STOCK_PERFILAR"):
+        metricas.perfilar(os.environ["STOCK_PERFILAR"], PERFILES_DIR)
+
+# ---------------- escritura segura y diferida ---------------- #
+
+pendientes = {}       # nombre -> función que escribe esos datos (cambios aún no guardados)
+_temporizador = None
+# Lo toman los cambios en memoria y las escrituras diferidas: nunca se escribe a medio cambiar
+_bloqueo_escritura = threading.RLock()
+
+def escribir_json_atomico(ruta, datos, **opciones):
+    """Escribe JSON en un temporal, lo fuerza a disco y lo renombra sobre `ruta`."""
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with metricas.medir(f"escribir {os.path.basename(ruta)}"):
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False, **opciones)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+
+def marcar_pendiente(nombre, escritor):
+    """Anota que hay cambios por guardar; se escriben juntos al cerrar la ventana de escritura."""
+    global _temporizador
+    with _bloqueo_escritura:
+        pendientes[nombre] = escritor
+        if _temporizador is None:
+            _temporizador = threading.Timer(VENTANA_ESCRITURA, _vaciar_por_tiempo)
+            _temporizador.daemon = True
+            _temporizador.start()
+
+@metricas.medido("escritura diferida (vaciar pendientes)")
+def vaciar_pendientes():
+    """Escribe ahora todos los cambios pendientes (al cerrar sesión, al salir o al vencer la ventana)."""
+    global _temporizador
+    with _bloqueo_escritura:
+        if _temporizador is not None:
+            _temporizador.cancel()
+            _temporizador = None
+        while pendientes:
+            nombre, escritor = pendientes.popitem()
+            try:
+                escritor()
+            except BaseException:
+                marcar_pendiente(nombre, escritor)  # no se pierde: se reintenta en la próxima ventana
+                raise
+
+def _vaciar_por_tiempo():
+    try:
+        vaciar_pendientes()
+    except (OSError, ValueError) as e:
+        print(Fore.RED + f"\n⚠ No se pudieron guardar los cambios ({e}); se reintenta en {VENTANA_ESCRITURA} s.")
+
+atexit.register(vaciar_pendientes)
+
+def apartar_archivo_danado(ruta):
+    """Renombra un archivo ilegible para que la próxima escritura no lo pise."""
+    destino = f"{ruta}.danado-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
+    os.replace(ruta, destino)
+    print(Fore.RED + f"⚠ No se pudo leer {os.path.basename(ruta)}. Se guardó una copia en {destino}.")
 
 # ---------------- datos en memoria y persistencia ---------------- #
 
 inventario = []        # cada item: {"id": int, "nombre": str, "precio": float, "stock": int}
 siguiente_id = 1
-ventas = []           # cada venta: {"fecha": str, "items": [{"nombre": str, "cantidad": int, "subtotal": float}], "total": float}
-usuarios = []         # cada usuario: {"nombre": str, "password": str, "rol": str}
-clientes = []         # cada cliente: {"nombre": str, "proxima_visita": str}
+ventas = ventas_compactas.Ventas()  # cada venta: {"fecha": str, "items": [{"nombre": str, "cantidad": int, "subtotal": float}], "total": float}
+ventas_agregadas = 0  # ventas agregadas al diario desde la última compactación
+COMPACTAR_CADA = 1000
+CACHE_VERSION = 1     # formato de VENTAS_CACHE
+CACHE_MINIMO = 1000   # ventas nuevas (no tomadas de la copia) a partir de las cuales se reescribe la copia
+_carga_ventas = None  # hilo que carga las ventas mientras se inicia sesión (ver esperar_ventas)
+resumen = {}          # acumulados de reportes: ver nuevo_resumen()
+ventas_por_producto = None  # normalizar(nombre) -> [índices en `ventas`], se arma al primer uso
+tabla_analitica = None      # `ventas` por columnas para el análisis (ver analitica.py), se arma al primer uso
+# En SQLite las ventas no se cargan en `ventas`: los reportes las consultan en la base
+nombres_vendidos = None     # normalizar(nombre) -> {nombres con que se vendió}, se arma al primer uso
+_tabla_hasta_id = 0         # id de la última venta ya agregada a `tabla_analitica` (SQLite)
+# Los índices que se arman al primer uso se publican recién completos (lecturas en paralelo de servidor.py)
+_bloqueo_indices = threading.Lock()
+usuarios = []         # cada usuario: {"nombre": str, "password": hash (ver credenciales.py), "rol": str, "fallos": int, "bloqueado_hasta": str|None}
+usuarios_por_nombre = {}  # nombre -> usuario
+fallos_desconocidos = {}  # nombre inexistente -> [fallos, bloqueado_hasta] (solo en memoria)
+clientes = []         # cada cliente: {"id": int, "nombre": str, "proxima_visita": str}
+clientes_por_clave = {}   # normalizar(nombre) -> cliente (un solo registro por cliente)
+clientes_por_id = {}      # id -> cliente
+visitas_clientes = []     # lista ordenada de (próxima visita 'YYYY-MM-DD', id) de los clientes con fecha
+siguiente_cliente_id = 1
+_firma_clientes = None    # (mtime, tamaño) de clientes.json en la última lectura/escritura propia
+_version_clientes = None  # almacen_sqlite.version_clientes() en la última lectura de clientes
+sesion_caja = None    # sesión de caja abierta en esta terminal (ver "funciones de caja")
+_historial = None     # estado del historial del inventario al día (ver historial.py), se arma al primer uso
+_historial_posicion = 0   # hasta dónde se leyeron los eventos (bytes del archivo, o número de evento en SQLite)
+_historial_iniciado = False   # ya hay una instantánea de partida (ver iniciar_historial)
+
+# Índices del catálogo (se mantienen junto con `inventario`, que sigue siendo el formato guardado)
+productos_por_id = {}       # id -> producto
+productos_por_nombre = {}   # nombre.casefold() -> [productos con ese nombre]
+orden_stock = []            # lista ordenada de (stock, id) para consultar stock bajo sin recorrer todo
+productos_por_codigo = {}   # código de barras (13 dígitos) -> producto
+productos_por_trigrama = None  # trigrama del nombre normalizado -> {ids}; se arma en la primera búsqueda
+nombres_buscables = {}         # id -> (nombre normalizado, cantidad de trigramas)
+
+_conexion = None
+_conexion_hilo = threading.local()  # conexión propia de un hilo de fondo (ver CargaVentas)
+
+def usa_sqlite():
+    return ALMACEN == "sqlite"
+
+def conexion():
+    """Conexión a la base SQLite; la primera vez importa los archivos JSON existentes."""
+    global _conexion
+    propia = getattr(_conexion_hilo, "con", None)
+    if propia is not None:
+        return propia
+    if _conexion is None:
+        _conexion = almacen_sqlite.conectar(DB_FILE)
+        with bloqueo_archivo(DB_FILE):  # que solo una caja haga la importación inicial
+            if almacen_sqlite.es_nueva(_conexion):
+                importar_json_a_sqlite(_conexion)
+    return _conexion
+
+def importar_json_a_sqlite(con):
+    """Copia a la base el contenido de inventario, ventas, usuarios, clientes y sesiones de caja en JSON."""
+    if os.path.exists(INVENTARIO_FILE):
+        with open(INVENTARIO_FILE, "r", encoding="utf-8") as f:
+            datos = json.load(f)
+        almacen_sqlite.guardar_inventario(con, datos.get("inventario", []), datos.get("siguiente_id", 1))
+    leer_diario_ventas()
+    almacen_sqlite.guardar_ventas(con, ventas)
+    if os.path.exists(USUARIOS_FILE):
+        with open(USUARIOS_FILE, "r", encoding="utf-8") as f:
+            almacen_sqlite.guardar_usuarios(con, json.load(f))
+    if os.path.exists(CLIENTES_FILE):
+        with open(CLIENTES_FILE, "r", encoding="utf-8") as f:
+            almacen_sqlite.guardar_clientes(con, json.load(f))
+    estado = leer_estado_caja()
+    abiertas = list(estado["abiertas"].values())
+    sesion = sesion_desde_anterior(estado.get("anterior"))
+    if sesion:
+        desde = ventas.posicion(sesion["apertura"])
+        abiertas.append(dict(sesion, id=estado["siguiente_id"], ventas=len(ventas) - desde,
+                             total=ventas.total_centavos(desde)))
+    almacen_sqlite.guardar_sesiones(con, leer_cierres() + abiertas)
+    almacen_sqlite.guardar_eventos(con, [evento for evento, _ in historial.leer_eventos(EVENTOS_FILE)])
+    for estado in historial.leer_instantaneas(INSTANTANEAS_DIR):
+        almacen_sqlite.guardar_instantanea(con, historial.a_json(estado))
+    almacen_sqlite.guardar_meta(con, "importado", timestamp())
+    print(Fore.YELLOW + f"Datos importados a {DB_FILE}.")
 
 def guardar_inventario():
-    with open(INVENTARIO_FILE, "w", encoding="utf-8") as f:
-        json.dump({"inventario": inventario, "siguiente_id": siguiente_id}, f, ensure_ascii=False, indent=2)
+    if usa_sqlite():
+        almacen_sqlite.guardar_inventario(conexion(), inventario, siguiente_id)
+        return
+    marcar_pendiente("inventario", escribir_inventario)
+
+@metricas.medido("guardar inventario")
+def escribir_inventario():
+    global _firma_inventario
+    escribir_json_atomico(INVENTARIO_FILE, {"inventario": inventario, "siguiente_id": siguiente_id, "reservas": reservas}, indent=2)
+    _firma_inventario = firma_archivo(INVENTARIO_FILE)
+
+def guardar_producto(producto, campos):
+    """Guarda los campos indicados de un producto (en SQLite actualiza solo esa fila)."""
+    if usa_sqlite():
+        almacen_sqlite.actualizar_producto(conexion(), producto["id"], {c: producto[c] for c in campos})
+    else:
+        guardar_inventario()
+
+def borrar_producto(producto):
+    """Persiste la baja de un producto ya quitado de `inventario`."""
+    if usa_sqlite():
+        almacen_sqlite.borrar_producto(conexion(), producto["id"])
+    else:
+        guardar_inventario()
 
+@metricas.medido("cargar inventario")
 def cargar_inventario():
-    global inventario, siguiente_id
-    if os.path.exists(INVENTARIO_FILE):
+    global inventario, siguiente_id, reservas, _firma_inventario, _version_datos
+    if usa_sqlite():
+        _version_datos = almacen_sqlite.version_datos(conexion())
+        inventario, siguiente_id = almacen_sqlite.cargar_inventario(conexion())
+    elif os.path.exists(INVENTARIO_FILE):
+        vaciar_pendientes()
         try:
             with open(INVENTARIO_FILE, "r", encoding="utf-8") as f:
                 datos = json.load(f)
                 inventario = datos.get("inventario", [])
                 siguiente_id = datos.get("siguiente_id", 1)
+                reservas = datos.get("reservas", [])
+            _firma_inventario = firma_archivo(INVENTARIO_FILE)
         except Exception as e:
+            apartar_archivo_danado(INVENTARIO_FILE)
             print("Error al cargar el inventario. Se iniciará vacío.")
             inventario = []
             siguiente_id = 1
+            reservas = []
+    indexar_inventario()
+    redondear_precios()
+    iniciar_historial()
+
+def redondear_precios():
+    """Deja en centavos justos los precios guardados como floats sueltos (datos anteriores a dinero.py)."""
+    cambiados = [p for p in inventario if not dinero.es_exacto(p["precio"])]
+    if not cambiados:
+        return
+    for p in cambiados:
+        p["precio"] = dinero.exacto(p["precio"])
+    if usa_sqlite():
+        almacen_sqlite.actualizar_productos(conexion(), [(p["id"], {"precio": p["precio"]}) for p in cambiados])
+    elif not MULTITERMINAL:
+        guardar_inventario()  # con varias cajas se guardan en la próxima escritura del inventario
 
+@metricas.medido("guardar ventas (compactación)")
 def guardar_ventas():
-    with open(VENTAS_FILE, "w", encoding="utf-8") as f:
-        json.dump(ventas, f, ensure_ascii=False, indent=2)
+    """Reescribe (compacta) el diario de ventas completo de forma atómica."""
+    global ventas_agregadas, _ventas_leidas_hasta
+    if usa_sqlite():
+        almacen_sqlite.guardar_ventas(conexion(), ventas)
+        return
+    temporal = f"{VENTAS_FILE}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        for venta in ventas:
+            f.write(json.dumps(venta, ensure_ascii=False, separators=(",", ":")) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, VENTAS_FILE)
+    ventas_agregadas = 0
+    _ventas_leidas_hasta = os.path.getsize(VENTAS_FILE)
 
-def cargar_ventas():
+def guardar_venta(venta, evento=None):
+    """Agrega una venta al diario (fechada con el diario bloqueado, tras leer las de otras cajas) y la fuerza a disco."""
+    global _ultima_venta_id
+    if usa_sqlite():
+        nuevo_id = almacen_sqlite.registrar_venta(conexion(), venta, TERMINAL, sesion_caja and sesion_caja["id"],
+                                                  dinero.centavos(venta["total"]), evento, reloj=timestamp)
+        refrescar_ventas(hasta_id=nuevo_id - 1)
+        _ultima_venta_id = nuevo_id
+        return
+    with bloqueo_archivo(VENTAS_FILE):
+        venta["fecha"] = timestamp()
+        agregar_al_diario([venta])
+
+def compactar_si_corresponde():
+    """Compacta el diario cada COMPACTAR_CADA ventas, una vez que la última ya está en `ventas`."""
+    # Con varias cajas sobre el mismo diario no se compacta en caliente
+    if not usa_sqlite() and ventas_agregadas >= COMPACTAR_CADA and not MULTITERMINAL:
+        guardar_ventas()
+
+def agregar_al_diario(nuevas):
+    """Agrega ventas al final del diario en una sola escritura forzada a disco."""
+    global ventas_agregadas, _ventas_leidas_hasta
+    datos = "".join(json.dumps(v, ensure_ascii=False, separators=(",", ":")) + "\n" for v in nuevas)
+    with bloqueo_archivo(VENTAS_FILE):
+        refrescar_ventas()
+        with open(VENTAS_FILE, "ab") as f:
+            f.write(datos.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            _ventas_leidas_hasta = f.tell()
+    ventas_agregadas += len(nuevas)
+
+@metricas.medido("guardar venta")
+def persistir_venta(venta):
+    """Guarda una venta, confirma las reservas de esta caja y anota el stock vendido en el historial, todo junto."""
+    if usa_sqlite():
+        vendidos = almacen_sqlite.reservas_de(conexion(), TERMINAL)
+    else:
+        vendidos = [(r["id"], r["cantidad"]) for r in reservas if r["terminal"] == TERMINAL]
+    por_producto = collections.Counter()
+    for pid, cantidad in vendidos:
+        por_producto[pid] += cantidad
+    items = [[pid, cantidad] for pid, cantidad in por_producto.items()]
+    if usa_sqlite():
+        registrar_evento("venta", guardar=lambda evento: guardar_venta(venta, evento), items=items)
+        return
+    guardar_venta(venta)
+    with transaccion_inventario():
+        reservas[:] = [r for r in reservas if r["terminal"] != TERMINAL]
+        guardar_inventario()
+        registrar_evento("venta", items=items)
+
+def es_formato_antiguo(ruta):
+    """True si el archivo de ventas todavía es un arreglo JSON (formato anterior al diario)."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        while True:
+            ch = f.read(1)
+            if not ch or not ch.isspace():
+                return ch == "["
+
+def migrar_ventas_antiguas():
+    """Convierte una sola vez el arreglo JSON de ventas al diario JSON Lines."""
     global ventas
-    if os.path.exists(VENTAS_FILE):
+    with open(VENTAS_FILE, "r", encoding="utf-8") as f:
+        ventas = ventas_compactas.Ventas(json.load(f))
+    shutil.copy2(VENTAS_FILE, VENTAS_ANTIGUO)
+    guardar_ventas()
+    print(Fore.YELLOW + f"Registro de ventas migrado al nuevo formato (copia en {VENTAS_ANTIGUO}).")
+
+@metricas.medido("cargar ventas")
+def cargar_ventas():
+    """Carga las ventas (de la copia VENTAS_CACHE si sigue valiendo; en SQLite, ninguna) y los acumulados."""
+    global ventas, ventas_por_producto, tabla_analitica, nombres_vendidos, _ultima_venta_id
+    ventas_por_producto = None
+    tabla_analitica = None
+    nombres_vendidos = None
+    if usa_sqlite():
+        ventas = ventas_compactas.Ventas()
+        _ultima_venta_id = almacen_sqlite.ultimo_id_venta(conexion())
+        cargar_resumen()
+        return
+    # Con una sola caja nadie más escribe el diario: se lee sin bloqueo, sin frenar el inicio de sesión
+    with bloqueo_archivo(VENTAS_FILE) if MULTITERMINAL else contextlib.nullcontext():
+        de_cache = leer_diario_ventas(leer_cache_ventas())
+        if ventas.redondeadas:
+            guardar_ventas()  # el diario se reescribe desde los centavos ya redondeados
+    redondeadas = ventas.redondeadas
+    if redondeadas:
+        print(Fore.YELLOW + f"Montos de {redondeadas} venta(s) redondeados al centavo.")
+        escribir_log_evento("Montos redondeados", f"{redondeadas} ventas")
+        ventas.redondeadas = 0
+    if len(ventas) >= CACHE_MINIMO and (len(ventas) - de_cache >= CACHE_MINIMO or redondeadas):
+        escribir_cache_ventas(_ventas_leidas_hasta)
+    cargar_resumen()
+
+def leer_diario_ventas(cache=None):
+    """Lee el diario de ventas (desde donde termina `cache`, si se da); devuelve cuántas salieron de la copia."""
+    global ventas, ventas_agregadas, _ventas_leidas_hasta
+    ventas = ventas_compactas.Ventas()
+    ventas_agregadas = 0
+    _ventas_leidas_hasta = 0
+    if not os.path.exists(VENTAS_FILE):
+        return 0
+    if cache:
+        ventas, _ventas_leidas_hasta = cache
+    else:
         try:
-            with open(VENTAS_FILE, "r", encoding="utf-8") as f:
-                ventas = json.load(f)
-        except Exception:
-            ventas = []
+            if es_formato_antiguo(VENTAS_FILE):
+                migrar_ventas_antiguas()
+                return 0
+        except (ValueError, OSError):
+            print(Fore.RED + "No se pudo migrar el registro de ventas antiguo.")
+            ventas = ventas_compactas.Ventas()
+            return 0
+    de_cache = len(ventas)
+    with open(VENTAS_FILE, "rb") as f:
+        f.seek(_ventas_leidas_hasta)
+        _ventas_leidas_hasta, danadas = _leer_lineas_ventas(f, ventas)
+        incompleta = f.seek(0, os.SEEK_END) > _ventas_leidas_hasta
+    if danadas:
+        # El diario con registros ilegibles queda aparte y se escribe uno nuevo con lo legible
+        apartar_archivo_danado(VENTAS_FILE)
+        print(Fore.YELLOW + f"{danadas} registro(s) de venta ilegibles quedaron solo en esa copia.")
+        guardar_ventas()
+    elif incompleta:
+        # Una escritura interrumpida deja la última línea a medias: se descarta y se compacta
+        print(Fore.YELLOW + "Se descartó un registro de venta incompleto al final del diario.")
+        guardar_ventas()
+    return de_cache
+
+# ---------------- copia binaria de las ventas ---------------- #
+
+def huella_ventas(hasta):
+    """Identifica el contenido del diario de ventas hasta el byte `hasta`."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(VENTAS_FILE, "rb") as f:
+        while hasta > 0:
+            bloque = f.read(min(1 << 20, hasta))
+            if not bloque:
+                return None  # el diario es más corto que lo que cubre la copia
+            h.update(bloque)
+            hasta -= len(bloque)
+    return h.hexdigest()
+
+def leer_cache_ventas():
+    """(ventas, hasta) de VENTAS_CACHE si es de esta versión y coincide con el almacén; si no, None."""
+    try:
+        with open(VENTAS_CACHE, "rb") as f:
+            cabecera = marshal.load(f)
+            carga = f.read()
+        if (cabecera["version"] != CACHE_VERSION or cabecera["almacen"] != ALMACEN
+                or hashlib.blake2b(carga, digest_size=16).hexdigest() != cabecera["suma"]
+                or huella_ventas(cabecera["hasta"]) != cabecera["huella"]):
+            return None
+        return ventas_compactas.Ventas.desde_estado(marshal.loads(carga)), cabecera["hasta"]
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        return None
+
+def escribir_cache_ventas(hasta):
+    """Guarda `ventas` (que cubre el almacén hasta `hasta`) en VENTAS_CACHE con marshal."""
+    carga = marshal.dumps(ventas.estado())
+    cabecera = {"version": CACHE_VERSION, "almacen": ALMACEN, "hasta": hasta, "huella": huella_ventas(hasta),
+                "suma": hashlib.blake2b(carga, digest_size=16).hexdigest()}
+    temporal = f"{VENTAS_CACHE}.{os.getpid()}.tmp"
+    try:
+        with open(temporal, "wb") as f:
+            marshal.dump(cabecera, f)
+            f.write(carga)
+        os.replace(temporal, VENTAS_CACHE)
+    except OSError:
+        pass  # sin copia se arranca igual, solo que más lento
+
+class CargaVentas(threading.Thread):
+    """Carga las ventas en segundo plano mientras el usuario inicia sesión (con su propia conexión SQLite)."""
+
+    def __init__(self):
+        super().__init__(name="carga-ventas", daemon=True)
+        self.error = None
+
+    def run(self):
+        try:
+            if usa_sqlite():
+                _conexion_hilo.con = almacen_sqlite.conectar(DB_FILE)
+            cargar_ventas()
+        except BaseException as e:
+            self.error = e
+        finally:
+            propia = getattr(_conexion_hilo, "con", None)
+            if propia is not None:
+                _conexion_hilo.con = None
+                propia.close()
+
+def cargar_ventas_en_segundo_plano():
+    global _carga_ventas
+    escritor_bitacora()  # la bitácora se abre antes, para no abrirla desde dos hilos a la vez
+    if usa_sqlite():
+        conexion()  # la importación inicial de los JSON la hace el hilo principal
+    _carga_ventas = CargaVentas()
+    _carga_ventas.start()
+
+def esperar_ventas():
+    """Espera a que termine la carga en segundo plano (si la hay) y propaga su error."""
+    global _carga_ventas
+    hilo, _carga_ventas = _carga_ventas, None
+    if hilo is None:
+        return
+    if hilo.is_alive():
+        print(Fore.YELLOW + "Terminando de cargar las ventas…")
+    hilo.join()
+    if hilo.error is not None:
+        raise hilo.error
+
+def _leer_lineas_ventas(f, destino):
+    """Agrega a `destino` las ventas completas de `f`; devuelve (posición, líneas dañadas)."""
+    posicion = f.tell()
+    danadas = 0
+    for linea in f:
+        if not linea.endswith(b"\n"):
+            break  # escritura interrumpida o que otra caja todavía está haciendo
+        posicion += len(linea)
+        if not linea.strip():
+            continue
+        try:
+            destino.append(json.loads(linea))
+        except (ValueError, KeyError, TypeError):
+            danadas += 1  # JSON ilegible o una venta sin los campos de siempre
+    return posicion, danadas
+
+def refrescar_ventas(hasta_id=None):
+    """Incorpora a `ventas` (y a los acumulados) las ventas que otras cajas registraron."""
+    global _ventas_leidas_hasta, _ultima_venta_id
+    nuevas = []
+    if usa_sqlite():
+        if hasta_id is None:
+            hasta_id = almacen_sqlite.ultimo_id_venta(conexion())
+        if hasta_id > _ultima_venta_id:
+            nuevas = list(almacen_sqlite.cargar_ventas(conexion(), desde_id=_ultima_venta_id, hasta_id=hasta_id))
+            _ultima_venta_id = hasta_id
+    elif MULTITERMINAL and os.path.exists(VENTAS_FILE):
+        tamano = os.path.getsize(VENTAS_FILE)
+        if tamano < _ventas_leidas_hasta:
+            # Otra caja compactó el diario: se vuelve a leer completo
+            cargar_ventas()
+            return
+        if tamano > _ventas_leidas_hasta:
+            with open(VENTAS_FILE, "rb") as f:
+                f.seek(_ventas_leidas_hasta)
+                leidas = ventas_compactas.Ventas()  # valida cada venta como la carga completa
+                _ventas_leidas_hasta, danadas = _leer_lineas_ventas(f, leidas)
+            nuevas = list(leidas)
+            if danadas:
+                print(Fore.RED + f"⚠ {danadas} registro(s) de venta ilegibles en {os.path.basename(VENTAS_FILE)}.")
+    with _bloqueo_escritura:
+        for venta in nuevas:
+            agregar_venta_cargada(venta)
+        if nuevas:
+            guardar_resumen()
+
+# ---------------- varias cajas sobre los mismos datos ---------------- #
+
+reservas = []               # stock apartado en carritos abiertos: {"terminal", "id", "cantidad", "momento"}
+_firma_inventario = None    # (mtime, tamaño) de inventario.json en la última lectura/escritura propia
+_version_datos = None       # PRAGMA data_version de SQLite en la última lectura
+_ventas_leidas_hasta = 0    # bytes del diario de ventas ya cargados en `ventas`
+_ultima_venta_id = 0        # en SQLite, id de la última venta cargada
+_bloqueos_archivo = {}      # ruta -> [archivo .lock abierto, profundidad]
+
+def firma_archivo(ruta):
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+@contextlib.contextmanager
+def bloqueo_archivo(ruta):
+    """Bloqueo exclusivo entre procesos sobre `ruta` (solo en modo multiterminal; se puede anidar)."""
+    if not MULTITERMINAL:
+        with _bloqueo_escritura:
+            yield
+        return
+    with _bloqueo_escritura:
+        entrada = _bloqueos_archivo.get(ruta)
+        if entrada is None:
+            f = open(ruta + ".lock", "a+")
+            bloquear_archivo(f)
+            entrada = _bloqueos_archivo[ruta] = [f, 0]
+        entrada[1] += 1
+        try:
+            yield
+        finally:
+            entrada[1] -= 1
+            if entrada[1] == 0:
+                del _bloqueos_archivo[ruta]
+                desbloquear_archivo(entrada[0])
+                entrada[0].close()
+
+def refrescar_inventario():
+    """Vuelve a leer el inventario si otra caja lo modificó desde la última lectura."""
+    if usa_sqlite():
+        if almacen_sqlite.version_datos(conexion()) != _version_datos:
+            cargar_inventario()
+    elif MULTITERMINAL and firma_archivo(INVENTARIO_FILE) != _firma_inventario:
+        cargar_inventario()
+
+@contextlib.contextmanager
+def transaccion_inventario():
+    """Cambio de inventario sobre datos frescos; dentro hay que volver a buscar los productos."""
+    global _firma_inventario
+    with bloqueo_archivo(INVENTARIO_FILE):
+        refrescar_inventario()
+        try:
+            yield
+        except BaseException:
+            _firma_inventario = None  # la memoria pudo quedar a medias: se relee la próxima vez
+            raise
+        if MULTITERMINAL and not usa_sqlite() and "inventario" in pendientes:
+            del pendientes["inventario"]
+            escribir_inventario()
+
+def reservar_stock(pid, cantidad):
+    """Aparta `cantidad` unidades para el carrito de esta caja; devuelve el producto o None si no alcanza."""
+    momento = timestamp()
+    if usa_sqlite():
+        with _bloqueo_escritura:
+            stock = almacen_sqlite.reservar(conexion(), pid, cantidad, TERMINAL, momento)
+            refrescar_inventario()
+            producto = buscar_producto(pid)
+            if stock is None or producto is None:
+                return None
+            if producto["stock"] != stock:
+                cambiar_stock(producto, stock)
+            return producto
+    with transaccion_inventario():
+        producto = buscar_producto(pid)
+        if producto is None or producto["stock"] < cantidad:
+            return None
+        cambiar_stock(producto, producto["stock"] - cantidad)
+        reservas.append({"terminal": TERMINAL, "id": pid, "cantidad": cantidad, "momento": momento})
+        guardar_inventario()
+        return producto
+
+def liberar_reservas(todas=False):
+    """Devuelve al stock lo reservado por esta caja (o, con `todas`, lo de cualquier caja) y lo vencido."""
+    vence = (datetime.datetime.now() - datetime.timedelta(minutes=RESERVA_MINUTOS)).strftime("%Y-%m-%d %H:%M:%S")
+    if usa_sqlite():
+        with _bloqueo_escritura:
+            if almacen_sqlite.liberar_reservas(conexion(), None if todas else TERMINAL, vence):
+                cargar_inventario()  # data_version no cambia con los cambios propios
+        return
+    with transaccion_inventario():
+        quedan = []
+        for r in reservas:
+            if todas or r["terminal"] == TERMINAL or r["momento"] < vence:
+                producto = buscar_producto(r["id"])
+                if producto:
+                    cambiar_stock(producto, producto["stock"] + r["cantidad"])
+            else:
+                quedan.append(r)
+        if len(quedan) != len(reservas):
+            reservas[:] = quedan
+            guardar_inventario()
+
+# ---------------- acumulados de ventas ---------------- #
+
+RESUMEN_VERSION = 3  # 2: montos en centavos enteros; 3: productos por normalizar(nombre)
+
+def nuevo_resumen():
+    """Acumulados vacíos; "total", los periodos y el "ingreso" de cada producto van en centavos."""
+    return {"version": RESUMEN_VERSION, "ventas": 0, "total": 0, "productos": {},
+            "dia": {}, "semana": {}, "mes": {}, "reposicion": {}}
+
+def claves_periodo(fecha):
+    """Claves de día, semana y mes para una fecha 'YYYY-MM-DD'."""
+    dt = datetime.date.fromisoformat(fecha)
+    return {"dia": fecha, "semana": f"{dt.year}-W{dt.isocalendar()[1]}", "mes": f"{dt.year}-{dt.month:02d}"}
+
+def acumular_venta(venta, indice):
+    """Suma una venta (en la posición `indice` de `ventas`) a los acumulados."""
+    total = dinero.centavos(venta["total"])
+    resumen["ventas"] += 1
+    resumen["total"] += total
+    for periodo, clave in claves_periodo(venta["fecha"][:10]).items():
+        resumen[periodo][clave] = resumen[periodo].get(clave, 0) + total
+    dia = datetime.date.fromisoformat(venta["fecha"][:10]).toordinal()
+    for item in venta["items"]:
+        clave = normalizar(item["nombre"])
+        datos = resumen["productos"].setdefault(clave, {"nombre": item["nombre"], "cantidad": 0, "ingreso": 0})
+        datos["cantidad"] += item["cantidad"]
+        datos["ingreso"] += dinero.centavos(item["subtotal"])
+        reposicion.registrar(resumen["reposicion"], item["nombre"].casefold(), dia, item["cantidad"])
+        if ventas_por_producto is not None:
+            indices = ventas_por_producto.setdefault(clave, [])
+            if not indices or indices[-1] != indice:
+                indices.append(indice)
+        if nombres_vendidos is not None:
+            nombres_vendidos.setdefault(clave, set()).add(item["nombre"])
+
+def agregar_venta_cargada(venta):
+    """Suma a los acumulados una venta ya guardada (y la agrega a `ventas`, salvo en SQLite)."""
+    if usa_sqlite():
+        acumular_venta(venta, None)
+        return
+    ventas.append(venta)
+    acumular_venta(venta, len(ventas) - 1)
+
+def guardar_resumen():
+    if usa_sqlite():
+        resumen["hasta_id"] = _ultima_venta_id  # los acumulados cuentan las ventas hasta ese id
+        almacen_sqlite.guardar_meta(conexion(), "resumen", resumen)
+        return
+    marcar_pendiente("resumen", lambda: escribir_json_atomico(RESUMEN_FILE, resumen))
+
+def cargar_resumen():
+    """Carga los acumulados; si faltan o no cuadran con el diario, los reconstruye desde `ventas`."""
+    global resumen
+    resumen = {}
+    if usa_sqlite():
+        # Solo se leen de la base las ventas posteriores a las que ya cuentan los acumulados
+        resumen = almacen_sqlite.leer_meta(conexion(), "resumen", {})
+        version = almacen_sqlite.leer_meta(conexion(), "version_ventas", 0)
+        if (resumen.get("version") != RESUMEN_VERSION or resumen.get("version_ventas") != version
+                or resumen.get("hasta_id", 0) > _ultima_venta_id):
+            resumen = dict(nuevo_resumen(), version_ventas=version, hasta_id=0)
+        if resumen["hasta_id"] < _ultima_venta_id:
+            for venta in almacen_sqlite.cargar_ventas(conexion(), desde_id=resumen["hasta_id"], hasta_id=_ultima_venta_id):
+                acumular_venta(venta, None)
+            guardar_resumen()
+        return
+    if os.path.exists(RESUMEN_FILE):
+        vaciar_pendientes()
+        try:
+            with open(RESUMEN_FILE, "r", encoding="utf-8") as f:
+                resumen = json.load(f)
+        except ValueError:
+            resumen = {}
+    if not resumen or resumen.get("ventas", 0) > len(ventas) or resumen.get("version") != RESUMEN_VERSION:
+        resumen = nuevo_resumen()
+    pendientes = resumen["ventas"]
+    if pendientes < len(ventas):
+        # Solo se suman las ventas que aún no estaban en los acumulados
+        for i in range(pendientes, len(ventas)):
+            acumular_venta(ventas[i], i)
+        guardar_resumen()
+
+def indices_ventas_producto(nombre):
+    """Posiciones en `ventas` de las ventas que incluyen el producto, sin distinguir tildes (índice creado al primer uso)."""
+    global ventas_por_producto
+    indice = ventas_por_producto
+    if indice is None:
+        with _bloqueo_indices:
+            if ventas_por_producto is None:
+                nuevo = {}
+                for i, venta in enumerate(ventas):
+                    for item in venta["items"]:
+                        indices = nuevo.setdefault(normalizar(item["nombre"]), [])
+                        if not indices or indices[-1] != i:
+                            indices.append(i)
+                ventas_por_producto = nuevo
+            indice = ventas_por_producto
+    return indice.get(normalizar(nombre), [])
+
+def nombres_de_producto(nombre):
+    """Nombres con que se vendió el producto, sin distinguir tildes (SQLite; índice creado al primer uso)."""
+    global nombres_vendidos
+    with _bloqueo_indices:
+        if nombres_vendidos is None:
+            nuevo = {}
+            for vendido in almacen_sqlite.nombres_vendidos(conexion()):
+                nuevo.setdefault(normalizar(vendido), set()).add(vendido)
+            nombres_vendidos = nuevo
+        return sorted(nombres_vendidos.get(normalizar(nombre), ()))
+
+def columnas_ventas():
+    """Las ventas por columnas para el análisis; solo se agregan las que faltan desde la última vez."""
+    global tabla_analitica, _tabla_hasta_id
+    if usa_sqlite():
+        with _bloqueo_indices:
+            if tabla_analitica is None:
+                tabla_analitica, _tabla_hasta_id = analitica.nueva_tabla(), 0
+            if _tabla_hasta_id < _ultima_venta_id:
+                analitica.agregar(tabla_analitica, almacen_sqlite.cargar_ventas(conexion(), _tabla_hasta_id, _ultima_venta_id))
+                _tabla_hasta_id = _ultima_venta_id
+            return tabla_analitica
+    with _bloqueo_indices:
+        tabla = tabla_analitica
+        if tabla is None or analitica.cantidad_ventas(tabla) > len(ventas):
+            tabla = analitica.nueva_tabla()
+        cargadas = analitica.cantidad_ventas(tabla)
+        if cargadas < len(ventas):
+            analitica.agregar(tabla, (ventas[i] for i in range(cargadas, len(ventas))))
+        tabla_analitica = tabla
+    return tabla
+
+def rango_ventas(fecha_inicio, fecha_fin):
+    """(ventas, total en centavos) entre dos fechas 'YYYY-MM-DD' inclusive; el diario está en orden cronológico."""
+    if usa_sqlite():
+        encontradas = almacen_sqlite.ventas_entre(conexion(), fecha_inicio, fecha_fin)
+        return encontradas, dinero.sumar(v["total"] for v in encontradas)
+    desde, hasta = ventas.entre(fecha_inicio, fecha_fin)
+    return ventas[desde:hasta], ventas.total_centavos(desde, hasta)
 
 def guardar_usuarios():
-    with open(USUARIOS_FILE, "w", encoding="utf-8") as f:
-        json.dump(usuarios, f, ensure_ascii=False, indent=2)
+    if usa_sqlite():
+        almacen_sqlite.guardar_usuarios(conexion(), usuarios)
+        return
+    marcar_pendiente("usuarios", lambda: escribir_json_atomico(USUARIOS_FILE, usuarios, indent=2))
+
+def guardar_usuario(usuario):
+    """Persiste los cambios de un usuario (en SQLite, solo su fila)."""
+    if usa_sqlite():
+        almacen_sqlite.guardar_usuario(conexion(), usuario)
+    else:
+        guardar_usuarios()
 
+@metricas.medido("cargar usuarios")
 def cargar_usuarios():
-    global usuarios
-    if os.path.exists(USUARIOS_FILE):
+    global usuarios, usuarios_por_nombre
+    if usa_sqlite():
+        usuarios = almacen_sqlite.cargar_usuarios(conexion())
+    elif os.path.exists(USUARIOS_FILE):
+        vaciar_pendientes()
         try:
             with open(USUARIOS_FILE, "r", encoding="utf-8") as f:
                 usuarios = json.load(f)
         except Exception:
+            apartar_archivo_danado(USUARIOS_FILE)
             usuarios = []
     else:
-        usuarios = [{"nombre": "admin", "password": "admin", "rol": "admin"}]
+        usuarios = []
+    if not usuarios:
+        usuarios = [{"nombre": "admin", "password": PASSWORD_INICIAL, "rol": "admin"}]
+    usuarios_por_nombre = {u["nombre"]: u for u in usuarios}
+    # Las contraseñas en texto plano (formato anterior) se reemplazan por su hash una sola vez
+    planas = [u for u in usuarios if not credenciales.es_hash(u["password"])]
+    for u in planas:
+        u["password"] = credenciales.hashear(u["password"])
+    if planas:
         guardar_usuarios()
+        escribir_log_evento("Contraseñas migradas", f"{len(planas)} usuario(s)")
 
 def guardar_clientes():
-    with open(CLIENTES_FILE, "w", encoding="utf-8") as f:
-        json.dump(clientes, f, ensure_ascii=False, indent=2)
+    global _firma_clientes, _version_clientes
+    if usa_sqlite():
+        almacen_sqlite.guardar_clientes(conexion(), clientes)
+        _version_clientes = almacen_sqlite.version_clientes(conexion())  # el cambio propio no obliga a releer
+        return
+    if MULTITERMINAL:
+        # Con varias cajas se escribe en el momento (bajo el bloqueo del archivo, ver alta_cliente)
+        escribir_json_atomico(CLIENTES_FILE, clientes, indent=2)
+        _firma_clientes = firma_archivo(CLIENTES_FILE)
+        return
+    marcar_pendiente("clientes", lambda: escribir_json_atomico(CLIENTES_FILE, clientes, indent=2))
 
+def guardar_cliente(cliente):
+    """Persiste un cliente nuevo o modificado de `clientes` (en SQLite, solo su fila)."""
+    global _version_clientes
+    if usa_sqlite():
+        cliente["id"] = almacen_sqlite.guardar_cliente(conexion(), cliente)
+        _version_clientes = almacen_sqlite.version_clientes(conexion())
+    else:
+        guardar_clientes()
+
+@metricas.medido("cargar clientes")
 def cargar_clientes():
-    global clientes
-    if os.path.exists(CLIENTES_FILE):
-        with open(CLIENTES_FILE, "r", encoding="utf-8") as f:
-            clientes = json.load(f)
+    global clientes, _firma_clientes, _version_clientes
+    if usa_sqlite():
+        _version_clientes = almacen_sqlite.version_clientes(conexion())
+        clientes = almacen_sqlite.cargar_clientes(conexion())
+    elif os.path.exists(CLIENTES_FILE):
+        vaciar_pendientes()  # lo que está en memoria es más nuevo que el archivo
+        _firma_clientes = firma_archivo(CLIENTES_FILE)
+        try:
+            with open(CLIENTES_FILE, "r", encoding="utf-8") as f:
+                clientes = json.load(f)
+        except ValueError:
+            apartar_archivo_danado(CLIENTES_FILE)
+            clientes = []
+    else:
+        clientes = []
+    repetidos = indexar_clientes()
+    if repetidos:
+        guardar_clientes()
+        escribir_log_evento("Clientes unidos", f"{repetidos} registro(s) repetido(s)")
+
+def refrescar_clientes():
+    """Vuelve a leer los clientes si otra caja los modificó desde la última lectura."""
+    if usa_sqlite():
+        if almacen_sqlite.version_clientes(conexion()) != _version_clientes:
+            cargar_clientes()
+    elif MULTITERMINAL and firma_archivo(CLIENTES_FILE) != _firma_clientes:
+        cargar_clientes()
+
+def fecha_visita(texto):
+    """'YYYY-MM-DD' validada, o "" si no se indicó."""
+    texto = str(texto or "").strip()
+    if not texto:
+        return ""
+    try:
+        return datetime.date.fromisoformat(texto).isoformat()
+    except ValueError:
+        raise ValueError("Formato de fecha incorrecto. Use YYYY-MM-DD.") from None
+
+def _clave_visita(cliente):
+    """Entrada de `visitas_clientes` del cliente, o None si no tiene una fecha válida."""
+    try:
+        return (fecha_visita(cliente["proxima_visita"]), cliente["id"]) if cliente["proxima_visita"] else None
+    except ValueError:
+        return None  # fecha escrita a mano antes de validarlas: no entra en el índice
+
+def indexar_clientes():
+    """Arma los índices de clientes; une los repetidos (queda la última visita) y devuelve cuántos sobraban."""
+    global clientes, visitas_clientes, siguiente_cliente_id
+    clientes_por_clave.clear()
+    clientes_por_id.clear()
+    unicos = []
+    siguiente_cliente_id = max((c.get("id") or 0 for c in clientes), default=0) + 1
+    for c in clientes:
+        existente = clientes_por_clave.get(normalizar(c["nombre"]))
+        if existente is not None:
+            if c["proxima_visita"]:
+                existente["proxima_visita"] = c["proxima_visita"]
+            continue
+        if c.get("id") is None:
+            c["id"] = siguiente_cliente_id
+            siguiente_cliente_id += 1
+        clientes_por_clave[normalizar(c["nombre"])] = c
+        clientes_por_id[c["id"]] = c
+        unicos.append(c)
+    repetidos = len(clientes) - len(unicos)
+    clientes = unicos
+    visitas_clientes = sorted(filter(None, map(_clave_visita, clientes)))
+    return repetidos
+
+def buscar_cliente(nombre):
+    """Cliente con ese nombre, sin distinguir mayúsculas ni tildes (o None)."""
+    return clientes_por_clave.get(normalizar(str(nombre)))
+
+def clientes_con_visita(fecha_inicio=None, fecha_fin=None):
+    """Clientes cuya próxima visita cae entre dos fechas 'YYYY-MM-DD' opcionales (inclusive), por fecha."""
+    desde = bisect.bisect_left(visitas_clientes, (fecha_visita(fecha_inicio),)) if fecha_inicio else 0
+    hasta = bisect.bisect_right(visitas_clientes, (fecha_visita(fecha_fin), float("inf"))) if fecha_fin else len(visitas_clientes)
+    return [clientes_por_id[cid] for _, cid in visitas_clientes[desde:hasta]]
 
 # ---------------- funciones de clientes ---------------- #
 
+def pedir_visita():
+    while True:
+        texto = input("¿Cuándo volverá a comprar? (YYYY-MM-DD, Enter = sin fecha): ").strip()
+        try:
+            return fecha_visita(texto)
+        except ValueError as e:
+            print(e)
+
 def registrar_cliente():
     nombre = input("Nombre del cliente: ").strip()
     if not nombre:
         print("Nombre no válido.")
         return
-    proxima_visita = input("¿Cuándo volverá a comprar? (YYYY-MM-DD): ").strip()
-    clientes.append({"nombre": nombre, "proxima_visita": proxima_visita})
-    guardar_clientes()
-    print(Fore.GREEN + "Cliente registrado correctamente.")
+    existente = buscar_cliente(nombre)
+    if existente:
+        print(f"{existente['nombre']} ya está registrado (próxima visita: {existente['proxima_visita'] or '-'}).")
+    alta_cliente(nombre, pedir_visita())
+    print(Fore.GREEN + ("Cliente actualizado correctamente." if existente else "Cliente registrado correctamente."))
 
 def proximas_visitas():
-    cargar_clientes()
+    refrescar_clientes()
     if not clientes:
         print("No hay clientes registrados.")
         return
-    print("\n--- Próximas visitas de clientes ---")
-    for c in clientes:
+    dias = input("¿Cuántos días hacia adelante? (Enter = 7): ").strip()
+    dias = int(dias) if dias.isdigit() else 7
+    hoy = datetime.date.today()
+    atrasados = clientes_con_visita(fecha_fin=(hoy - datetime.timedelta(days=1)).isoformat())
+    proximos = clientes_con_visita(hoy.isoformat(), (hoy + datetime.timedelta(days=dias)).isoformat())
+    print(f"\n--- Próximas visitas de clientes (hasta el {(hoy + datetime.timedelta(days=dias)).isoformat()}) ---")
+    if not proximos:
+        print("Ningún cliente tiene visita prevista en ese periodo.")
+    for c in proximos:
         print(f"{c['nombre']} volverá el {c['proxima_visita']}")
+    if atrasados:
+        print(f"\n{len(atrasados)} cliente(s) con la visita ya vencida, el más reciente: "
+              f"{atrasados[-1]['nombre']} ({atrasados[-1]['proxima_visita']})")
 
 # ---------------- gestión de usuarios ---------------- #
 
+def alta_usuario(nombre, password, rol):
+    """Registra un usuario nuevo con la contraseña guardada como hash; lo devuelve."""
+    nombre = str(nombre).strip()
+    if not nombre or nombre in usuarios_por_nombre:
+        raise ValueError("Nombre inválido o ya existe.")
+    if not password:
+        raise ValueError("La contraseña no puede estar vacía.")
+    if rol not in ("admin", "cajero"):
+        raise ValueError("Rol inválido.")
+    usuario = {"nombre": nombre, "password": credenciales.hashear(password), "rol": rol,
+               "fallos": 0, "bloqueado_hasta": None}
+    with _bloqueo_escritura:
+        usuarios.append(usuario)
+        usuarios_por_nombre[nombre] = usuario
+        guardar_usuario(usuario)
+    escribir_log_evento("Alta de usuario", f"{nombre} | Rol: {rol}")
+    return usuario
+
+def espera_por_fallos(fallos):
+    """Segundos de bloqueo tras `fallos` contraseñas incorrectas seguidas (0 si todavía no corresponde)."""
+    if fallos < INTENTOS_LIBRES:
+        return 0
+    return min(ESPERA_BASE * 2 ** (fallos - INTENTOS_LIBRES), ESPERA_MAXIMA)
+
+def verificar_credenciales(nombre, password):
+    """Devuelve el usuario si la contraseña es correcta; si no, anota el fallo (con bloqueo creciente) y lanza ValueError."""
+    ahora = timestamp()
+    usuario = usuarios_por_nombre.get(nombre)
+    estado = usuario if usuario is not None else {"fallos": 0, "bloqueado_hasta": None}
+    if usuario is None and nombre in fallos_desconocidos:
+        estado["fallos"], estado["bloqueado_hasta"] = fallos_desconocidos[nombre]
+    bloqueado_hasta = estado.get("bloqueado_hasta")
+    if bloqueado_hasta and bloqueado_hasta > ahora:
+        espera = (datetime.datetime.fromisoformat(bloqueado_hasta) - datetime.datetime.fromisoformat(ahora)).total_seconds()
+        raise ValueError(f"Demasiados intentos fallidos. Intente de nuevo en {int(espera)} segundos.")
+    if usuario is not None and credenciales.verificar(password, usuario["password"]):
+        rehash = credenciales.necesita_rehash(usuario["password"])
+        nuevo = credenciales.hashear(password) if rehash else usuario["password"]  # el costo del hash cambió
+        if rehash or usuario.get("fallos"):
+            with _bloqueo_escritura:
+                usuario["password"], usuario["fallos"], usuario["bloqueado_hasta"] = nuevo, 0, None
+                guardar_usuario(usuario)
+        return usuario
+    if usuario is None:
+        credenciales.verificar_ficticio(password)  # tarda lo mismo que con un usuario existente
+    fallos = estado.get("fallos", 0) + 1
+    espera = espera_por_fallos(fallos)
+    bloqueado_hasta = ((datetime.datetime.fromisoformat(ahora) + datetime.timedelta(seconds=espera))
+                       .strftime("%Y-%m-%d %H:%M:%S") if espera else None)
+    with _bloqueo_escritura:
+        estado["fallos"], estado["bloqueado_hasta"] = fallos, bloqueado_hasta
+        if usuario is None:
+            fallos_desconocidos.pop(nombre, None)
+            if len(fallos_desconocidos) >= DESCONOCIDOS_MAXIMO:
+                # Primero se olvidan los que ya no están bloqueados; si no alcanza, los más viejos
+                for viejo in [n for n, (_, hasta) in fallos_desconocidos.items() if not hasta or hasta <= ahora]:
+                    del fallos_desconocidos[viejo]
+                while len(fallos_desconocidos) >= DESCONOCIDOS_MAXIMO:
+                    del fallos_desconocidos[next(iter(fallos_desconocidos))]
+            fallos_desconocidos[nombre] = [fallos, bloqueado_hasta]
+        else:
+            guardar_usuario(usuario)
+    escribir_log_evento("Login fallido", f"Intento {estado['fallos']}" + (f" | Bloqueado {espera} s" if espera else ""),
+                        usuario=nombre or "-")
+    raise ValueError("Usuario o contraseña incorrectos.")
+
+def cambiar_password(usuario, password):
+    """Reemplaza la contraseña del usuario (guardada como hash)."""
+    if not password:
+        raise ValueError("La contraseña no puede estar vacía.")
+    if password == PASSWORD_INICIAL:
+        raise ValueError("La contraseña nueva no puede ser la inicial.")
+    with _bloqueo_escritura:
+        usuario["password"] = credenciales.hashear(password)
+        guardar_usuario(usuario)
+    escribir_log_evento("Cambio de contraseña", usuario=usuario["nombre"])
+
+def pedir_password_nueva(usuario):
+    """Pide (hasta que sea válida) la contraseña que reemplaza a la inicial."""
+    print(Fore.YELLOW + "La contraseña es la inicial del sistema: elija una nueva para continuar.")
+    while True:
+        password = input("Contraseña nueva: ").strip()
+        if password != input("Repita la contraseña: ").strip():
+            print("Las contraseñas no coinciden.")
+            continue
+        try:
+            cambiar_password(usuario, password)
+        except ValueError as e:
+            print(e)
+            continue
+        print("Contraseña actualizada.")
+        return
+
 def registrar_usuario():
     print("\n--- Registrar nuevo usuario ---")
     nombre = input("Nombre de usuario: ").strip()
-    if not nombre or any(u["nombre"] == nombre for u in usuarios):
+    if not nombre or nombre in usuarios_por_nombre:
         print("Nombre inválido o ya existe.")
         return
     password = input("Contraseña: ").strip()
     rol = input("Rol (admin/cajero): ").strip().lower()
-    if rol not in ("admin", "cajero"):
-        print("Rol inválido.")
+    try:
+        alta_usuario(nombre, password, rol)
+    except ValueError as e:
+        print(e)
         return
-    usuarios.append({"nombre": nombre, "password": password, "rol": rol})
-    guardar_usuarios()
     print("Usuario registrado correctamente.")
 
 def autenticar_usuario():
+    global usuario_actual
     print("="*40)
     print("      SISTEMA DE INVENTARIO Y VENTAS      ")
     print("="*40)
     for _ in range(3):
         nombre = input("Nombre de usuario: ").strip()
         password = input("Contraseña: ").strip()
-        usuario = next((u for u in usuarios if u["nombre"] == nombre and u["password"] == password), None)
-        if usuario:
-            escribir_log_evento("Login", f"Usuario: {nombre} | Rol: {usuario['rol']}")
-            print(f"\n¡Bienvenido, {nombre}! Sesión iniciada a las {timestamp()} (Rol: {usuario['rol']})\n")
-            return usuario
-        print("Usuario o contraseña incorrectos.")
+        try:
+            usuario = verificar_credenciales(nombre, password)
+        except ValueError as e:
+            print(e)
+            continue
+        if usuario["nombre"] == "admin" and password == PASSWORD_INICIAL:
+            pedir_password_nueva(usuario)
+        usuario_actual = usuario
+        escribir_log_evento("Login", f"Rol: {usuario['rol']}")
+        print(f"\n¡Bienvenido, {nombre}! Sesión iniciada a las {timestamp()} (Rol: {usuario['rol']})\n")
+        return usuario
     print("Demasiados intentos fallidos. Saliendo.")
     exit()
 
+def consultar_bitacora():
+    print("\n--- Consultar bitácora ---")
+    usuario = input("Usuario (Enter = todos): ").strip() or None
+    evento = input("Evento, p. ej. Venta o Login (Enter = todos): ").strip() or None
+    pid = input("ID de producto (Enter = todos): ").strip()
+    desde = input("Desde (YYYY-MM-DD, Enter = sin límite): ").strip() or None
+    hasta = input("Hasta (YYYY-MM-DD, Enter = sin límite): ").strip() or None
+    vaciar_bitacora()
+    mostrados = 0
+    for registro in bitacora.consultar(LOG_FILE, usuario, evento, int(pid) if pid.isdigit() else None, desde, hasta):
+        print(bitacora.formatear(registro))
+        mostrados += 1
+        if mostrados % 50 == 0 and input("Enter para ver más, 'q' para terminar: ").strip().lower() == "q":
+            return
+    print(f"{mostrados} registro(s).")
+
+def panel_rendimiento():
+    while True:
+        datos = metricas.resumen()
+        print("\n--- Rendimiento (desde que se abrió el programa, tiempos en ms) ---")
+        if datos["operaciones"]:
+            ancho = max(len(n) for n in datos["operaciones"])
+            print(f"{'Operación':<{ancho}} | {'Veces':>7} | {'Total':>10} | {'p50':>8} | {'p95':>8} | {'p99':>8} | {'Máx':>8}")
+            for nombre, d in datos["operaciones"].items():
+                print(f"{nombre:<{ancho}} | {d['cantidad']:>7} | {d['total_ms']:>10.1f} | {d['p50_ms']:>8.2f} | "
+                      f"{d['p95_ms']:>8.2f} | {d['p99_ms']:>8.2f} | {d['max_ms']:>8.2f}")
+        else:
+            print("Todavía no hay mediciones.")
+        for nombre, cantidad in datos["contadores"].items():
+            print(f"{nombre}: {cantidad}")
+        if metricas.perfiles_pedidos():
+            print(Fore.YELLOW + f"Perfil pendiente para: {', '.join(metricas.perfiles_pedidos())}")
+        print("\n1. Perfilar la próxima ejecución de una operación (cProfile)")
+        print("2. Ver el último perfil")
+        print(f"3. Guardar ahora las métricas en {os.path.basename(METRICAS_FILE)}")
+        print("9. Volver al menú principal")
+        opcion = input("Seleccione una opción: ").strip()
+        if opcion == "1":
+            nombres = list(datos["operaciones"])
+            for i, nombre in enumerate(nombres, 1):
+                print(f"{i}. {nombre}")
+            eleccion = input("Número u operación (por ejemplo 'venta'; Enter para cancelar): ").strip()
+            operacion = nombres[int(eleccion) - 1] if eleccion.isdigit() and 1 <= int(eleccion) <= len(nombres) else eleccion
+            if operacion:
+                metricas.perfilar(operacion, PERFILES_DIR)
+                escribir_log_evento("Perfil de rendimiento", operacion)
+                print(Fore.GREEN + f"La próxima vez que se ejecute '{operacion}' quedará el perfil en {PERFILES_DIR}.")
+        elif opcion == "2":
+            perfil = metricas.ultimo_perfil
+            if perfil is None:
+                print("Todavía no se capturó ningún perfil.")
+            else:
+                print(f"\n{perfil['operacion']} | {perfil['fecha']} | {perfil['ms']:.3f} ms | {perfil['archivo'] or 'sin archivo'}")
+                print(perfil["resumen"])
+        elif opcion == "3":
+            if metricas.volcar_ahora():
+                print(Fore.GREEN + f"Métricas agregadas a {METRICAS_FILE}.")
+            else:
+                print("No hay mediciones nuevas desde el último volcado.")
+        elif opcion == "9":
+            break
+        else:
+            print("Opción no válida.")
+
 def cerrar_sesion(usuario):
-    escribir_log_evento("Logout", f"Usuario: {usuario['nombre']} | Rol: {usuario['rol']}")
+    global usuario_actual
+    vaciar_pendientes()
+    escribir_log_evento("Logout", f"Rol: {usuario['rol']}")
+    usuario_actual = None
+    vaciar_bitacora()
     print(f"Sesión cerrada para {usuario['nombre']} a las {timestamp()}.")
 
+# ---------------- catálogo indexado ---------------- #
+
+def indexar_inventario():
+    """Reconstruye todos los índices del catálogo a partir de `inventario`."""
+    global productos_por_trigrama
+    productos_por_id.clear()
+    productos_por_nombre.clear()
+    productos_por_codigo.clear()
+    productos_por_trigrama = None
+    nombres_buscables.clear()
+    # Los IDs son incrementales; con la lista ordenada por ID se puede ubicar un producto por bisección
+    if any(inventario[i]["id"] > inventario[i + 1]["id"] for i in range(len(inventario) - 1)):
+        inventario.sort(key=lambda p: p["id"])
+    for p in inventario:
+        productos_por_id[p["id"]] = p
+        productos_por_nombre.setdefault(p["nombre"].casefold(), []).append(p)
+        for codigo in p.setdefault("codigos", []):
+            productos_por_codigo[codigo] = p
+    orden_stock[:] = sorted((p["stock"], p["id"]) for p in inventario)
+
+def buscar_producto(pid):
+    """Devuelve el producto con ese ID o None."""
+    return productos_por_id.get(pid)
+
+def buscar_producto_por_nombre(nombre):
+    """Devuelve el primer producto con ese nombre (sin distinguir mayúsculas) o None."""
+    encontrados = productos_por_nombre.get(nombre.strip().casefold())
+    return encontrados[0] if encontrados else None
+
+def agregar_al_inventario(producto):
+    """Agrega un producto nuevo al inventario y a los índices."""
+    inventario.append(producto)
+    productos_por_id[producto["id"]] = producto
+    productos_por_nombre.setdefault(producto["nombre"].casefold(), []).append(producto)
+    for codigo in producto.setdefault("codigos", []):
+        productos_por_codigo[codigo] = producto
+    _indexar_trigramas(producto)
+    bisect.insort(orden_stock, (producto["stock"], producto["id"]))
+
+def quitar_del_inventario(producto):
+    """Quita un producto del inventario y de los índices."""
+    pos = bisect.bisect_left(inventario, producto["id"], key=lambda p: p["id"])
+    del inventario[pos]
+    del productos_por_id[producto["id"]]
+    for codigo in producto.get("codigos", []):
+        productos_por_codigo.pop(codigo, None)
+    filas_formateadas.pop(producto["id"], None)
+    _quitar_nombre(producto)
+    del orden_stock[bisect.bisect_left(orden_stock, (producto["stock"], producto["id"]))]
+
+def _quitar_nombre(producto):
+    if nombres_buscables.pop(producto["id"], None) is None:
+        trigramas_producto = ()  # índice de búsqueda todavía sin armar
+    else:
+        trigramas_producto = trigramas(producto["nombre"])
+    for trigrama in trigramas_producto:
+        ids = productos_por_trigrama.get(trigrama)
+        if ids is not None:
+            ids.discard(producto["id"])
+            if not ids:
+                del productos_por_trigrama[trigrama]
+    clave = producto["nombre"].casefold()
+    mismos = [p for p in productos_por_nombre.get(clave, []) if p is not producto]
+    productos_por_nombre[clave] = mismos
+    if not mismos:
+        productos_por_nombre.pop(clave, None)
+
+def cambiar_stock(producto, nuevo):
+    """Cambia el stock de un producto manteniendo el índice ordenado por stock."""
+    del orden_stock[bisect.bisect_left(orden_stock, (producto["stock"], producto["id"]))]
+    producto["stock"] = nuevo
+    bisect.insort(orden_stock, (nuevo, producto["id"]))
+
+def renombrar_producto(producto, nuevo_nombre):
+    """Cambia el nombre de un producto manteniendo el índice por nombre."""
+    _quitar_nombre(producto)
+    producto["nombre"] = nuevo_nombre
+    productos_por_nombre.setdefault(nuevo_nombre.casefold(), []).append(producto)
+    _indexar_trigramas(producto)
+
+def productos_con_stock_menor(limite):
+    """Productos con stock menor al límite, de menor a mayor stock."""
+    fin = bisect.bisect_left(orden_stock, (limite,))
+    return [productos_por_id[pid] for _, pid in orden_stock[:fin]]
+
+# ---------------- códigos de barras ---------------- #
+
+def digito_verificador(digitos):
+    """Dígito verificador GTIN (EAN/UPC) para los dígitos sin el último: pesos 3 y 1 desde la derecha."""
+    suma = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(digitos)))
+    return (10 - suma % 10) % 10
+
+def normalizar_codigo(codigo):
+    """Valida un EAN-13, UPC-A o EAN-8 y lo devuelve con 13 dígitos (un UPC-A coincide con su EAN-13)."""
+    codigo = str(codigo).strip()
+    if not (codigo.isascii() and codigo.isdigit()) or len(codigo) not in (8, 12, 13):
+        raise ValueError("El código debe tener 8, 12 o 13 dígitos (EAN-8, UPC-A o EAN-13).")
+    if digito_verificador(codigo[:-1]) != int(codigo[-1]):
+        raise ValueError(f"Código {codigo} inválido (dígito verificador incorrecto).")
+    return codigo.zfill(13)
+
+def buscar_por_codigo(codigo):
+    """Producto con ese código de barras (ya normalizado o no) o None."""
+    return productos_por_codigo.get(str(codigo).strip().zfill(13))
+
+def cambiar_codigos(producto, codigos):
+    """Reemplaza los códigos de un producto manteniendo el índice por código."""
+    for codigo in producto.get("codigos", []):
+        productos_por_codigo.pop(codigo, None)
+    producto["codigos"] = list(codigos)
+    for codigo in producto["codigos"]:
+        productos_por_codigo[codigo] = producto
+
+# ---------------- búsqueda por nombre ---------------- #
+
+MAX_RESULTADOS = 10  # cuántos productos muestra una búsqueda
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'Azúcar' -> 'azucar'."""
+    descompuesto = unicodedata.normalize("NFKD", texto.casefold())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).strip()
+
+def trigramas(texto):
+    """Trigramas de cada palabra, con relleno al inicio para que un prefijo corto también coincida."""
+    resultado = set()
+    for palabra in normalizar(texto).split():
+        relleno = f"  {palabra} "
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return resultado
+
+def _indexar_trigramas(producto, indice=None):
+    indice = productos_por_trigrama if indice is None else indice
+    if indice is None:
+        return
+    propios = trigramas(producto["nombre"])
+    nombres_buscables[producto["id"]] = (normalizar(producto["nombre"]), len(propios))
+    for trigrama in propios:
+        indice.setdefault(trigrama, set()).add(producto["id"])
+
+@metricas.medido("buscar productos")
+def buscar_productos(texto, limite=MAX_RESULTADOS):
+    """Productos cuyo nombre se parece a `texto` (por trigramas), del más al menos parecido."""
+    global productos_por_trigrama
+    consulta = normalizar(str(texto))
+    if not consulta:
+        return []
+    indice = productos_por_trigrama
+    if indice is None:
+        with _bloqueo_indices:
+            if productos_por_trigrama is None:
+                nuevo = {}
+                for p in inventario:
+                    _indexar_trigramas(p, nuevo)
+                productos_por_trigrama = nuevo
+            indice = productos_por_trigrama
+    puntajes = {}
+    if consulta.isdigit() and int(consulta) in productos_por_id:
+        puntajes[int(consulta)] = 10.0
+    buscados = trigramas(consulta)
+    comunes = collections.Counter()
+    for trigrama in buscados:
+        comunes.update(indice.get(trigrama, ()))
+    for pid, cantidad in comunes.items():
+        nombre, propios = nombres_buscables[pid]
+        # Coeficiente de Dice entre los trigramas de la consulta y los del nombre
+        puntaje = 2 * cantidad / (len(buscados) + propios)
+        if nombre.startswith(consulta):
+            puntaje += 1.0
+        elif any(palabra.startswith(consulta) for palabra in nombre.split()):
+            puntaje += 0.6
+        elif consulta in nombre:
+            puntaje += 0.3
+        if puntaje >= 0.3:
+            puntajes[pid] = max(puntajes.get(pid, 0.0), puntaje)
+    mejores = sorted(puntajes.items(), key=lambda par: (-par[1], productos_por_id[par[0]]["nombre"].casefold()))
+    return [productos_por_id[pid] for pid, _ in mejores[:limite]]
+
+# ---------------- operaciones (sin interfaz) ---------------- #
+# Las usan los menús y servidor.py: sin teclado ni pantalla; un dato inválido lanza ValueError con el mensaje
+
+def alta_producto(nombre, precio, stock, codigos=()):
+    """Agrega un producto nuevo y lo devuelve."""
+    global siguiente_id
+    nombre = str(nombre).strip()
+    if not nombre:
+        raise ValueError("El nombre no puede estar vacío.")
+    precio = dinero.exacto(_a_numero(precio, float, "precio"))
+    stock = _a_numero(stock, int, "stock")
+    with transaccion_inventario():
+        codigos = _validar_codigos(codigos)
+        producto = {"id": siguiente_id, "nombre": nombre, "precio": precio, "stock": stock, "codigos": codigos}
+        if usa_sqlite():
+            siguiente_id = almacen_sqlite.agregar_producto(conexion(), producto)
+        else:
+            siguiente_id += 1
+            guardar_inventario()
+        agregar_al_inventario(producto)
+        registrar_evento("alta", id=producto["id"], producto=copia_producto(producto))
+    escribir_log_evento("Alta producto", f"{nombre} | Precio: ${precio:.2f} | Stock: {stock}", producto["id"])
+    return producto
+
+def fijar_stock(pid, nuevo):
+    """Cambia el stock de un producto y lo devuelve."""
+    nuevo = _a_numero(nuevo, int, "stock")
+    with transaccion_inventario():
+        producto = buscar_producto(pid)
+        if not producto:
+            raise ValueError("ID no encontrado.")
+        escribir_log_evento("Actualización stock", f"{producto['nombre']} | Antes: {producto['stock']} | Ahora: {nuevo}", pid)
+        delta = nuevo - producto["stock"]
+        cambiar_stock(producto, nuevo)
+        guardar_producto(producto, ("stock",))
+        if delta:
+            registrar_evento("stock", id=pid, delta=delta)
+    return producto
+
+def editar_producto(pid, nombre=None, precio=None):
+    """Cambia nombre y/o precio de un producto (None = sin cambio) y lo devuelve."""
+    if nombre is not None:
+        nombre = str(nombre).strip()
+        if not nombre:
+            raise ValueError("El nombre no puede estar vacío.")
+    if precio is not None:
+        precio = dinero.exacto(_a_numero(precio, float, "precio"))
+    with transaccion_inventario():
+        producto = buscar_producto(pid)
+        if not producto:
+            raise ValueError("ID no encontrado.")
+        campos, antes = {}, {}
+        if nombre is not None:
+            escribir_log_evento("Cambio nombre", f"{producto['nombre']} -> {nombre}", pid)
+            campos["nombre"], antes["nombre"] = nombre, producto["nombre"]
+            renombrar_producto(producto, nombre)
+        if precio is not None:
+            escribir_log_evento("Cambio precio", f"{producto['nombre']} | Antes: ${producto['precio']:.2f} | Ahora: ${precio:.2f}", pid)
+            campos["precio"], antes["precio"] = precio, producto["precio"]
+            producto["precio"] = precio
+        guardar_producto(producto, ("nombre", "precio"))
+        if campos != antes:
+            registrar_evento("cambio", id=pid, campos=campos, antes=antes)
+    return producto
+
+def fijar_codigos(pid, codigos):
+    """Reemplaza los códigos de barras de un producto y lo devuelve."""
+    with transaccion_inventario():
+        producto = buscar_producto(pid)
+        if not producto:
+            raise ValueError("ID no encontrado.")
+        codigos = _validar_codigos(codigos, producto)
+        escribir_log_evento("Códigos de barras", f"{producto['nombre']} | {', '.join(codigos) or 'sin códigos'}", pid)
+        antes = list(producto["codigos"])
+        cambiar_codigos(producto, codigos)
+        guardar_producto(producto, ("codigos",))
+        if codigos != antes:
+            registrar_evento("cambio", id=pid, campos={"codigos": list(codigos)}, antes={"codigos": antes})
+    return producto
+
+def _validar_codigos(codigos, producto=None):
+    """Normaliza los códigos y verifica que no los tenga otro producto."""
+    validos = []
+    for codigo in codigos:
+        codigo = normalizar_codigo(codigo)
+        duenio = productos_por_codigo.get(codigo)
+        if duenio is not None and duenio is not producto:
+            raise ValueError(f"El código {codigo} ya es de '{duenio['nombre']}' (ID: {duenio['id']}).")
+        if codigo not in validos:
+            validos.append(codigo)
+    return validos
+
+def baja_producto(pid):
+    """Elimina un producto del inventario y lo devuelve."""
+    with transaccion_inventario():
+        producto = buscar_producto(pid)
+        if not producto:
+            raise ValueError("ID no encontrado.")
+        quitar_del_inventario(producto)
+        borrar_producto(producto)
+        registrar_evento("baja", id=pid, producto=copia_producto(producto))
+    escribir_log_evento("Eliminación producto", producto["nombre"], producto["id"])
+    return producto
+
+def validar_lote(movimientos):
+    """Revisa un lote de (línea, id, nombre, delta de stock, % de precio); devuelve (cambios, errores)."""
+    cambios = {}
+    errores = []
+    for numero, pid, nombre, delta, porcentaje in movimientos:
+        producto = buscar_producto(pid) if pid is not None else buscar_producto_por_nombre(nombre)
+        if producto is None:
+            errores.append(f"Línea {numero}: producto no encontrado ({pid if pid is not None else nombre}).")
+            continue
+        if not math.isfinite(porcentaje):
+            errores.append(f"Línea {numero}: porcentaje no válido ({porcentaje}).")
+            continue
+        if porcentaje <= -100:
+            errores.append(f"Línea {numero}: el precio de {producto['nombre']} quedaría en cero o negativo.")
+            continue
+        cambio = cambios.setdefault(producto["id"], [producto, 0, producto["precio"]])
+        cambio[1] += delta
+        cambio[2] = dinero.pesos(dinero.con_porcentaje(cambio[2], porcentaje))
+    for producto, delta, _ in cambios.values():
+        if producto["stock"] + delta < 0:
+            errores.append(f"El stock de {producto['nombre']} (ID: {producto['id']}) quedaría en {producto['stock'] + delta}.")
+    return cambios, errores
+
+@metricas.medido("lote de stock/precios")
+def aplicar_lote(movimientos, origen="lote"):
+    """Valida y aplica un lote de movimientos de stock y precio en una sola transacción; devuelve cuántos productos cambió."""
+    with transaccion_inventario():
+        cambios, errores = validar_lote(movimientos)
+        if errores:
+            raise ValueError("\n".join(errores))
+        if usa_sqlite():
+            stocks = almacen_sqlite.aplicar_lote(conexion(), [(pid, delta, precio) for pid, (_, delta, precio) in cambios.items()])
+        else:
+            stocks = {pid: producto["stock"] + delta for pid, (producto, delta, _) in cambios.items()}
+        detalle = []
+        registrar_evento("lote", cambios=[[pid, delta, producto["precio"], precio] for pid, (producto, delta, precio) in cambios.items()])
+        for pid, (producto, delta, precio) in cambios.items():
+            partes = []
+            if delta:
+                partes.append(f"stock {stocks[pid] - delta} -> {stocks[pid]}")
+            if precio != producto["precio"]:
+                partes.append(f"${producto['precio']:.2f} -> ${precio:.2f}")
+            if partes:
+                detalle.append(f"{producto['nombre']} (ID: {pid}) {', '.join(partes)}")
+            if producto["stock"] != stocks[pid]:
+                cambiar_stock(producto, stocks[pid])
+            producto["precio"] = precio
+        if not usa_sqlite():
+            guardar_inventario()
+    escribir_log_evento("Lote inventario", f"{origen} | {len(cambios)} productos | {'; '.join(detalle)}")
+    return len(cambios)
+
+def _a_numero(valor, tipo, campo):
+    try:
+        numero = tipo(valor)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Ingrese un número válido para el {campo}.") from None
+    if not math.isfinite(numero):
+        raise ValueError(f"Ingrese un número válido para el {campo}.")
+    if numero < 0:
+        raise ValueError(f"El {campo} debe ser positivo.")
+    return numero
+
+def alta_cliente(nombre, proxima_visita=""):
+    """Registra un cliente, o actualiza su próxima visita si ya estaba registrado; lo devuelve."""
+    global siguiente_cliente_id
+    nombre = str(nombre).strip()
+    if not nombre:
+        raise ValueError("Nombre no válido.")
+    proxima_visita = fecha_visita(proxima_visita)
+    with bloqueo_archivo(CLIENTES_FILE):
+        refrescar_clientes()
+        cliente = buscar_cliente(nombre)
+        if cliente is None:
+            cliente = {"id": None if usa_sqlite() else siguiente_cliente_id, "nombre": nombre, "proxima_visita": proxima_visita}
+            siguiente_cliente_id += 1
+            clientes.append(cliente)
+        elif not proxima_visita or proxima_visita == cliente["proxima_visita"]:
+            return cliente
+        else:
+            anterior = _clave_visita(cliente)
+            if anterior:
+                visitas_clientes.pop(bisect.bisect_left(visitas_clientes, anterior))
+            cliente["proxima_visita"] = proxima_visita
+        guardar_cliente(cliente)
+        clientes_por_clave[normalizar(nombre)] = cliente
+        clientes_por_id[cliente["id"]] = cliente
+        if proxima_visita:
+            bisect.insort(visitas_clientes, _clave_visita(cliente))
+    return cliente
+
+def item_carrito(producto, cantidad):
+    return {"nombre": producto["nombre"], "cantidad": cantidad, "subtotal": dinero.pesos(dinero.subtotal(producto["precio"], cantidad))}
+
+@metricas.medido("venta")
+def confirmar_venta(carrito, cliente="", proxima_visita=""):
+    """Registra una venta cuyo stock ya está reservado por esta caja y la devuelve."""
+    total = dinero.pesos(dinero.sumar(item["subtotal"] for item in carrito))
+    detalle_venta = [f"{item['cantidad']} x {item['nombre']} (${item['subtotal']:.2f})" for item in carrito]
+    escribir_log_evento("Venta", f"{' | '.join(detalle_venta)} | Total: ${total:.2f}")
+    venta = {
+        "fecha": None,  # la pone guardar_venta()
+        "items": carrito,
+        "total": total,
+        "cliente": cliente,
+        "proxima_visita": proxima_visita
+    }
+    with _bloqueo_escritura:
+        persistir_venta(venta)
+        agregar_venta_cargada(venta)
+        compactar_si_corresponde()
+        guardar_resumen()
+        sumar_venta_a_caja(venta)
+    return venta
+
+def id_de_item(item):
+    """ID del producto de un ítem {"id", "codigo" o "nombre", "cantidad"} (servicio HTTP y comandos.py)."""
+    if item.get("codigo") is not None:
+        producto = buscar_por_codigo(normalizar_codigo(item["codigo"]))
+        if producto is None:
+            raise ValueError(f"Código {item['codigo']} no registrado.")
+        return producto["id"]
+    if item.get("id") is None and item.get("nombre"):
+        producto = buscar_producto_por_nombre(str(item["nombre"]))
+        if producto is None:
+            raise ValueError(f"Producto '{item['nombre']}' no encontrado.")
+        return producto["id"]
+    return item.get("id")
+
+def vender(items, cliente="", proxima_visita=""):
+    """Reserva y vende de una vez una lista de (id, cantidad); devuelve la venta."""
+    if not items:
+        raise ValueError("La venta no tiene productos.")
+    carrito = []
+    try:
+        for pid, cantidad in items:
+            cantidad = _a_numero(cantidad, int, "cantidad")
+            if cantidad == 0:
+                raise ValueError("La cantidad debe ser mayor a cero.")
+            producto = reservar_stock(_a_numero(pid, int, "ID"), cantidad)
+            if producto is None:
+                raise ValueError(f"ID no válido o stock insuficiente (ID: {pid}).")
+            carrito.append(item_carrito(producto, cantidad))
+    except BaseException:
+        liberar_reservas()
+        raise
+    return confirmar_venta(carrito, cliente, proxima_visita)
+
+@metricas.medido("reporte general")
+def datos_reporte_general():
+    productos = resumen["productos"]
+    mas_vendido = max(productos.values(), key=lambda d: d["cantidad"]) if productos else None
+    if mas_vendido:
+        mas_vendido = dict(mas_vendido, ingreso=dinero.pesos(mas_vendido["ingreso"]))
+    return {
+        "monto_inicial": obtener_monto_inicial(),
+        "ventas": resumen["ventas"],
+        "total": dinero.pesos(resumen["total"]),
+        "mas_vendido": mas_vendido,
+    }
+
+@metricas.medido("reporte ventas por fecha")
+def datos_ventas_por_fecha(fecha_inicio, fecha_fin):
+    for fecha in (fecha_inicio, fecha_fin):
+        try:
+            datetime.date.fromisoformat(fecha)
+        except (TypeError, ValueError):
+            raise ValueError("Formato de fecha incorrecto. Use YYYY-MM-DD.") from None
+    if fecha_inicio > fecha_fin:
+        raise ValueError("La fecha de inicio no puede ser mayor que la fecha de fin.")
+    encontradas, total = rango_ventas(fecha_inicio, fecha_fin)
+    return {"ventas": encontradas, "total": dinero.pesos(total)}
+
+@metricas.medido("reporte historial por producto")
+def datos_historial_producto(nombre):
+    clave = normalizar(str(nombre))
+    lineas = []
+    total_cant = 0
+    total_ingreso = 0  # centavos
+    if usa_sqlite():
+        encontradas = almacen_sqlite.ventas_con_productos(conexion(), nombres_de_producto(clave))
+    else:
+        encontradas = (ventas[i] for i in indices_ventas_producto(clave))
+    for venta in encontradas:
+        for item in venta["items"]:
+            if normalizar(item["nombre"]) == clave:
+                lineas.append({"fecha": venta["fecha"], "cantidad": item["cantidad"], "subtotal": item["subtotal"]})
+                total_cant += item["cantidad"]
+                total_ingreso += dinero.centavos(item["subtotal"])
+    return {"ventas": lineas, "cantidad": total_cant, "ingreso": dinero.pesos(total_ingreso)}
+
+@metricas.medido("reporte nunca vendidos")
+def datos_nunca_vendidos():
+    vendidos = resumen["productos"]
+    return [p["nombre"] for p in inventario if normalizar(p["nombre"]) not in vendidos]
+
+@metricas.medido("reporte ventas por periodo")
+def datos_ventas_por_periodo(periodo, fecha_inicio=None, fecha_fin=None):
+    """[(clave, total)] por día, semana o mes; con fechas 'YYYY-MM-DD' solo cuenta los días entre ellas."""
+    if periodo not in ("dia", "semana", "mes"):
+        raise ValueError("Periodo no válido.")
+    if not fecha_inicio and not fecha_fin:
+        return [(clave, dinero.pesos(total)) for clave, total in sorted(resumen[periodo].items())]
+    for fecha in (fecha_inicio, fecha_fin):
+        if fecha:
+            try:
+                datetime.date.fromisoformat(fecha)
+            except ValueError:
+                raise ValueError("Formato de fecha incorrecto. Use YYYY-MM-DD.") from None
+    # Los acumulados por día alcanzan para reagrupar el rango sin recorrer las ventas
+    totales = {}
+    for dia, total in resumen["dia"].items():
+        if (not fecha_inicio or dia >= fecha_inicio) and (not fecha_fin or dia <= fecha_fin):
+            clave = claves_periodo(dia)[periodo]
+            totales[clave] = totales.get(clave, 0) + total
+    return [(clave, dinero.pesos(total)) for clave, total in sorted(totales.items())]
+
+@metricas.medido("reporte análisis de ventas")
+def datos_analisis(fecha_inicio=None, fecha_fin=None, periodo="mes", top=10, ventana=7):
+    """Ingresos por periodo, productos más vendidos, percentiles por venta y media móvil (fechas opcionales)."""
+    tabla = columnas_ventas()
+    return {
+        "periodos": analitica.por_periodo(tabla, periodo, fecha_inicio, fecha_fin),
+        "mas_vendidos": analitica.mas_vendidos(tabla, top, "cantidad", fecha_inicio, fecha_fin),
+        "mayor_ingreso": analitica.mas_vendidos(tabla, top, "ingreso", fecha_inicio, fecha_fin),
+        "percentiles": analitica.percentiles(tabla, analitica.PERCENTILES, fecha_inicio, fecha_fin),
+        "media_movil": analitica.media_movil(tabla, ventana, fecha_inicio, fecha_fin),
+    }
+
+@metricas.medido("reporte reposición")
+def datos_reposicion(plazo=reposicion.PLAZO_ENTREGA, seguridad=reposicion.DIAS_SEGURIDAD,
+                     cobertura=reposicion.DIAS_COBERTURA):
+    """Productos que conviene reponer según su velocidad de venta, del más urgente al menos urgente."""
+    hoy = datetime.date.today().toordinal()
+    return reposicion.sugerencias(inventario, resumen["reposicion"], hoy, plazo, seguridad, cobertura)
+
+def dias_de_stock(producto):
+    """Días que le quedan al stock del producto al ritmo de venta actual (None si no se vende)."""
+    estado = resumen["reposicion"].get(producto["nombre"].casefold())
+    return reposicion.dias_restantes(producto["stock"], reposicion.velocidad(estado, datetime.date.today().toordinal()))
+
+def generar_orden_compra(ruta, plazo=reposicion.PLAZO_ENTREGA, seguridad=reposicion.DIAS_SEGURIDAD,
+                         cobertura=reposicion.DIAS_COBERTURA):
+    """Escribe la orden de compra con las sugerencias de reposición; devuelve cuántos productos incluye."""
+    lista = datos_reposicion(plazo, seguridad, cobertura)
+    reposicion.escribir_orden(ruta, lista)
+    escribir_log_evento("Orden de compra", f"{os.path.basename(ruta)} | {len(lista)} productos")
+    return len(lista)
+
+def datos_caja():
+    """Estado de la sesión de caja abierta en esta terminal (None si está cerrada)."""
+    return datos_sesion(sesion_caja) if sesion_caja else None
+
+# ---------------- historial del inventario ---------------- #
+# Cada cambio de inventario agrega un evento (ver historial.py) para deshacer y consultar otras fechas
+
+def copia_producto(producto):
+    return dict(producto, codigos=list(producto.get("codigos", [])))
+
+def _eventos_desde(posicion, hasta=None):
+    if usa_sqlite():
+        return almacen_sqlite.eventos_desde(conexion(), posicion, hasta)
+    return historial.leer_eventos(EVENTOS_FILE, posicion, hasta)
+
+def _instantanea(hasta=None):
+    """(estado, posición) de la última instantánea con fecha <= `hasta`, o None."""
+    if usa_sqlite():
+        datos = almacen_sqlite.leer_instantanea(conexion(), hasta)
+        return (historial.desde_json(datos), datos["n"]) if datos else None
+    return historial.leer_instantanea(INSTANTANEAS_DIR, hasta)
+
+def _guardar_instantanea(estado, posicion):
+    if usa_sqlite():
+        almacen_sqlite.guardar_instantanea(conexion(), historial.a_json(estado))
+    else:
+        historial.guardar_instantanea(INSTANTANEAS_DIR, estado, posicion)
+
+def iniciar_historial():
+    """Sin instantáneas todavía, el historial arranca con el inventario recién cargado (se llama al cargarlo)."""
+    global _historial_iniciado
+    if _historial_iniciado:
+        return
+    with bloqueo_archivo(EVENTOS_FILE):
+        if _instantanea() is None:
+            # Sin descontar los carritos abiertos: el historial descuenta el stock al confirmar la venta
+            if usa_sqlite():
+                reservado = almacen_sqlite.reservado_por_producto(conexion())
+            else:
+                reservado = collections.Counter()
+                for r in reservas:
+                    reservado[r["id"]] += r["cantidad"]
+            productos = [dict(p, stock=p["stock"] + reservado.get(p["id"], 0)) for p in inventario]
+            _guardar_instantanea(historial.estado_inicial(productos, siguiente_id, timestamp()), 0)
+        _historial_iniciado = True
+
+def estado_historial():
+    """Estado del historial al día: la última instantánea más los eventos que siguen (incluidos los de otras cajas)."""
+    global _historial, _historial_posicion
+    with bloqueo_archivo(EVENTOS_FILE):
+        if _historial is None:
+            iniciar_historial()
+            _historial, _historial_posicion = _instantanea()
+        elif not MULTITERMINAL and not usa_sqlite():
+            return _historial  # solo esta caja escribe el archivo de eventos: ya está al día
+        for evento, posicion in _eventos_desde(_historial_posicion):
+            historial.aplicar(_historial, evento)
+            _historial_posicion = posicion
+        return _historial
+
+def registrar_evento(tipo, guardar=None, **datos):
+    """Agrega al historial un cambio de inventario ya aplicado (en SQLite, con `guardar` si se da) y lo devuelve."""
+    global _historial_posicion
+    evento = {"fecha": timestamp(), "tipo": tipo, **datos}
+    if usuario_actual:
+        evento["usuario"] = usuario_actual["nombre"]
+    with bloqueo_archivo(EVENTOS_FILE):
+        estado = estado_historial()
+        if usa_sqlite():
+            if guardar is None:
+                almacen_sqlite.agregar_evento(conexion(), evento)
+            else:
+                guardar(evento)
+            estado_historial()  # lo incorpora junto con los que otras cajas hayan agregado antes
+        else:
+            evento = {"n": estado["n"] + 1, **evento}
+            _historial_posicion = historial.agregar_evento(EVENTOS_FILE, evento)
+            historial.aplicar(estado, evento)
+        if evento["n"] % historial.INSTANTANEA_CADA == 0:
+            _guardar_instantanea(estado, _historial_posicion)
+    return evento
+
+def aplicar_efectos(cambios):
+    """Aplica al inventario los cambios elementales de historial.efectos(); si uno no se puede, no aplica ninguno."""
+    stocks = {}
+    for cambio in cambios:
+        if cambio[0] == "alta":
+            if buscar_producto(cambio[1]["id"]) is not None:
+                raise ValueError(f"El ID {cambio[1]['id']} ya está en uso.")
+            _validar_codigos(cambio[1].get("codigos", []))
+            continue
+        producto = buscar_producto(cambio[1])
+        if producto is None:
+            raise ValueError(f"El producto (ID: {cambio[1]}) ya no existe.")
+        if cambio[0] == "stock":
+            stocks[producto["id"]] = stocks.get(producto["id"], producto["stock"]) + cambio[2]
+            if stocks[producto["id"]] < 0:
+                raise ValueError(f"El stock de {producto['nombre']} quedaría en {stocks[producto['id']]}.")
+        elif cambio[0] == "campos" and "codigos" in cambio[2]:
+            _validar_codigos(cambio[2]["codigos"], producto)
+    for cambio in cambios:
+        if cambio[0] == "alta":
+            producto = copia_producto(cambio[1])
+            agregar_al_inventario(producto)
+            if usa_sqlite():
+                almacen_sqlite.restaurar_producto(conexion(), producto)
+            else:
+                guardar_inventario()
+            continue
+        producto = buscar_producto(cambio[1])
+        if cambio[0] == "baja":
+            quitar_del_inventario(producto)
+            borrar_producto(producto)
+        elif cambio[0] == "stock":
+            if usa_sqlite():
+                # Se suma en la base, sin pisar lo que vendió otra caja
+                nuevo = almacen_sqlite.aplicar_lote(conexion(), [(producto["id"], cambio[2], producto["precio"])])[producto["id"]]
+            else:
+                nuevo = producto["stock"] + cambio[2]
+            cambiar_stock(producto, nuevo)
+            guardar_producto(producto, ("stock",))
+        else:
+            for campo, valor in cambio[2].items():
+                if campo == "nombre":
+                    renombrar_producto(producto, valor)
+                elif campo == "codigos":
+                    cambiar_codigos(producto, list(valor))
+                else:
+                    producto[campo] = valor
+            guardar_producto(producto, tuple(cambio[2]))
+
+@metricas.medido("deshacer / rehacer")
+def deshacer(rehacer=False):
+    """Deshace la última operación de inventario (o rehace la última deshecha); devuelve su evento."""
+    with transaccion_inventario(), bloqueo_archivo(EVENTOS_FILE):
+        pila = estado_historial()["rehacer" if rehacer else "deshacer"]
+        if not pila:
+            raise ValueError(f"No hay operaciones para {'rehacer' if rehacer else 'deshacer'}.")
+        original = pila[-1]
+        historial.verificar_deshacer(estado_historial(), original)
+        aplicar_efectos(historial.efectos(original, inverso=not rehacer))
+        registrar_evento("rehacer" if rehacer else "deshacer", de=original["n"])
+    escribir_log_evento("Rehacer" if rehacer else "Deshacer", historial.describir(original), original.get("id"))
+    return original
+
+@metricas.medido("reporte inventario a una fecha")
+def inventario_al(fecha):
+    """Productos como estaban en `fecha` ('YYYY-MM-DD' = al final de ese día, o 'YYYY-MM-DD HH:MM:SS')."""
+    try:
+        if len(fecha) == 10:
+            hasta = datetime.date.fromisoformat(fecha).isoformat() + " 23:59:59"
+        else:
+            hasta = datetime.datetime.strptime(fecha, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        raise ValueError("Formato de fecha incorrecto. Use YYYY-MM-DD o YYYY-MM-DD HH:MM:SS.") from None
+    iniciar_historial()
+    guardada = _instantanea(hasta)
+    if guardada is None:
+        raise ValueError("El historial del inventario empieza después de esa fecha.")
+    estado, posicion = guardada
+    for evento, _ in _eventos_desde(posicion, hasta):
+        historial.aplicar(estado, evento)
+    return [estado["productos"][pid] for pid in sorted(estado["productos"])]
+
+# ---------------- exportación e importación CSV ---------------- #
+
+def iterar_ventas(fecha_inicio=None, fecha_fin=None):
+    """Flujo de ventas entre dos fechas 'YYYY-MM-DD' opcionales, leído del almacén y no de `ventas`."""
+    if usa_sqlite():
+        yield from almacen_sqlite.iterar_ventas(conexion(), fecha_inicio, fecha_fin)
+        return
+    if not os.path.exists(VENTAS_FILE):
+        return
+    with open(VENTAS_FILE, "rb") as f:
+        for linea in f:
+            try:
+                venta = json.loads(linea)
+            except ValueError:
+                continue  # línea vacía o a medio escribir por otra caja
+            dia = venta["fecha"][:10]
+            if fecha_inicio and dia < fecha_inicio:
+                continue
+            if fecha_fin and dia > fecha_fin:
+                break  # el diario está en orden cronológico
+            yield venta
+
+def leer_estado_exportacion():
+    """Ruta del CSV -> {"fecha", "iguales"} de la última venta exportada a ese archivo."""
+    if usa_sqlite():
+        return almacen_sqlite.leer_meta(conexion(), "exportaciones", {})
+    if os.path.exists(EXPORTACION_FILE):
+        with open(EXPORTACION_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def guardar_estado_exportacion(estado):
+    if usa_sqlite():
+        almacen_sqlite.guardar_meta(conexion(), "exportaciones", estado)
+        return
+    escribir_json_atomico(EXPORTACION_FILE, estado, indent=2)
+
+@metricas.medido("exportar ventas CSV")
+def exportar_ventas(ruta=None, fecha_inicio=None, fecha_fin=None, producto=None, incremental=False, progreso=None):
+    """Exporta ventas a CSV (o .gz), solo las nuevas con `incremental`; devuelve las filas escritas."""
+    ruta = ruta or VENTAS_CSV
+    for fecha in (fecha_inicio, fecha_fin):
+        if fecha:
+            try:
+                datetime.date.fromisoformat(fecha)
+            except ValueError:
+                raise ValueError("Formato de fecha incorrecto. Use YYYY-MM-DD.") from None
+    estado = leer_estado_exportacion()
+    clave = os.path.abspath(ruta)
+    marca = estado.get(clave) if incremental and os.path.exists(ruta) else None
+    # Ventas de la misma fecha y hora se distinguen por su número (ver csv_ventas.numerar)
+    ultima = dict(marca) if marca else {"fecha": "", "iguales": 0}
+    if marca:
+        fecha_inicio = max(fecha_inicio or "", marca["fecha"][:10])
+
+    def seguir(flujo):
+        for numero, venta in flujo:
+            if marca and (venta["fecha"], numero) <= (marca["fecha"], marca["iguales"]):
+                continue
+            ultima.update(fecha=venta["fecha"], iguales=numero)
+            yield numero, venta
+
+    filas = csv_ventas.filas_de_ventas(seguir(csv_ventas.numerar(iterar_ventas(fecha_inicio, fecha_fin))), producto)
+    escritas = csv_ventas.escribir_filas(ruta, filas, csv_ventas.ENCABEZADO_VENTAS, agregar=incremental, progreso=progreso)
+    if ultima["fecha"]:
+        estado[clave] = ultima
+        guardar_estado_exportacion(estado)
+    escribir_log_evento("Exportación ventas", f"{os.path.basename(ruta)} | {escritas} filas")
+    return escritas
+
+def items_por_fecha(lista):
+    """Fecha -> Counter de (producto, cantidad) vendidos en esa fecha y hora."""
+    vistos = {}
+    for venta in lista:
+        contador = vistos.setdefault(venta["fecha"], collections.Counter())
+        contador.update((i["nombre"].casefold(), i["cantidad"]) for i in venta["items"])
+    return vistos
+
+@metricas.medido("importar ventas CSV")
+def importar_ventas_csv(ruta, progreso=None):
+    """Importa ventas de un CSV exportado, salteando las ya registradas; devuelve (importadas, repetidas)."""
+    global resumen, ventas_por_producto, tabla_analitica
+    leidas = sorted(csv_ventas.leer_ventas(ruta, progreso), key=lambda v: v["fecha"])
+    with bloqueo_archivo(VENTAS_FILE):
+        refrescar_ventas()
+        if usa_sqlite():
+            # Solo pueden repetirse las ventas de los días que cubre el archivo
+            vistos = items_por_fecha(iterar_ventas(leidas[0]["fecha"][:10], leidas[-1]["fecha"][:10])) if leidas else {}
+        else:
+            vistos = items_por_fecha(ventas)
+        nuevas = []
+        for venta in leidas:
+            items = collections.Counter((i["nombre"].casefold(), i["cantidad"]) for i in venta["items"])
+            registrados = vistos.setdefault(venta["fecha"], collections.Counter())
+            if items <= registrados:
+                registrados.subtract(items)
+            else:
+                nuevas.append(venta)  # una venta igual más adelante en el mismo archivo es otra venta
+        if not nuevas:
+            return 0, len(leidas)
+        if usa_sqlite():
+            almacen_sqlite.agregar_ventas(conexion(), nuevas)
+            refrescar_ventas()
+        elif ventas and nuevas[0]["fecha"] < ventas[-1]["fecha"]:
+            # Ventas más viejas que el diario: se intercalan y se reescribe completo
+            if MULTITERMINAL:
+                raise ValueError("Con varias cajas, las ventas anteriores a la última registrada "
+                                 "solo se pueden importar con SQLite o con las demás cajas cerradas.")
+            ventas.extend(nuevas)
+            ventas.sort(key=lambda v: v["fecha"])
+            guardar_ventas()
+            ventas_por_producto = None
+            tabla_analitica = None
+            resumen = nuevo_resumen()
+            for i, venta in enumerate(ventas):
+                acumular_venta(venta, i)
+            guardar_resumen()
+        else:
+            agregar_al_diario(nuevas)
+            for venta in nuevas:
+                ventas.append(venta)
+                acumular_venta(venta, len(ventas) - 1)
+            guardar_resumen()
+    escribir_log_evento("Importación ventas", f"{os.path.basename(ruta)} | {len(nuevas)} ventas")
+    return len(nuevas), len(leidas) - len(nuevas)
+
+@metricas.medido("importar precios CSV")
+def importar_precios_csv(ruta, progreso=None):
+    """Actualiza precios desde un CSV de proveedor; devuelve (actualizados, líneas sin producto)."""
+    filas = list(csv_ventas.leer_precios(ruta, progreso))
+    desconocidas = []
+    cambiados = []
+    with transaccion_inventario():
+        for numero, pid, nombre, precio in filas:
+            producto = buscar_producto(pid) if pid is not None else buscar_producto_por_nombre(nombre)
+            if producto is None:
+                desconocidas.append(numero)
+            elif producto["precio"] != dinero.exacto(precio):
+                cambiados.append([producto["id"], 0, producto["precio"], dinero.exacto(precio)])
+                producto["precio"] = dinero.exacto(precio)
+        if cambiados:
+            if usa_sqlite():
+                almacen_sqlite.actualizar_productos(conexion(), [(pid, {"precio": precio}) for pid, _, _, precio in cambiados])
+            else:
+                guardar_inventario()
+            registrar_evento("lote", cambios=cambiados)
+    escribir_log_evento("Importación precios", f"{os.path.basename(ruta)} | {len(cambiados)} productos")
+    return len(cambiados), desconocidas
+
 # ---------------- funciones de inventario ---------------- #
 
 def agregar_producto():
-    global siguiente_id
     nombre = input("Nombre del producto: ").strip()
     if not nombre:
         print("Operación cancelada.")
@@ -269,22 +2196,107 @@ def agregar_producto():
             break
         except ValueError:
             print("Ingrese un número válido para el stock.")
-    inventario.append({"id": siguiente_id, "nombre": nombre, "precio": precio, "stock": stock})
-    escribir_log_evento("Alta producto", f"{nombre} | Precio: ${precio:.2f} | Stock: {stock}")
-    siguiente_id += 1
+    while True:
+        codigos = codigos_de_texto(input("Códigos de barras (separados por coma, Enter para ninguno): "))
+        if codigos is not None:
+            break
+    alta_producto(nombre, precio, stock, codigos)
     print(Fore.GREEN + "✔ Producto agregado correctamente.")
-    guardar_inventario()
+
+def codigos_de_texto(texto, producto=None):
+    """Códigos separados por coma ya validados, o None (con aviso) si alguno no sirve."""
+    codigos = [c.strip() for c in texto.split(",") if c.strip()]
+    try:
+        return _validar_codigos(codigos, producto)
+    except ValueError as e:
+        print(e)
+        return None
 
 def listar_productos():
+    refrescar_inventario()
     if not inventario:
         print(Fore.YELLOW + "Inventario vacío.")
         return
-    print(Style.BRIGHT + f"+{'-'*4}+{'-'*18}+{'-'*10}+{'-'*8}+")
-    print(f"| {'ID':^2} | {'Nombre':^15} | {'Precio':^7} | {'Stock':^5} |")
-    print(f"+{'-'*4}+{'-'*18}+{'-'*10}+{'-'*8}+")
-    for p in inventario:
-        print(f"| {p['id']:^2} | {p['nombre']:<15} | ${p['precio']:<7.2f} | {p['stock']:^5} |")
-    print(f"+{'-'*4}+{'-'*18}+{'-'*10}+{'-'*8}+" )
+    paginar_productos(inventario)
+
+# ---------------- listado paginado ---------------- #
+
+TAMANO_PAGINA = 20
+ORDENES = {
+    "id": lambda p: p["id"],
+    "nombre": lambda p: normalizar(p["nombre"]),
+    "precio": lambda p: p["precio"],
+    "stock": lambda p: p["stock"],
+}
+filas_formateadas = {}  # id -> (datos con que se formateó, fila de la tabla)
+
+def fila_producto(p, ancho_id):
+    """Fila de la tabla para un producto; solo se vuelve a formatear si el producto cambió."""
+    datos = (p["nombre"], p["precio"], p["stock"], ancho_id)
+    guardada = filas_formateadas.get(p["id"])
+    if guardada is None or guardada[0] != datos:
+        guardada = (datos, f"| {p['id']:^{ancho_id}} | {p['nombre']:<15} | ${p['precio']:<7.2f} | {p['stock']:^5} |")
+        filas_formateadas[p["id"]] = guardada
+    return guardada[1]
+
+def mostrar_productos(productos):
+    ancho_id = max(2, len(str(siguiente_id)))
+    borde = f"+{'-'*(ancho_id + 2)}+{'-'*18}+{'-'*10}+{'-'*8}+"
+    print(Style.BRIGHT + borde)
+    print(f"| {'ID':^{ancho_id}} | {'Nombre':^15} | {'Precio':^7} | {'Stock':^5} |")
+    print(borde)
+    if productos:
+        print("\n".join(fila_producto(p, ancho_id) for p in productos))
+    print(borde)
+
+def ordenar_y_filtrar(productos, orden, descendente, filtro):
+    if filtro:
+        buscado = normalizar(filtro)
+        productos = [p for p in productos if buscado in normalizar(p["nombre"])]
+    if orden != "id" or descendente:
+        productos = sorted(productos, key=ORDENES[orden], reverse=descendente)
+    return productos
+
+def paginar_productos(productos):
+    """Muestra los productos de a una página, con orden y filtro por nombre; Enter para seguir."""
+    if len(productos) <= TAMANO_PAGINA:
+        mostrar_productos(productos)
+        return
+    orden, descendente, filtro = "id", False, ""
+    vista = productos
+    pagina = 0
+    while True:
+        paginas = max(1, -(-len(vista) // TAMANO_PAGINA))
+        pagina = min(pagina, paginas - 1)
+        mostrar_productos(vista[pagina * TAMANO_PAGINA:(pagina + 1) * TAMANO_PAGINA])
+        estado = f"Página {pagina + 1} de {paginas} | {len(vista)} productos | Orden: {orden}{' (desc)' if descendente else ''}"
+        if filtro:
+            estado += f" | Filtro: '{filtro}'"
+        print(estado)
+        comando = input("S siguiente, A anterior, N° de página, id/nombre/precio/stock ordena, "
+                        "F <texto> filtra (F solo quita el filtro), Enter para seguir: ").strip()
+        if not comando:
+            return
+        accion, _, argumento = comando.partition(" ")
+        accion = accion.lower()
+        if accion == "s":
+            pagina = min(pagina + 1, paginas - 1)
+        elif accion == "a":
+            pagina = max(pagina - 1, 0)
+        elif accion.isdigit():
+            pagina = max(int(accion) - 1, 0)
+        elif accion in ORDENES:
+            # Elegir otra vez el mismo orden lo invierte
+            descendente = not descendente if accion == orden else False
+            orden = accion
+            vista = ordenar_y_filtrar(productos, orden, descendente, filtro)
+            pagina = 0
+        elif accion == "f":
+            filtro = argumento.strip()
+            vista = ordenar_y_filtrar(productos, orden, descendente, filtro)
+            pagina = 0
+        else:
+            print("Comando no válido.")
 
 def actualizar_stock():
     listar_productos()
@@ -299,7 +2311,7 @@ def actualizar_stock():
             print("Ingrese un ID válido (número).")
             continue
         pid = int(pid_str)
-        producto = next((p for p in inventario if p["id"] == pid), None)
+        producto = buscar_producto(pid)
         if not producto:
             print("ID no encontrado.")
             continue
@@ -319,12 +2331,48 @@ def actualizar_stock():
             if confirm != "s":
                 print("Operación cancelada.")
                 return
-            escribir_log_evento("Actualización stock", f"{producto['nombre']} | Antes: {producto['stock']} | Ahora: {nuevo}")
-            producto["stock"] = nuevo
+            try:
+                fijar_stock(pid, nuevo)
+            except ValueError as e:
+                print(e)
+                return
             print("Stock actualizado.")
-            guardar_inventario()
             return
 
+def cargar_lote():
+    print("\n--- Lote de stock y precios ---")
+    print("CSV con columnas ID (o Producto) y Stock (unidades a sumar o restar) y/o Porcentaje (cambio de precio).")
+    ruta = ruta_de_datos(input("Archivo CSV (Enter para cancelar): ").strip(), None)
+    if not ruta:
+        print("Operación cancelada.")
+        return
+    try:
+        movimientos = list(csv_ventas.leer_movimientos(ruta))
+    except (OSError, ValueError) as e:
+        print(Fore.RED + f"No se pudo leer el lote: {e}")
+        return
+    refrescar_inventario()
+    cambios, errores = validar_lote(movimientos)
+    if errores:
+        print(Fore.RED + "El lote tiene errores; no se aplicó nada:")
+        for error in errores[:20]:
+            print(f"  {error}")
+        if len(errores) > 20:
+            print(f"  ... y {len(errores) - 20} más")
+        return
+    unidades = sum(delta for _, delta, _ in cambios.values())
+    precios = sum(1 for producto, _, precio in cambios.values() if precio != producto["precio"])
+    print(f"{len(cambios)} productos | {unidades:+} unidades | {precios} precios cambian")
+    if input("¿Aplicar el lote? (s/n): ").strip().lower() != "s":
+        print("Operación cancelada.")
+        return
+    try:
+        cantidad = aplicar_lote(movimientos, os.path.basename(ruta))
+    except ValueError as e:
+        print(Fore.RED + str(e))
+        return
+    print(Fore.GREEN + f"Lote aplicado: {cantidad} productos actualizados.")
+
 def modificar_producto():
     listar_productos()
     if not inventario:
@@ -337,17 +2385,18 @@ def modificar_producto():
         print("Ingrese un ID válido (número).")
         return
     pid = int(pid_str)
-    producto = next((p for p in inventario if p["id"] == pid), None)
+    producto = buscar_producto(pid)
     if not producto:
         print("ID no encontrado.")
         return
     print(f"Modificando '{producto['nombre']}' (Precio: ${producto['precio']:.2f})")
+    nombre_final = None
+    precio_final = None
     nuevo_nombre = input("Nuevo nombre (Enter para mantener): ").strip()
     if nuevo_nombre:
         confirm = input(f"¿Seguro que desea cambiar el nombre a '{nuevo_nombre}'? (s/n): ").strip().lower()
         if confirm == "s":
-            escribir_log_evento("Cambio nombre", f"{producto['nombre']} -> {nuevo_nombre}")
-            producto["nombre"] = nuevo_nombre
+            nombre_final = nuevo_nombre
     while True:
         nuevo_precio = input("Nuevo precio (Enter para mantener): ").strip()
         if nuevo_precio == "":
@@ -359,12 +2408,26 @@ def modificar_producto():
                 continue
             confirm = input(f"¿Seguro que desea cambiar el precio a ${precio:.2f}? (s/n): ").strip().lower()
             if confirm == "s":
-                escribir_log_evento("Cambio precio", f"{producto['nombre']} | Antes: ${producto['precio']:.2f} | Ahora: ${precio:.2f}")
-                producto["precio"] = precio
+                precio_final = precio
             break
         except ValueError:
             print("Ingrese un número válido para el precio.")
-    guardar_inventario()
+    print(f"Códigos de barras actuales: {', '.join(producto.get('codigos', [])) or 'ninguno'}")
+    while True:
+        texto = input("Nuevos códigos (separados por coma; Enter para mantener, '-' para quitarlos): ").strip()
+        if texto in ("", "-"):
+            codigos_finales = None if texto == "" else []
+            break
+        codigos_finales = codigos_de_texto(texto, producto)
+        if codigos_finales is not None:
+            break
+    try:
+        editar_producto(pid, nombre_final, precio_final)
+        if codigos_finales is not None:
+            fijar_codigos(pid, codigos_finales)
+    except ValueError as e:
+        print(e)
+        return
     print("Producto modificado.")
 
 def eliminar_producto():
@@ -379,15 +2442,17 @@ def eliminar_producto():
         print("Ingrese un ID válido (número).")
         return
     pid = int(pid_str)
-    producto = next((p for p in inventario if p["id"] == pid), None)
+    producto = buscar_producto(pid)
     if not producto:
         print("ID no encontrado.")
         return
     confirm = input(f"¿Seguro que desea eliminar '{producto['nombre']}'? (s/n): ").strip().lower()
     if confirm == "s":
-        inventario.remove(producto)
-        escribir_log_evento("Eliminación producto", f"{producto['nombre']} (ID: {producto['id']})")
-        guardar_inventario()
+        try:
+            baja_producto(pid)
+        except ValueError as e:
+            print(e)
+            return
         print("Producto eliminado.")
     else:
         print("Operación cancelada.")
@@ -406,20 +2471,37 @@ def productos_bajos():
             print("El límite debe ser positivo.")
             continue
         break
-    bajos = [p for p in inventario if p["stock"] < limite]
+    bajos = productos_con_stock_menor(limite)
     if bajos:
         print("\nProductos con stock bajo:")
-        for p in bajos:
-            print(f"- {p['nombre']} (stock: {p['stock']})")
+        paginar_productos(bajos)
     else:
         print("Ningún producto bajo ese límite.")
 
+def sugerencias_reposicion():
+    lista = datos_reposicion()
+    if not lista:
+        print(Fore.GREEN + "Ningún producto necesita reposición por ahora.")
+        return
+    print(f"\n--- Sugerencias de reposición (entrega en {reposicion.PLAZO_ENTREGA} días, "
+          f"cubriendo {reposicion.DIAS_COBERTURA} días más) ---")
+    print(f"{'ID':>6} | {'Producto':<25} | {'Stock':>6} | {'Por día':>7} | {'Días':>5} | {'Pedir':>6}")
+    for s in lista[:TAMANO_PAGINA * 5]:
+        print(f"{s['id']:>6} | {s['nombre'][:25]:<25} | {s['stock']:>6} | {s['venta_diaria']:>7.2f} | "
+              f"{s['dias_restantes']:>5.1f} | {s['cantidad']:>6}")
+    if len(lista) > TAMANO_PAGINA * 5:
+        print(f"... y {len(lista) - TAMANO_PAGINA * 5} productos más (ver la orden de compra).")
+    if input("¿Guardar la orden de compra en CSV? (s/n): ").strip().lower() == "s":
+        ruta = os.path.join(BASE_DIR, reposicion.nombre_orden())
+        try:
+            generar_orden_compra(ruta)
+        except OSError as e:
+            print(Fore.RED + f"No se pudo guardar: {e}")
+            return
+        print(Fore.GREEN + f"Orden de compra guardada en {ruta}")
+
 def productos_nunca_vendidos():
-    vendidos = set()
-    for venta in ventas:
-        for item in venta["items"]:
-            vendidos.add(item["nombre"])
-    nunca_vendidos = [p["nombre"] for p in inventario if p["nombre"] not in vendidos]
+    nunca_vendidos = datos_nunca_vendidos()
     print("\n--- Productos nunca vendidos ---")
     if nunca_vendidos:
         for nombre in nunca_vendidos:
@@ -427,13 +2509,37 @@ def productos_nunca_vendidos():
     else:
         print("Todos los productos han sido vendidos al menos una vez.")
 
+def deshacer_cambio():
+    print("\n--- Deshacer / rehacer ---")
+    try:
+        estado = estado_historial()
+    except OSError as e:
+        print(Fore.RED + f"No se pudo leer el historial: {e}")
+        return
+    if not estado["deshacer"] and not estado["rehacer"]:
+        print("No hay cambios de inventario para deshacer.")
+        return
+    if estado["deshacer"]:
+        print(f"D. Deshacer: {historial.describir(estado['deshacer'][-1])} ({estado['deshacer'][-1]['fecha']})")
+    if estado["rehacer"]:
+        print(f"R. Rehacer: {historial.describir(estado['rehacer'][-1])}")
+    opcion = input("Seleccione una opción (Enter = volver): ").strip().lower()
+    if opcion not in ("d", "r"):
+        return
+    try:
+        evento = deshacer(rehacer=opcion == "r")
+    except ValueError as e:
+        print(Fore.RED + f"No se pudo: {e}")
+        return
+    print(Fore.GREEN + f"{'Rehecho' if opcion == 'r' else 'Deshecho'}: {historial.describir(evento)}")
+
 # ---------------- funciones de ventas ---------------- #
 
 def registrar_venta():
     if not inventario:
         print("Inventario vacío. No se puede vender.")
         return
-    cargar_clientes()
+    refrescar_clientes()
     print("¿La venta es para un cliente registrado? (s/n): ", end="")
     es_cliente = input().strip().lower()
     cliente_nombre = ""
@@ -442,38 +2548,83 @@ def registrar_venta():
         if not clientes:
             print("No hay clientes registrados.")
         else:
-            print("Clientes registrados:")
-            for idx, c in enumerate(clientes, 1):
-                print(f"{idx}. {c['nombre']} (Próxima visita: {c['proxima_visita']})")
+            texto = input("Nombre del cliente o parte de él: ").strip()
+            clave = normalizar(texto)
+            encontrados = [c for c in clientes if clave in normalizar(c["nombre"])]
+            for idx, c in enumerate(encontrados[:MAX_RESULTADOS], 1):
+                print(f"{idx}. {c['nombre']} (Próxima visita: {c['proxima_visita'] or '-'})")
             idx = input("Seleccione el número del cliente (Enter para cancelar): ").strip()
-            if idx.isdigit() and 1 <= int(idx) <= len(clientes):
-                cliente = clientes[int(idx)-1]
+            if idx.isdigit() and 1 <= int(idx) <= min(len(encontrados), MAX_RESULTADOS):
+                cliente = encontrados[int(idx)-1]
                 cliente_nombre = cliente["nombre"]
                 proxima_visita = cliente["proxima_visita"]
             else:
                 print("Operación cancelada.")
                 return
     else:
-        cliente_nombre = input("Nombre del cliente: ").strip()
-        proxima_visita = input("¿Cuándo volverá a comprar? (YYYY-MM-DD): ").strip()
-        clientes.append({"nombre": cliente_nombre, "proxima_visita": proxima_visita})
-        guardar_clientes()
+        cliente_nombre = input("Nombre del cliente (Enter = sin cliente): ").strip()
+        if cliente_nombre:
+            # Un cliente que ya compró antes no se vuelve a registrar: se actualiza su próxima visita
+            cliente = alta_cliente(cliente_nombre, pedir_visita())
+            cliente_nombre = cliente["nombre"]
+            proxima_visita = cliente["proxima_visita"]
+
+    try:
+        carrito, total = armar_carrito()
+    except BaseException:
+        # Carrito abandonado (error o Ctrl+C): el stock reservado vuelve al inventario
+        liberar_reservas()
+        raise
+    if carrito is None:
+        liberar_reservas()
+        print("Venta cancelada. El stock reservado volvió al inventario.")
+        return
 
+    if carrito:
+        venta = confirmar_venta(carrito, cliente_nombre, proxima_visita)
+        ticket = f"\n--- Ticket {venta['fecha']} ---"
+        for item in carrito:
+            ticket += f"\n{item['cantidad']} x {item['nombre']} = ${item['subtotal']:.2f}"
+        ticket += f"\nTOTAL: ${venta['total']:.2f}\n"
+        print(ticket)
+    else:
+        print("No se registró ninguna venta.")
+
+def armar_carrito():
+    """Pide productos y cantidades reservando stock; devuelve (carrito, total), o (None, 0) si se abandona."""
     carrito = []
-    total = 0.0
-    while True:
+    por_producto = {}  # id -> ítem del carrito, para sumar si el producto se repite
+    if len(inventario) <= MAX_RESULTADOS:
         listar_productos()
-        pid = input("\nID del producto a vender (Enter para terminar): ").strip()
-        if pid == "":
+    while True:
+        texto = input("\nID, nombre o código del producto (Enter para terminar, E modo escáner, X para abandonar la venta): ").strip()
+        if texto == "":
             break
-        if not pid.isdigit():
-            print("Por favor, ingrese un ID válido (número).")
-            continue
-        pid = int(pid)
-        producto = next((p for p in inventario if p["id"] == pid), None)
-        if not producto:
-            print("ID no válido.")
+        if texto.lower() == "x":
+            return None, 0
+        if texto.lower() == "e":
+            escanear(carrito, por_producto)
             continue
+        if texto.isdigit() and len(texto) >= 8 and buscar_por_codigo(texto):
+            producto = buscar_por_codigo(texto)
+            print(f"Producto: {producto['nombre']} (ID: {producto['id']}, stock: {producto['stock']})")
+        elif texto.isdigit():
+            producto = buscar_producto(int(texto))
+            if not producto:
+                print("ID no válido.")
+                continue
+        else:
+            encontrados = buscar_productos(texto)
+            if not encontrados:
+                print("No se encontraron productos con ese nombre.")
+                continue
+            if len(encontrados) > 1:
+                mostrar_productos(encontrados)
+                print("Ingrese el ID del producto elegido.")
+                continue
+            producto = encontrados[0]
+            print(f"Producto: {producto['nombre']} (ID: {producto['id']}, stock: {producto['stock']})")
+        pid = producto["id"]
         while True:
             cant_str = input("Cantidad (Enter para cancelar): ").strip()
             if cant_str == "":
@@ -486,40 +2637,52 @@ def registrar_venta():
             if cant <= 0:
                 print("La cantidad debe ser mayor a cero.")
                 continue
-            if cant > producto["stock"]:
-                print(Fore.RED + "✖ Error: Stock insuficiente.")
-                break
-            producto["stock"] -= cant
-            subtotal = producto["precio"] * cant
-            carrito.append({"nombre": producto["nombre"], "cantidad": cant, "subtotal": subtotal})
-            total += subtotal
-            print(f"{cant} x {producto['nombre']} agregado/s al carrito.")
-            # Alerta de bajo stock
-            if producto["stock"] < 5:
-                print(Fore.YELLOW + "¡Atención! Stock bajo para este producto.")
+            agregar_al_carrito(carrito, por_producto, pid, cant)
             break
+    return carrito, dinero.pesos(dinero.sumar(item["subtotal"] for item in carrito))
 
-    if carrito:
-        momento = timestamp()
-        ticket = f"\n--- Ticket {momento} ---"
-        detalle_venta = []
-        for item in carrito:
-            ticket += f"\n{item['cantidad']} x {item['nombre']} = ${item['subtotal']:.2f}"
-            detalle_venta.append(f"{item['cantidad']} x {item['nombre']} (${item['subtotal']:.2f})")
-        ticket += f"\nTOTAL: ${total:.2f}\n"
-        print(ticket)
-        escribir_log_evento("Venta", f"{' | '.join(detalle_venta)} | Total: ${total:.2f}")
-        ventas.append({
-            "fecha": momento,
-            "items": carrito,
-            "total": total,
-            "cliente": cliente_nombre,
-            "proxima_visita": proxima_visita
-        })
-        guardar_inventario()
-        guardar_ventas()
+def escanear(carrito, por_producto):
+    """Modo escáner: cada lectura suma una unidad al carrito ('N*código' suma N). Enter vuelve."""
+    print("Modo escáner: lea los códigos de barras (N*código para varias unidades, Enter para volver).")
+    while True:
+        lectura = input("> ").strip()
+        if lectura == "":
+            return
+        cantidad, _, codigo = lectura.rpartition("*")
+        if cantidad and (not cantidad.isdigit() or int(cantidad) <= 0):
+            print(Fore.RED + "✖ Cantidad no válida.")
+            continue
+        try:
+            codigo = normalizar_codigo(codigo)
+        except ValueError as e:
+            print(Fore.RED + f"✖ {e}")
+            continue
+        producto = productos_por_codigo.get(codigo)
+        if producto is None:
+            print(Fore.RED + f"✖ Código {codigo} no registrado.")
+            continue
+        agregar_al_carrito(carrito, por_producto, producto["id"], int(cantidad or 1))
+
+def agregar_al_carrito(carrito, por_producto, pid, cantidad):
+    """Reserva `cantidad` unidades y las suma al ítem del producto (o abre uno nuevo)."""
+    producto = reservar_stock(pid, cantidad)
+    if producto is None:
+        print(Fore.RED + "✖ Error: Stock insuficiente.")
+        return
+    item = por_producto.get(pid)
+    if item is None:
+        item = por_producto[pid] = item_carrito(producto, cantidad)
+        carrito.append(item)
     else:
-        print("No se registró ninguna venta.")
+        item["cantidad"] += cantidad
+        item["subtotal"] = dinero.pesos(dinero.centavos(item["subtotal"]) + dinero.subtotal(producto["precio"], cantidad))
+    print(f"{cantidad} x {producto['nombre']} agregado/s al carrito (en total: {item['cantidad']}).")
+    # Alerta de bajo stock: según el ritmo de venta, o por cantidad si el producto casi no se vende
+    dias = dias_de_stock(producto)
+    if dias is not None and dias <= reposicion.PLAZO_ENTREGA + reposicion.DIAS_SEGURIDAD:
+        print(Fore.YELLOW + f"¡Atención! Al ritmo actual el stock alcanza para {dias:.1f} días.")
+    elif producto["stock"] < 5:
+        print(Fore.YELLOW + "¡Atención! Stock bajo para este producto.")
 
 def imprimir_ticket(carrito, total, momento):
     print(Fore.WHITE + Style.BRIGHT + "\n" + "="*32)
@@ -535,99 +2698,170 @@ def imprimir_ticket(carrito, total, momento):
 # ---------------- reportes ---------------- #
 
 def reporte_ventas():
-    if not ventas:
+    if not resumen["ventas"]:
         print("No hay ventas registradas.")
         return
-    monto_inicial = obtener_monto_inicial()
-    print(f"Monto inicial de caja: ${monto_inicial:.2f}")
-    total_ventas = 0
-    productos_vendidos = {}
-    for venta in ventas:
-        total_ventas += venta["total"]
-        for item in venta["items"]:
-            productos_vendidos[item["nombre"]] = productos_vendidos.get(item["nombre"], 0) + item["cantidad"]
-    print(f"Total de ingresos: ${total_ventas:.2f}")
-    if productos_vendidos:
-        mas_vendido = max(productos_vendidos, key=productos_vendidos.get)
-        print(f"Producto más vendido: {mas_vendido} ({productos_vendidos[mas_vendido]} unidades)")
+    datos = datos_reporte_general()
+    print(f"Monto inicial de caja: ${datos['monto_inicial']:.2f}")
+    print(f"Total de ingresos: ${datos['total']:.2f}")
+    mas_vendido = datos["mas_vendido"]
+    if mas_vendido:
+        print(f"Producto más vendido: {mas_vendido['nombre']} ({mas_vendido['cantidad']} unidades)")
     else:
         print("No hay productos vendidos.")
     print("¿Desea exportar las ventas a CSV? (s/n): ", end="")
     if input().strip().lower() == "s":
-        exportar_ventas_csv(ventas)
-        print(f"Ventas exportadas a {VENTAS_CSV}")
+        exportar_ventas(progreso=mostrar_avance)
+        print(f"\nVentas exportadas a {VENTAS_CSV}")
 
 def reporte_ventas_por_fecha():
-    if not ventas:
+    if not resumen["ventas"]:
         print("No hay ventas registradas.")
         return
     print("\n--- Reporte de Ventas por Fecha ---")
-    fechas_disponibles = sorted(set(venta["fecha"][:10] for venta in ventas))
+    fechas_disponibles = sorted(resumen["dia"])
     print(f"Fechas disponibles: {', '.join(fechas_disponibles)}")
     while True:
         fecha_inicio = input("Fecha inicio (YYYY-MM-DD): ").strip()
         fecha_fin = input("Fecha fin (YYYY-MM-DD): ").strip()
         try:
-            datetime.datetime.strptime(fecha_inicio, "%Y-%m-%d")
-            datetime.datetime.strptime(fecha_fin, "%Y-%m-%d")
-        except ValueError:
-            print("Formato de fecha incorrecto. Use YYYY-MM-DD.")
-            continue
-        if fecha_inicio > fecha_fin:
-            print("La fecha de inicio no puede ser mayor que la fecha de fin.")
+            datos = datos_ventas_por_fecha(fecha_inicio, fecha_fin)
+        except ValueError as e:
+            print(e)
             continue
         break
-    total = 0
-    encontrados = False
-    for venta in ventas:
-        fecha_venta = venta["fecha"][:10]
-        if fecha_inicio <= fecha_venta <= fecha_fin:
-            print(f"{venta['fecha']} | Total: ${venta['total']:.2f}")
-            total += venta["total"]
-            encontrados = True
-    if encontrados:
-        print(f"Total de ingresos en el periodo: ${total:.2f}")
+    for venta in datos["ventas"]:
+        print(f"{venta['fecha']} | Total: ${venta['total']:.2f}")
+    if datos["ventas"]:
+        print(f"Total de ingresos en el periodo: ${datos['total']:.2f}")
     else:
         print("No hay ventas en ese periodo.")
 
 def historial_ventas_producto():
-    if not ventas:
+    if not resumen["ventas"]:
         print("No hay ventas registradas.")
         return
     nombre = input("Nombre del producto: ").strip()
-    total_cant = 0
-    total_ingreso = 0
+    if normalizar(nombre) not in resumen["productos"]:
+        # Sin coincidencia exacta: se ofrecen los nombres parecidos del catálogo
+        encontrados = buscar_productos(nombre)
+        if not encontrados:
+            print("No se encontraron productos con ese nombre.")
+            return
+        for i, p in enumerate(encontrados, 1):
+            print(f"{i}. {p['nombre']}")
+        eleccion = input("Seleccione el número del producto (Enter para cancelar): ").strip()
+        if not eleccion.isdigit() or not 1 <= int(eleccion) <= len(encontrados):
+            print("Operación cancelada.")
+            return
+        nombre = encontrados[int(eleccion) - 1]["nombre"]
+    datos = datos_historial_producto(nombre)
     print(f"\n--- Historial de ventas para '{nombre}' ---")
-    for venta in ventas:
-        for item in venta["items"]:
-            if item["nombre"].lower() == nombre.lower():
-                print(f"{venta['fecha']} | {item['cantidad']} x ${item['subtotal']:.2f}")
-                total_cant += item["cantidad"]
-                total_ingreso += item["subtotal"]
-    print(f"Total vendido: {total_cant} unidades | Ingresos: ${total_ingreso:.2f}")
+    for linea in datos["ventas"]:
+        print(f"{linea['fecha']} | {linea['cantidad']} x ${linea['subtotal']:.2f}")
+    print(f"Total vendido: {datos['cantidad']} unidades | Ingresos: ${datos['ingreso']:.2f}")
 
 def ventas_por_periodo(periodo="dia"):
-    if not ventas:
+    if not resumen["ventas"]:
         print("No hay ventas registradas.")
         return
-    from collections import defaultdict
-    resumen = defaultdict(float)
-    for venta in ventas:
-        fecha = venta["fecha"][:10]
-        dt = datetime.datetime.strptime(fecha, "%Y-%m-%d")
-        if periodo == "dia":
-            clave = fecha
-        elif periodo == "semana":
-            clave = f"{dt.year}-W{dt.isocalendar()[1]}"
-        elif periodo == "mes":
-            clave = f"{dt.year}-{dt.month:02d}"
-        resumen[clave] += venta["total"]
     print(f"\n--- Ventas por {periodo} ---")
-    for clave, total in sorted(resumen.items()):
+    for clave, total in datos_ventas_por_periodo(periodo):
         print(f"{clave}: ${total:.2f}")
 
+def analisis_ventas():
+    if not resumen["ventas"]:
+        print("No hay ventas registradas.")
+        return
+    print("\n--- Análisis de ventas ---")
+    fecha_inicio = input("Desde (YYYY-MM-DD, Enter = sin límite): ").strip() or None
+    fecha_fin = input("Hasta (YYYY-MM-DD, Enter = sin límite): ").strip() or None
+    periodo = input("Agrupar por (dia/semana/mes, Enter = mes): ").strip().lower() or "mes"
+    try:
+        datos = datos_analisis(fecha_inicio, fecha_fin, periodo)
+    except ValueError as e:
+        print(e)
+        return
+    if not datos["periodos"]:
+        print("No hay ventas en ese periodo.")
+        return
+    print(f"\nIngresos por {periodo}:")
+    for clave, total in datos["periodos"]:
+        print(f"  {clave}: ${total:.2f}")
+    print("\nMás vendidos (unidades):")
+    for i, p in enumerate(datos["mas_vendidos"], 1):
+        print(f"  {i:>2}. {p['nombre']}: {p['cantidad']} unidades | ${p['ingreso']:.2f}")
+    print("\nMayor ingreso:")
+    for i, p in enumerate(datos["mayor_ingreso"], 1):
+        print(f"  {i:>2}. {p['nombre']}: ${p['ingreso']:.2f} | {p['cantidad']} unidades")
+    print("\nTotal por venta: " + " | ".join(f"p{p}: ${v:.2f}" for p, v in datos["percentiles"].items()))
+    if datos["media_movil"]:
+        print("\nMedia móvil de 7 días (últimos 14):")
+        for fecha, promedio in datos["media_movil"][-14:]:
+            print(f"  {fecha}: ${promedio:.2f}")
+
+def inventario_a_fecha():
+    fecha = input("Fecha (YYYY-MM-DD o YYYY-MM-DD HH:MM:SS): ").strip()
+    try:
+        productos = inventario_al(fecha)
+    except ValueError as e:
+        print(e)
+        return
+    print(f"\n--- Inventario al {fecha} ({len(productos)} productos) ---")
+    if productos:
+        paginar_productos(productos)
+
+def mostrar_avance(filas):
+    print(f"\r  {filas} filas procesadas...", end="", flush=True)
+
+def ruta_de_datos(texto, defecto):
+    """Ruta ingresada por el usuario; las relativas se toman desde la carpeta del programa."""
+    if not texto:
+        return defecto
+    return texto if os.path.isabs(texto) else os.path.join(BASE_DIR, texto)
+
+def exportar_ventas_csv():
+    print("\n--- Exportar ventas a CSV ---")
+    ruta = ruta_de_datos(input(f"Archivo (Enter = {os.path.basename(VENTAS_CSV)}; termine en .gz para comprimir): ").strip(), VENTAS_CSV)
+    incremental = input("¿Solo agregar las ventas nuevas desde la última exportación? (s/n): ").strip().lower() == "s"
+    fecha_inicio = input("Desde (YYYY-MM-DD, Enter = sin límite): ").strip() or None
+    fecha_fin = input("Hasta (YYYY-MM-DD, Enter = sin límite): ").strip() or None
+    producto = input("Producto (Enter = todos): ").strip() or None
+    try:
+        filas = exportar_ventas(ruta, fecha_inicio, fecha_fin, producto, incremental, mostrar_avance)
+    except (OSError, ValueError) as e:
+        print(Fore.RED + f"No se pudo exportar: {e}")
+        return
+    print(Fore.GREEN + f"\n{filas} filas exportadas a {ruta}")
+
+def importar_csv():
+    print("\n--- Importar desde CSV ---")
+    print("1. Ventas históricas (Fecha, Producto, Cantidad, Subtotal y, opcional, Venta)")
+    print("2. Lista de precios de proveedor (ID o Producto, Precio)")
+    tipo = input("Seleccione una opción: ").strip()
+    if tipo not in ("1", "2"):
+        print("Opción no válida.")
+        return
+    ruta = ruta_de_datos(input("Archivo CSV (.csv o .csv.gz): ").strip(), None)
+    if not ruta:
+        print("Operación cancelada.")
+        return
+    try:
+        if tipo == "1":
+            importadas, repetidas = importar_ventas_csv(ruta, mostrar_avance)
+            print(Fore.GREEN + f"\n{importadas} ventas importadas ({repetidas} ya estaban registradas).")
+        else:
+            actualizados, desconocidas = importar_precios_csv(ruta, mostrar_avance)
+            print(Fore.GREEN + f"\n{actualizados} precios actualizados.")
+            if desconocidas:
+                print(Fore.YELLOW + f"Productos no encontrados en las líneas: {', '.join(map(str, desconocidas[:20]))}"
+                      + (" ..." if len(desconocidas) > 20 else ""))
+    except (OSError, ValueError) as e:
+        print(Fore.RED + f"\nNo se importó nada: {e}")
+
 def menu_reportes():
     while True:
+        refrescar_ventas()
         print("\n--- Menú de Reportes ---")
         print("1. Resumen general")
         print("2. Ventas por fecha")
@@ -637,6 +2871,11 @@ def menu_reportes():
         print("6. Ventas por día")
         print("7. Ventas por semana")
         print("8. Ventas por mes")
+        print("E. Exportar ventas a CSV")
+        print("I. Importar ventas o precios desde CSV")
+        print("A. Análisis de ventas (ranking, percentiles, media móvil)")
+        print("C. Caja abierta y cierres anteriores (reportes Z)")
+        print("H. Inventario a una fecha (historial)")
         print("9. Volver al menú principal")
         opcion = input("Seleccione una opción: ").strip()
         if opcion == "1":
@@ -659,6 +2898,18 @@ def menu_reportes():
             ventas_por_periodo("semana")
         elif opcion == "8":
             ventas_por_periodo("mes")
+        elif opcion.lower() == "e":
+            exportar_ventas_csv()
+        elif opcion.lower() == "i":
+            importar_csv()
+        elif opcion.lower() == "a":
+            analisis_ventas()
+        elif opcion.lower() == "h":
+            inventario_a_fecha()
+        elif opcion.lower() == "c":
+            if sesion_caja is not None:
+                resumen_caja(datos_caja())
+            historial_cierres()
         elif opcion == "9":
             break
         else:
@@ -666,55 +2917,277 @@ def menu_reportes():
 
 # ---------------- funciones de caja ---------------- #
 
-def registrar_monto_inicial():
-    hoy = datetime.datetime.now().strftime("%Y-%m-%d")
+# Sesión: {"id", "caja", "usuario", "apertura", "cierre", "monto_inicial", "ventas", "total", "contado"} (centavos)
+
+def leer_estado_caja():
+    """{"siguiente_id", "abiertas": {terminal: sesión}, "anterior"?} de CAJA_FILE."""
+    datos = {}
     if os.path.exists(CAJA_FILE):
         with open(CAJA_FILE, "r", encoding="utf-8") as f:
             datos = json.load(f)
-        if datos.get("fecha") == hoy:
-            return datos["monto_inicial"]
+    if "abiertas" in datos:
+        return datos
+    return {"siguiente_id": 1, "abiertas": {}, **({"anterior": datos} if datos else {})}
+
+def escribir_estado_caja():
+    """Guarda en CAJA_FILE la sesión abierta de esta caja, sin tocar las de las demás."""
+    with bloqueo_archivo(CAJA_FILE):
+        datos = leer_estado_caja()
+        datos.pop("anterior", None)
+        if sesion_caja is None:
+            datos["abiertas"].pop(TERMINAL, None)
+        else:
+            datos["abiertas"][TERMINAL] = sesion_caja
+        escribir_json_atomico(CAJA_FILE, datos, indent=2)
+
+def leer_cierres():
+    """Sesiones cerradas de CIERRES_FILE (JSON Lines, una por cierre, en orden)."""
+    if not os.path.exists(CIERRES_FILE):
+        return []
+    cierres = []
+    with open(CIERRES_FILE, "r", encoding="utf-8") as f:
+        for linea in f:
+            try:
+                cierres.append(json.loads(linea))
+            except ValueError:
+                continue  # línea vacía o a medio escribir
+    return cierres
+
+def sesion_desde_anterior(registro):
+    """Sesión abierta equivalente al registro de caja del formato anterior, si es de hoy."""
+    if not registro or registro.get("fecha") != datetime.date.today().isoformat():
+        return None
+    return nueva_sesion(registro["monto_inicial"], "", f"{registro['fecha']} 00:00:00")
+
+def nueva_sesion(monto_inicial, usuario, apertura=None):
+    return {"id": None, "caja": TERMINAL, "usuario": usuario, "apertura": apertura or timestamp(), "cierre": None,
+            "monto_inicial": dinero.centavos(monto_inicial), "ventas": 0, "total": 0, "contado": None}
+
+def ventas_desde(momento):
+    """(cantidad, total en centavos) de las ventas desde `momento`, buscadas por el índice de fechas."""
+    if usa_sqlite():
+        return almacen_sqlite.totales_desde(conexion(), momento)
+    desde = ventas.posicion(momento)
+    return len(ventas) - desde, ventas.total_centavos(desde)
+
+@metricas.medido("cargar caja")
+def cargar_caja():
+    """Carga la sesión abierta de esta caja (migra el registro de caja del formato anterior)."""
+    global sesion_caja
+    if usa_sqlite():
+        con = conexion()
+        sesion_caja = almacen_sqlite.sesion_abierta(con, TERMINAL)
+        anterior = almacen_sqlite.migrar_caja_anterior(con)
+        if sesion_caja is None and sesion_desde_anterior(anterior):
+            sesion_caja = sesion_desde_anterior(anterior)
+            sesion_caja["ventas"], sesion_caja["total"] = ventas_desde(sesion_caja["apertura"])
+            sesion_caja["id"] = almacen_sqlite.abrir_sesion(con, sesion_caja)
+        return
+    with bloqueo_archivo(CAJA_FILE):
+        datos = leer_estado_caja()
+        sesion_caja = datos["abiertas"].get(TERMINAL)
+        if sesion_caja is None and sesion_desde_anterior(datos.get("anterior")):
+            sesion_caja = sesion_desde_anterior(datos["anterior"])
+            sesion_caja["id"] = datos["siguiente_id"]
+            datos["siguiente_id"] += 1
+            datos["abiertas"][TERMINAL] = sesion_caja
+        if sesion_caja is not None and not MULTITERMINAL:
+            # Con una sola caja las ventas desde la apertura son todas suyas: se recuentan
+            sesion_caja["ventas"], sesion_caja["total"] = ventas_desde(sesion_caja["apertura"])
+        if "anterior" in datos:
+            datos.pop("anterior")
+            escribir_json_atomico(CAJA_FILE, datos, indent=2)
+
+def abrir_caja(monto_inicial, usuario):
+    """Abre la sesión de caja de esta terminal con el monto inicial en pesos; la devuelve."""
+    global sesion_caja
+    if sesion_caja is not None:
+        raise ValueError("La caja ya está abierta.")
+    sesion = nueva_sesion(_a_numero(monto_inicial, float, "monto inicial"), usuario)
+    if sesion["monto_inicial"] < 0:
+        raise ValueError("El monto inicial no puede ser negativo.")
+    if usa_sqlite():
+        sesion["id"] = almacen_sqlite.abrir_sesion(conexion(), sesion)
+    else:
+        with bloqueo_archivo(CAJA_FILE):
+            datos = leer_estado_caja()
+            sesion["id"] = datos["siguiente_id"]
+            datos["siguiente_id"] += 1
+            datos.pop("anterior", None)
+            datos["abiertas"][TERMINAL] = sesion
+            escribir_json_atomico(CAJA_FILE, datos, indent=2)
+    sesion_caja = sesion
+    escribir_log_evento("Apertura de caja", f"Caja {TERMINAL} | Sesión {sesion['id']} | "
+                                            f"Monto inicial: ${dinero.pesos(sesion['monto_inicial']):.2f}")
+    return sesion
+
+def sumar_venta_a_caja(venta):
+    """Suma una venta de esta caja a su sesión abierta (en SQLite ya se sumó junto con la venta)."""
+    if sesion_caja is None:
+        return
+    sesion_caja["ventas"] += 1
+    sesion_caja["total"] += dinero.centavos(venta["total"])
+    if not usa_sqlite():
+        marcar_pendiente("caja", escribir_estado_caja)
+
+def cerrar_caja(contado=None):
+    """Cierra la sesión de caja de esta terminal con el efectivo `contado` (pesos o None); devuelve el reporte Z."""
+    global sesion_caja
+    if sesion_caja is None:
+        raise ValueError("No hay una caja abierta.")
+    sesion = dict(sesion_caja, cierre=timestamp(),
+                  contado=None if contado is None else dinero.centavos(_a_numero(contado, float, "efectivo contado")))
+    if usa_sqlite():
+        almacen_sqlite.cerrar_sesion(conexion(), sesion)
+        sesion_caja = None
+    else:
+        with _bloqueo_escritura:
+            pendientes.pop("caja", None)
+            with bloqueo_archivo(CIERRES_FILE), open(CIERRES_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(sesion, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            sesion_caja = None
+            escribir_estado_caja()
+    reporte = datos_sesion(sesion)
+    detalle = f"Caja {sesion['caja']} | Sesión {sesion['id']} | {sesion['ventas']} ventas | Total: ${reporte['total_ventas']:.2f}"
+    if reporte["diferencia"] is not None:
+        detalle += f" | Diferencia: ${reporte['diferencia']:.2f}"
+    escribir_log_evento("Cierre de caja", detalle)
+    return reporte
+
+def datos_sesion(sesion):
+    """Montos de una sesión de caja en pesos; de una sesión cerrada es su reporte Z."""
+    esperado = sesion["monto_inicial"] + sesion["total"]
+    return {
+        "sesion": sesion["id"],
+        "caja": sesion["caja"],
+        "usuario": sesion["usuario"],
+        "apertura": sesion["apertura"],
+        "cierre": sesion["cierre"],
+        "ventas": sesion["ventas"],
+        "monto_inicial": dinero.pesos(sesion["monto_inicial"]),
+        "total_ventas": dinero.pesos(sesion["total"]),
+        "ticket_promedio": dinero.pesos(round(sesion["total"] / sesion["ventas"])) if sesion["ventas"] else 0.0,
+        "monto_final": dinero.pesos(esperado),
+        "contado": None if sesion["contado"] is None else dinero.pesos(sesion["contado"]),
+        "diferencia": None if sesion["contado"] is None else dinero.pesos(sesion["contado"] - esperado),
+    }
+
+@metricas.medido("reporte cierres de caja")
+def datos_cierres(fecha_inicio=None, fecha_fin=None, caja=None):
+    """Reportes Z de las sesiones abiertas entre dos fechas 'YYYY-MM-DD' opcionales (inclusive)."""
+    for fecha in (fecha_inicio, fecha_fin):
+        if fecha:
+            try:
+                datetime.date.fromisoformat(fecha)
+            except ValueError:
+                raise ValueError("Formato de fecha incorrecto. Use YYYY-MM-DD.") from None
+    if usa_sqlite():
+        sesiones = almacen_sqlite.sesiones_cerradas(conexion(), fecha_inicio, fecha_fin, caja)
+    else:
+        sesiones = [s for s in leer_cierres()
+                    if (not fecha_inicio or s["apertura"][:10] >= fecha_inicio)
+                    and (not fecha_fin or s["apertura"][:10] <= fecha_fin)
+                    and (not caja or s["caja"] == caja)]
+        sesiones.sort(key=lambda s: (s["apertura"], s["id"]))
+    return [datos_sesion(s) for s in sesiones]
+
+def obtener_monto_inicial():
+    return dinero.pesos(sesion_caja["monto_inicial"]) if sesion_caja else 0.0
+
+def pedir_monto(mensaje, opcional=False):
     while True:
-        monto_str = input("Ingrese el monto inicial de caja para hoy: $").strip()
+        texto = input(mensaje).strip()
+        if opcional and not texto:
+            return None
         try:
-            monto = float(monto_str)
-            break
+            monto = dinero.exacto(float(texto))
+            if monto >= 0:
+                return monto
         except ValueError:
-            print("Ingrese un monto válido.")
-    with open(CAJA_FILE, "w", encoding="utf-8") as f:
-        json.dump({"fecha": hoy, "monto_inicial": monto}, f)
-    return monto
+            pass
+        print("Ingrese un monto válido.")
 
-def obtener_monto_inicial():
-    hoy = datetime.datetime.now().strftime("%Y-%m-%d")
-    if os.path.exists(CAJA_FILE):
-        with open(CAJA_FILE, "r", encoding="utf-8") as f:
-            datos = json.load(f)
-        if datos.get("fecha") == hoy:
-            return datos["monto_inicial"]
-    return 0.0
-
-def resumen_caja():
-    monto_inicial = obtener_monto_inicial()
-    total_ventas = sum(v["total"] for v in ventas)
-    monto_final = monto_inicial + total_ventas
+def preparar_caja(usuario):
+    """Al iniciar sesión: cierra la caja que quedó abierta de otro día y abre la de hoy si hace falta."""
+    cargar_caja()
+    if sesion_caja is not None and sesion_caja["apertura"][:10] != datetime.date.today().isoformat():
+        print(Fore.YELLOW + f"La caja quedó abierta desde {sesion_caja['apertura']}; se cierra con su reporte Z.")
+        resumen_caja(cerrar_caja())
+    elif sesion_caja is not None and sesion_caja["usuario"] != usuario["nombre"]:
+        print(f"La caja está abierta a nombre de {sesion_caja['usuario'] or 'otro usuario'} desde {sesion_caja['apertura']}.")
+        if input("¿Cerrarla y abrir una nueva a su nombre? (s/n): ").strip().lower() == "s":
+            resumen_caja(cerrar_caja(pedir_monto("Efectivo contado (Enter = sin contar): $", opcional=True)))
+    if sesion_caja is None:
+        abrir_caja(pedir_monto("Ingrese el monto inicial de caja para hoy: $"), usuario["nombre"])
+
+def cierre_de_caja(usuario):
+    if sesion_caja is None:
+        print("No hay una caja abierta.")
+        return
+    contado = pedir_monto("Efectivo contado en caja (Enter = sin contar): $", opcional=True)
+    resumen_caja(cerrar_caja(contado))
+    if input("¿Abrir una nueva caja? (s/n): ").strip().lower() == "s":
+        abrir_caja(pedir_monto("Monto inicial: $"), usuario["nombre"])
+
+def resumen_caja(datos):
+    """Imprime el reporte Z (o el estado de la caja abierta) de datos_sesion()."""
     print(Fore.MAGENTA + "\n" + "="*40)
-    print("RESUMEN DE CAJA".center(40))
+    print(("REPORTE Z" if datos["cierre"] else "RESUMEN DE CAJA").center(40))
     print("="*40)
-    print(f"Monto inicial: ${monto_inicial:.2f}")
-    print(f"Total ventas:  ${total_ventas:.2f}")
-    print(f"Monto final:   ${monto_final:.2f}")
+    print(f"Caja: {datos['caja']} | Sesión {datos['sesion']}")
+    print(f"Usuario: {datos['usuario'] or '-'}")
+    print(f"Apertura: {datos['apertura']}")
+    if datos["cierre"]:
+        print(f"Cierre:   {datos['cierre']}")
+    print("-"*40)
+    print(f"Monto inicial:   ${datos['monto_inicial']:.2f}")
+    print(f"Ventas:          {datos['ventas']}")
+    print(f"Total ventas:    ${datos['total_ventas']:.2f}")
+    print(f"Ticket promedio: ${datos['ticket_promedio']:.2f}")
+    print(f"Monto final:     ${datos['monto_final']:.2f}")
+    if datos["contado"] is not None:
+        print(f"Contado:         ${datos['contado']:.2f}")
+        print(f"Diferencia:      ${datos['diferencia']:+.2f}")
     print("="*40)
 
+def historial_cierres():
+    desde = input("Desde (YYYY-MM-DD, Enter = sin límite): ").strip() or None
+    hasta = input("Hasta (YYYY-MM-DD, Enter = sin límite): ").strip() or None
+    try:
+        cierres = datos_cierres(desde, hasta)
+    except ValueError as e:
+        print(e)
+        return
+    if not cierres:
+        print("No hay cierres de caja en ese periodo.")
+        return
+    print(f"\n{'Sesión':>6} | {'Caja':<15} | {'Usuario':<10} | {'Apertura':<19} | {'Ventas':>6} | {'Total':>11} | {'Diferencia':>10}")
+    for d in cierres:
+        diferencia = "-" if d["diferencia"] is None else f"{d['diferencia']:+.2f}"
+        print(f"{d['sesion']:>6} | {d['caja'][:15]:<15} | {d['usuario'][:10]:<10} | {d['apertura']} | "
+              f"{d['ventas']:>6} | ${d['total_ventas']:>10.2f} | {diferencia:>10}")
+    elegida = input("Número de sesión para ver su reporte Z (Enter = volver): ").strip()
+    datos = next((d for d in cierres if str(d["sesion"]) == elegida), None)
+    if datos:
+        resumen_caja(datos)
+
 # ---------------- menú principal ---------------- #
 
 def menu_principal():
     encabezado_principal()
+    iniciar_metricas()
     cargar_inventario()
-    cargar_ventas()
     cargar_usuarios()
     cargar_clientes()
+    # Las ventas (lo más pesado) se cargan mientras el usuario inicia sesión
+    cargar_ventas_en_segundo_plano()
+    # Reservas que quedaron de un cierre inesperado (de esta caja o ya vencidas)
+    liberar_reservas(todas=not MULTITERMINAL)
     usuario = autenticar_usuario()
-    monto_inicial = registrar_monto_inicial()
+    esperar_ventas()
+    preparar_caja(usuario)
     bienvenida()
     while True:
         print(Style.BRIGHT + "\n--- Menú Principal ---")
@@ -728,9 +3201,15 @@ def menu_principal():
         print("M. 📖 Manual de usuario")
         print("C. 👥 Registrar cliente")
         print("V. 📅 Próximas visitas de clientes")
+        print("L. 🚚 Lote de stock / precios (CSV)")
+        print("R. 🧮 Sugerencias de reposición")
+        print("Z. 🧾 Cierre de caja (reporte Z)")
         if usuario["rol"] == "admin":
+            print("D. ↩️  Deshacer / rehacer cambio de inventario")
             print("8. ❌ Eliminar producto")
             print("9. 👤 Registrar usuario")
+            print("B. 🔎 Consultar bitácora")
+            print("P. ⏱️  Rendimiento (métricas y perfiles)")
             print("0. 🚪 Salir")
         else:
             print("0. 🚪 Salir")
@@ -759,11 +3238,25 @@ def menu_principal():
             eliminar_producto()
         elif opcion == "9" and usuario["rol"] == "admin":
             registrar_usuario()
+        elif opcion.lower() == "b" and usuario["rol"] == "admin":
+            consultar_bitacora()
+        elif opcion.lower() == "p" and usuario["rol"] == "admin":
+            panel_rendimiento()
         elif opcion.lower() == "c":
             registrar_cliente()
         elif opcion.lower() == "v":
             proximas_visitas()
+        elif opcion.lower() == "l":
+            cargar_lote()
+        elif opcion.lower() == "r":
+            sugerencias_reposicion()
+        elif opcion.lower() == "z":
+            cierre_de_caja(usuario)
+        elif opcion.lower() == "d" and usuario["rol"] == "admin":
+            deshacer_cambio()
         elif opcion == "0":
+            if sesion_caja is not None and input("¿Cerrar la caja con el reporte Z? (s/n): ").strip().lower() == "s":
+                resumen_caja(cerrar_caja(pedir_monto("Efectivo contado en caja (Enter = sin contar): $", opcional=True)))
             cerrar_sesion(usuario)
             print("Saliendo… ¡Hasta luego!")
             break
@@ -774,11 +3267,6 @@ def menu_principal():
 
 if __name__ == "__main__":
     try:
-        cargar_inventario()
-        cargar_ventas()
-        cargar_usuarios()
-        cargar_clientes()
-        monto_inicial = registrar_monto_inicial()
         menu_principal()
     except Exception as e:
         print(Fore.RED + f"\nOcurrió un error inesperado: {e}")
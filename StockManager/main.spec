@@ -1,5 +1,8 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+# Los datos no se empaquetan en `datas`: el ejecutable los lee y escribe en su misma carpeta
+# (BASE_DIR en main.py). Ahí también se genera ventas.cache, la copia binaria de las ventas
+# que acelera los arranques siguientes; es específica de cada máquina y no se distribuye.
 
 a = Analysis(
     ['main.py'],
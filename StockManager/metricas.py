@@ -0,0 +1,263 @@
+"""
+Métricas de rendimiento del Sistema de Inventario y Ventas.
+
+Cada operación medida (cargas, guardados, ventas, reportes, pedidos HTTP) suma su
+duración a un histograma en memoria. Los histogramas usan cubetas logarítmicas
+(cada una ~9 % más ancha que la anterior), así que ocupan lo mismo con diez
+mediciones que con diez millones y dan p50/p95/p99 con ese margen de error.
+Los contadores anotan cantidades sueltas (eventos de bitácora, filas exportadas, ...).
+
+Cada VOLCADO_CADA segundos (y al salir) se agrega una línea JSON al archivo de métricas
+con lo medido desde el volcado anterior, para seguir la tendencia día a día.
+
+Perfil con cProfile: perfilar("operación", carpeta) captura la próxima ejecución de esa
+operación y deja perfil_<operación>_<fecha>.prof (para pstats o snakeviz) y un .txt
+con las funciones más costosas.
+
+Tendencia:  python metricas.py [--archivo metricas.jsonl] [--operacion NOMBRE]
+"""
+
+import argparse
+import atexit
+import contextlib
+import cProfile
+import datetime
+import functools
+import io
+import json
+import math
+import os
+import pstats
+import re
+import threading
+import time
+
+FACTOR = 2 ** (1 / 8)   # ancho relativo de cada cubeta del histograma
+VOLCADO_CADA = 300      # segundos entre volcados al archivo de métricas
+PERCENTILES = (50, 95, 99)
+LINEAS_PERFIL = 25      # funciones que se listan en el resumen de un perfil
+
+# ---------------- histogramas ---------------- #
+
+class Histograma:
+    """Duraciones en ms agrupadas en cubetas logarítmicas."""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.cubetas = {}  # índice -> cantidad; la cubeta i cubre (FACTOR**(i-1), FACTOR**i] ms
+
+    def registrar(self, ms):
+        indice = math.ceil(math.log(ms, FACTOR)) if ms > 0 else -1000
+        self.cubetas[indice] = self.cubetas.get(indice, 0) + 1
+        self.cantidad += 1
+        self.total += ms
+        self.maximo = max(self.maximo, ms)
+
+    def percentil(self, p):
+        """Límite superior de la cubeta donde cae el percentil p (sin pasar del máximo medido)."""
+        if not self.cantidad:
+            return 0.0
+        objetivo = math.ceil(self.cantidad * p / 100)
+        acumulado = 0
+        for indice in sorted(self.cubetas):
+            acumulado += self.cubetas[indice]
+            if acumulado >= objetivo:
+                return min(FACTOR ** indice, self.maximo)
+        return self.maximo
+
+    def datos(self):
+        datos = {"cantidad": self.cantidad, "total_ms": round(self.total, 3),
+                 "promedio_ms": round(self.total / self.cantidad, 3) if self.cantidad else 0.0}
+        for p in PERCENTILES:
+            datos[f"p{p}_ms"] = round(self.percentil(p), 3)
+        datos["max_ms"] = round(self.maximo, 3)
+        return datos
+
+
+_bloqueo = threading.Lock()
+_histogramas = {}   # nombre -> Histograma, desde que arrancó el programa
+_intervalo = {}     # nombre -> Histograma, desde el último volcado
+_contadores = {}
+_contadores_intervalo = {}
+_perfilar = {}      # operación -> carpeta donde dejar el perfil de su próxima ejecución
+ultimo_perfil = None  # {"operacion", "fecha", "ms", "archivo", "resumen"} del último perfil capturado
+_volcado = None     # {"ruta", "temporizador", "extra"} mientras el volcado periódico está activo
+
+
+def registrar(nombre, ms):
+    with _bloqueo:
+        for tabla in (_histogramas, _intervalo):
+            if nombre not in tabla:
+                tabla[nombre] = Histograma()
+            tabla[nombre].registrar(ms)
+
+
+def contar(nombre, n=1):
+    with _bloqueo:
+        for tabla in (_contadores, _contadores_intervalo):
+            tabla[nombre] = tabla.get(nombre, 0) + n
+
+
+@contextlib.contextmanager
+def medir(nombre):
+    """Mide el bloque y lo registra bajo `nombre` (también si termina con error)."""
+    carpeta = _perfilar.pop(nombre, None) if _perfilar else None
+    perfil = cProfile.Profile() if carpeta is not None else None
+    if perfil is not None:
+        try:
+            perfil.enable()
+        except ValueError:  # ya hay otro perfil activo en este hilo (operaciones anidadas)
+            _perfilar[nombre], perfil = carpeta, None
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if perfil is not None:
+            perfil.disable()
+        ms = (time.perf_counter() - inicio) * 1000
+        registrar(nombre, ms)
+        if perfil is not None:
+            _guardar_perfil(nombre, perfil, ms, carpeta)
+
+
+def medido(nombre):
+    """Decorador: cada llamada a la función se mide como `nombre`."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def resumen(desde_inicio=True):
+    """{"operaciones": {nombre: datos del histograma}, "contadores": {...}}, de mayor a menor tiempo total."""
+    with _bloqueo:
+        tabla = _histogramas if desde_inicio else _intervalo
+        operaciones = sorted(((n, h.datos()) for n, h in tabla.items()), key=lambda x: -x[1]["total_ms"])
+        contadores = dict(sorted((_contadores if desde_inicio else _contadores_intervalo).items()))
+    return {"operaciones": dict(operaciones), "contadores": contadores}
+
+
+def reiniciar():
+    with _bloqueo:
+        for tabla in (_histogramas, _intervalo, _contadores, _contadores_intervalo):
+            tabla.clear()
+
+# ---------------- perfil con cProfile ---------------- #
+
+def perfilar(operacion, carpeta):
+    """Captura con cProfile la próxima ejecución de `operacion` (una sola vez)."""
+    _perfilar[operacion] = carpeta
+
+
+def perfiles_pedidos():
+    return list(_perfilar)
+
+
+def _guardar_perfil(operacion, perfil, ms, carpeta):
+    global ultimo_perfil
+    fecha = datetime.datetime.now()
+    base = os.path.join(carpeta, f"perfil_{re.sub(r'[^0-9A-Za-z]+', '_', operacion).strip('_')}_"
+                                 f"{fecha.strftime('%Y%m%d%H%M%S')}")
+    texto = io.StringIO()
+    pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(LINEAS_PERFIL)
+    try:
+        os.makedirs(carpeta, exist_ok=True)
+        perfil.dump_stats(base + ".prof")
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(f"{operacion} | {ms:.3f} ms\n{texto.getvalue()}")
+    except OSError:
+        base = None  # sin disco queda igual el resumen en memoria
+    ultimo_perfil = {"operacion": operacion, "fecha": fecha.strftime("%Y-%m-%d %H:%M:%S"), "ms": round(ms, 3),
+                     "archivo": base and base + ".prof", "resumen": texto.getvalue()}
+
+# ---------------- volcado periódico ---------------- #
+
+def volcar(ruta, extra=None):
+    """Agrega una línea con lo medido desde el volcado anterior (no escribe nada si no hubo actividad)."""
+    with _bloqueo:
+        operaciones = {n: h.datos() for n, h in _intervalo.items()}
+        contadores = dict(_contadores_intervalo)
+        _intervalo.clear()
+        _contadores_intervalo.clear()
+    if not operaciones and not contadores:
+        return False
+    linea = {"fecha": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **(extra or {}),
+             "operaciones": operaciones, "contadores": contadores}
+    try:
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write(json.dumps(linea, ensure_ascii=False, separators=(",", ":")) + "\n")
+    except OSError:
+        return False  # las métricas nunca frenan la caja
+    return True
+
+
+def _volcar_y_reprogramar():
+    if _volcado is not None:
+        volcar(_volcado["ruta"], _volcado["extra"])
+        _programar()
+
+
+def _programar():
+    _volcado["temporizador"] = threading.Timer(_volcado["cada"], _volcar_y_reprogramar)
+    _volcado["temporizador"].daemon = True
+    _volcado["temporizador"].start()
+
+
+def iniciar_volcado(ruta, cada=VOLCADO_CADA, extra=None):
+    """Vuelca las métricas a `ruta` cada `cada` segundos y al salir del programa (cada <= 0: solo al salir)."""
+    global _volcado
+    detener_volcado()
+    _volcado = {"ruta": ruta, "cada": cada, "extra": extra, "temporizador": None}
+    if cada > 0:
+        _programar()
+
+
+def volcar_ahora():
+    """Vuelca ya, sin esperar al temporizador (si el volcado periódico está activo)."""
+    return _volcado is not None and volcar(_volcado["ruta"], _volcado["extra"])
+
+
+def detener_volcado():
+    """Cancela el volcado periódico y hace el último."""
+    global _volcado
+    if _volcado is None:
+        return
+    volcado, _volcado = _volcado, None
+    if volcado["temporizador"] is not None:
+        volcado["temporizador"].cancel()
+    volcar(volcado["ruta"], volcado["extra"])
+
+atexit.register(detener_volcado)
+
+# ---------------- consulta de tendencia ---------------- #
+
+def leer_volcados(ruta):
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            try:
+                yield json.loads(linea)
+            except ValueError:
+                continue
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tendencia de las métricas volcadas por el sistema")
+    parser.add_argument("--archivo", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "metricas.jsonl"))
+    parser.add_argument("--operacion", help="solo esta operación (por defecto, todas)")
+    args = parser.parse_args()
+    print(f"{'Fecha':<19} | {'Operación':<32} | {'Cantidad':>8} | {'p50 ms':>9} | {'p95 ms':>9} | {'p99 ms':>9}")
+    for volcado in leer_volcados(args.archivo):
+        for nombre, datos in volcado.get("operaciones", {}).items():
+            if args.operacion and nombre != args.operacion:
+                continue
+            print(f"{volcado['fecha']:<19} | {nombre[:32]:<32} | {datos['cantidad']:>8} | "
+                  f"{datos['p50_ms']:>9.3f} | {datos['p95_ms']:>9.3f} | {datos['p99_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
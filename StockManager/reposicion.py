@@ -0,0 +1,117 @@
+"""
+Pronóstico de ventas y sugerencias de reposición.
+
+La velocidad de venta de cada producto (unidades por día) se estima con suavizado
+exponencial sobre las ventas diarias: al cerrar un día con u unidades vendidas,
+nivel = ALFA * u + (1 - ALFA) * nivel, y cada día sin ventas multiplica el nivel por
+(1 - ALFA). El estado por producto es [nivel, día abierto (ordinal), unidades del día
+abierto], así que cada venta lo actualiza en tiempo constante, sin recorrer el historial.
+Con la velocidad se calculan los días que quedan hasta agotar el stock y la cantidad a
+pedir para cubrir el plazo de entrega más DIAS_COBERTURA días.
+
+Orden de compra nocturna (por ejemplo con cron o el Programador de tareas):
+  python reposicion.py [--salida orden_compra.csv] [--plazo 3] [--cobertura 14]
+"""
+
+import argparse
+import datetime
+import math
+import os
+
+import csv_ventas
+
+ALFA = 0.2             # peso del último día en el promedio suavizado
+PLAZO_ENTREGA = 3      # días que tarda en llegar un pedido al proveedor
+DIAS_SEGURIDAD = 2     # margen extra antes de quedarse sin stock
+DIAS_COBERTURA = 14    # días de venta que debe cubrir cada pedido después de llegar
+ENCABEZADO_ORDEN = ["ID", "Producto", "Stock", "Venta diaria", "Días restantes", "Cantidad sugerida"]
+
+# ---------------- velocidad de venta ---------------- #
+
+def registrar(estados, clave, dia, cantidad):
+    """Suma `cantidad` unidades vendidas el día `dia` (ordinal) al estado del producto `clave`."""
+    estado = estados.get(clave)
+    if estado is None:
+        estados[clave] = [None, dia, cantidad]
+        return
+    nivel, abierto, unidades = estado
+    if dia == abierto:
+        estado[2] += cantidad
+    elif dia > abierto:
+        # Se cierra el día abierto y se descuentan los días sin ventas que siguieron
+        nivel = unidades if nivel is None else ALFA * unidades + (1 - ALFA) * nivel
+        estado[:] = [nivel * (1 - ALFA) ** (dia - abierto - 1), dia, cantidad]
+    elif nivel is None:
+        estado[0] = cantidad * (1 - ALFA) ** (abierto - 1 - dia)
+    else:
+        # Venta de un día ya cerrado (importada tarde): su aporte al promedio es lineal
+        estado[0] += ALFA * cantidad * (1 - ALFA) ** (abierto - 1 - dia)
+
+def velocidad(estado, hoy):
+    """Unidades por día estimadas al comenzar el día `hoy` (ordinal)."""
+    if estado is None:
+        return 0.0
+    nivel, abierto, unidades = estado
+    if abierto >= hoy:
+        # El día abierto todavía no terminó: lo vendido hasta ahora solo puede subir la estimación
+        if nivel is None:
+            return float(unidades)
+        return max(nivel, ALFA * unidades + (1 - ALFA) * nivel)
+    nivel = unidades if nivel is None else ALFA * unidades + (1 - ALFA) * nivel
+    return nivel * (1 - ALFA) ** (hoy - abierto - 1)
+
+def dias_restantes(stock, venta_diaria):
+    """Días hasta agotar el stock al ritmo actual (None si no se vende)."""
+    if venta_diaria <= 0:
+        return None
+    return stock / venta_diaria
+
+# ---------------- sugerencias ---------------- #
+
+def sugerencias(productos, estados, hoy, plazo=PLAZO_ENTREGA, seguridad=DIAS_SEGURIDAD, cobertura=DIAS_COBERTURA):
+    """Productos a reponer, del más urgente al menos urgente.
+
+    `productos` son los del inventario y `estados` el estado de velocidad de cada uno
+    por nombre.casefold(). Se sugiere pedir cuando el stock no alcanza para el plazo de
+    entrega más el margen de seguridad; la cantidad cubre el plazo más `cobertura` días.
+    """
+    lista = []
+    for p in productos:
+        venta_diaria = velocidad(estados.get(p["nombre"].casefold()), hoy)
+        restantes = dias_restantes(p["stock"], venta_diaria)
+        if restantes is None or restantes > plazo + seguridad:
+            continue
+        # Redondeo previo: el suavizado deja restos como 6.000000000000001 que ceil() convertiría en una unidad más
+        cantidad = math.ceil(round(venta_diaria * (plazo + cobertura), 6)) - p["stock"]
+        if cantidad <= 0:
+            continue
+        lista.append({"id": p["id"], "nombre": p["nombre"], "stock": p["stock"], "venta_diaria": venta_diaria,
+                      "dias_restantes": restantes, "cantidad": cantidad})
+    lista.sort(key=lambda s: (s["dias_restantes"], s["id"]))
+    return lista
+
+def escribir_orden(ruta, lista):
+    """Escribe la orden de compra en CSV (o .csv.gz); devuelve cuántas líneas tiene."""
+    filas = ([s["id"], s["nombre"], s["stock"], f"{s['venta_diaria']:.2f}", f"{s['dias_restantes']:.1f}", s["cantidad"]]
+             for s in lista)
+    return csv_ventas.escribir_filas(ruta, filas, ENCABEZADO_ORDEN)
+
+def nombre_orden(fecha=None):
+    """Nombre del archivo de la orden de compra del día: orden_compra_YYYYMMDD.csv."""
+    return f"orden_compra_{(fecha or datetime.date.today()).strftime('%Y%m%d')}.csv"
+
+if __name__ == "__main__":
+    import main
+
+    parser = argparse.ArgumentParser(description="Genera la orden de compra con las sugerencias de reposición")
+    parser.add_argument("--salida", help="archivo CSV (por defecto orden_compra_<fecha>.csv junto a los datos)")
+    parser.add_argument("--plazo", type=int, default=PLAZO_ENTREGA, help="días de entrega del proveedor")
+    parser.add_argument("--seguridad", type=int, default=DIAS_SEGURIDAD, help="días de margen")
+    parser.add_argument("--cobertura", type=int, default=DIAS_COBERTURA, help="días que debe cubrir el pedido")
+    args = parser.parse_args()
+    main.cargar_inventario()
+    main.cargar_ventas()
+    ruta = main.ruta_de_datos(args.salida, os.path.join(main.BASE_DIR, nombre_orden()))
+    lineas = main.generar_orden_compra(ruta, args.plazo, args.seguridad, args.cobertura)
+    main.vaciar_pendientes()
+    print(f"{lineas} productos a reponer en {ruta}")
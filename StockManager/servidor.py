@@ -0,0 +1,424 @@
+"""
+Servicio HTTP/JSON local sobre el motor de inventario y ventas (main.py).
+Permite manejar el sistema desde lectores de código de barras, la tienda web o
+pruebas de carga, sin pasar por los menús.
+
+Uso:  python servidor.py [--host 127.0.0.1] [--puerto 8765]
+
+Cada pedido lleva el usuario y la contraseña del sistema (autenticación HTTP Basic);
+sin ellos la respuesta es 401. Las rutas marcadas (admin) responden 403 a los cajeros,
+igual que en el menú, y los cambios quedan en la bitácora a nombre de quien los pidió.
+
+Rutas:
+  GET    /productos                  lista (?bajo=N: solo stock menor a N; ?buscar=texto[&limite=N]: por nombre;
+                                     ?al=YYYY-MM-DD[ HH:MM:SS]: como estaba en esa fecha, según el historial)
+  GET    /productos/codigo/<código>  producto con ese código de barras (EAN-13, UPC-A o EAN-8)
+  POST   /productos                  {"nombre", "precio", "stock", "codigos"?}
+  GET    /productos/<id>
+  PATCH  /productos/<id>             {"nombre"?, "precio"?, "stock"?, "codigos"?}
+  DELETE /productos/<id>                                                    (admin)
+  POST   /productos/lote             {"movimientos": [{"id" o "nombre", "stock"?, "porcentaje"?}]}
+  POST   /productos/deshacer         deshace el último cambio de inventario (POST /productos/rehacer lo repite) (admin)
+  POST   /ventas                     {"items": [{"id", "codigo" o "nombre", "cantidad"}], "cliente"?, "proxima_visita"?}
+  GET    /clientes/visitas?desde=YYYY-MM-DD&hasta=YYYY-MM-DD   clientes con próxima visita en ese rango
+  POST   /clientes                   {"nombre", "proxima_visita"?} (si ya existe, actualiza la visita)
+  GET    /reportes/general
+  GET    /reportes/fecha?desde=YYYY-MM-DD&hasta=YYYY-MM-DD
+  GET    /reportes/producto?nombre=...
+  GET    /reportes/nunca-vendidos
+  GET    /reportes/periodo?periodo=dia|semana|mes&desde=&hasta=
+  GET    /reportes/caja                sesión de caja abierta en esta terminal (null si está cerrada)
+  GET    /reportes/cierres?desde=&hasta=&caja=   reportes Z de las sesiones cerradas
+  GET    /reportes/reposicion        sugerencias de reposición (?plazo=&seguridad=&cobertura= en días)
+  GET    /reportes/analisis?desde=&hasta=&periodo=dia|semana|mes&top=N&ventana=N
+  GET    /metricas                   tiempos por operación (cantidad, p50/p95/p99 ms) y contadores desde el arranque (admin)
+                                     (?desde=volcado: solo desde el último volcado a metricas.jsonl)
+
+Las lecturas se atienden en paralelo; todo cambio de estado pasa por un único
+hilo escritor, en el orden de llegada, y mientras aplica un cambio no hay lecturas
+a medias (ver LectoresEscritor). Con SQLite o en modo multiterminal, antes de
+responder una lectura se incorpora lo que guardaron otras cajas (como mucho cada
+REFRESCO_CADA segundos).
+"""
+
+import argparse
+import base64
+import binascii
+import contextlib
+import hashlib
+import json
+import queue
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import main
+import metricas
+
+
+class LectoresEscritor:
+    """Muchas lecturas a la vez o un solo cambio; un cambio en espera frena las lecturas nuevas.
+
+    No se puede anidar: quien lee no debe esperar a un cambio (escritor.ejecutar) sin soltar antes.
+    """
+
+    def __init__(self):
+        self.condicion = threading.Condition()
+        self.lectores = 0
+        self.escribiendo = False
+        self.esperando = 0
+
+    @contextlib.contextmanager
+    def lectura(self):
+        with self.condicion:
+            while self.escribiendo or self.esperando:
+                self.condicion.wait()
+            self.lectores += 1
+        try:
+            yield
+        finally:
+            with self.condicion:
+                self.lectores -= 1
+                if not self.lectores:
+                    self.condicion.notify_all()
+
+    @contextlib.contextmanager
+    def escritura(self):
+        with self.condicion:
+            self.esperando += 1
+            while self.escribiendo or self.lectores:
+                self.condicion.wait()
+            self.esperando -= 1
+            self.escribiendo = True
+        try:
+            yield
+        finally:
+            with self.condicion:
+                self.escribiendo = False
+                self.condicion.notify_all()
+
+
+bloqueo_datos = LectoresEscritor()  # las lecturas de main.* no se cruzan con los cambios del escritor
+
+
+class Escritor(threading.Thread):
+    """Único hilo que aplica los cambios de estado, uno detrás de otro."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.cola = queue.Queue()
+
+    def run(self):
+        while True:
+            funcion, args, usuario, pedido = self.cola.get()
+            try:
+                with bloqueo_datos.escritura():
+                    main.usuario_actual = usuario  # la bitácora y el historial anotan quién pidió el cambio
+                    try:
+                        pedido["resultado"] = funcion(*args)
+                    finally:
+                        main.usuario_actual = None
+            except Exception as e:
+                pedido["error"] = e
+            pedido["listo"].set()
+
+    def ejecutar(self, funcion, *args, usuario=None):
+        """Encola el cambio (a nombre de `usuario`) y espera su resultado (o relanza su error)."""
+        pedido = {"listo": threading.Event()}
+        self.cola.put((funcion, args, usuario, pedido))
+        pedido["listo"].wait()
+        if "error" in pedido:
+            raise pedido["error"]
+        return pedido["resultado"]
+
+
+escritor = Escritor()
+
+CREDENCIALES_VIGENCIA = 60  # segundos que se recuerda un usuario ya verificado (scrypt es lento a propósito)
+_verificados = {}  # sha256 de la cabecera Authorization -> (nombre, vence)
+_bloqueo_verificados = threading.Lock()
+
+REFRESCO_CADA = 0.5  # segundos mínimos entre dos relecturas de lo que guardaron otras cajas
+_ultimo_refresco = 0.0
+
+
+def refrescar():
+    """Incorpora lo que otras cajas (u otro servicio) guardaron desde la última relectura."""
+    global _ultimo_refresco
+    if time.monotonic() - _ultimo_refresco < REFRESCO_CADA:
+        return  # otro pedido ya lo releyó mientras este esperaba en la cola
+    main.refrescar_inventario()
+    main.refrescar_ventas()
+    main.refrescar_clientes()
+    _ultimo_refresco = time.monotonic()
+
+
+class NoAutorizado(Exception):
+    """Pedido sin usuario y contraseña válidos (401)."""
+
+
+class Prohibido(Exception):
+    """El usuario no tiene el rol que pide la ruta (403)."""
+
+
+def usuario_del_pedido(cabecera):
+    """Usuario de una cabecera 'Basic ...'; NoAutorizado si falta, está mal formada o no es válida."""
+    tipo, _, credencial = (cabecera or "").partition(" ")
+    if tipo.lower() != "basic" or not credencial:
+        raise NoAutorizado("Se requiere usuario y contraseña (autenticación HTTP Basic).")
+    clave = hashlib.sha256(cabecera.encode("utf-8")).digest()
+    ahora = time.monotonic()
+    with _bloqueo_verificados:
+        nombre, vence = _verificados.get(clave, (None, 0))
+    if vence > ahora and nombre in main.usuarios_por_nombre:
+        return main.usuarios_por_nombre[nombre]
+    try:
+        nombre, separador, password = base64.b64decode(credencial, validate=True).decode("utf-8").partition(":")
+    except (binascii.Error, UnicodeDecodeError):
+        separador = ""
+    if not separador:
+        raise NoAutorizado("Credenciales mal formadas.")
+    try:
+        # Verificar anota los fallos y bloqueos en usuarios.json: pasa por el escritor como cualquier cambio
+        usuario = escritor.ejecutar(main.verificar_credenciales, nombre, password)
+    except ValueError as e:
+        raise NoAutorizado(str(e)) from None
+    if usuario["nombre"] == "admin" and password == main.PASSWORD_INICIAL:
+        raise Prohibido("Cambie la contraseña inicial del admin desde el sistema antes de usar el servicio.")
+    with _bloqueo_verificados:
+        _verificados[clave] = (usuario["nombre"], ahora + CREDENCIALES_VIGENCIA)
+    return usuario
+
+
+def solo_admin(usuario):
+    if usuario["rol"] != "admin":
+        raise Prohibido("Solo un administrador puede hacer esto.")
+
+
+def codificar(resultado):
+    return json.dumps(resultado, ensure_ascii=False).encode("utf-8")
+
+
+def lista_de_objetos(valor, campo):
+    if not isinstance(valor, list) or not all(isinstance(v, dict) for v in valor):
+        raise ValueError(f"'{campo}' debe ser una lista de objetos.")
+    return valor
+
+
+class Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # conexiones persistentes para los clientes de carga
+    disable_nagle_algorithm = True  # cabeceras y cuerpo salen sin esperar el ACK retrasado
+
+    # --- respuestas ---
+
+    def responder(self, estado, cuerpo):
+        self.send_response(estado)
+        if estado == 401:
+            self.send_header("WWW-Authenticate", 'Basic realm="StockManager", charset="UTF-8"')
+        if estado in (401, 403):
+            self.send_header("Connection", "close")  # el cuerpo del pedido quedó sin leer
+            self.close_connection = True
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def leer_cuerpo(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        if not largo:
+            return {}
+        datos = json.loads(self.rfile.read(largo))
+        if not isinstance(datos, dict):
+            raise ValueError("Se esperaba un objeto JSON.")
+        return datos
+
+    def log_message(self, formato, *args):
+        pass  # sin una línea por pedido en la consola
+
+    def atender(self, metodo):
+        url = urlparse(self.path)
+        partes = [p for p in url.path.split("/") if p]
+        consulta = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        # Los IDs no cuentan en el nombre de la métrica: /productos/7 y /productos/8 se miden juntos
+        ruta = "/".join("<id>" if p.isdigit() else p for p in partes[:2])
+        try:
+            with metricas.medir(f"http {metodo} /{ruta}"):
+                self.usuario = usuario_del_pedido(self.headers.get("Authorization"))
+                if metodo == "GET":
+                    if (main.usa_sqlite() or main.MULTITERMINAL) and time.monotonic() - _ultimo_refresco >= REFRESCO_CADA:
+                        escritor.ejecutar(refrescar)  # releer cambia el estado compartido: va por el escritor
+                    # La respuesta se arma y se codifica sin que el escritor cambie nada mientras tanto
+                    with bloqueo_datos.lectura():
+                        estado, resultado = self.despachar(metodo, partes, consulta)
+                        cuerpo = codificar(resultado)
+                else:
+                    estado, resultado = self.despachar(metodo, partes, consulta)
+                    with bloqueo_datos.lectura():  # lo devuelto puede ser un producto que el escritor sigue cambiando
+                        cuerpo = codificar(resultado)
+        except NoAutorizado as e:
+            estado, cuerpo = 401, codificar({"error": str(e)})
+        except Prohibido as e:
+            estado, cuerpo = 403, codificar({"error": str(e)})
+        except ValueError as e:
+            estado, cuerpo = 400, codificar({"error": str(e)})
+        except Exception as e:
+            estado, cuerpo = 500, codificar({"error": f"Error inesperado: {e}"})
+        self.responder(estado, cuerpo)
+
+    def do_GET(self):
+        self.atender("GET")
+
+    def do_POST(self):
+        self.atender("POST")
+
+    def do_PATCH(self):
+        self.atender("PATCH")
+
+    def do_DELETE(self):
+        self.atender("DELETE")
+
+    # --- rutas ---
+
+    def despachar(self, metodo, partes, consulta):
+        if partes[:1] == ["productos"]:
+            return self.productos(metodo, partes[1:], consulta)
+        if partes == ["ventas"] and metodo == "POST":
+            datos = self.leer_cuerpo()
+            return 201, escritor.ejecutar(self.vender, lista_de_objetos(datos.get("items", []), "items"),
+                                          datos.get("cliente", ""), datos.get("proxima_visita", ""), usuario=self.usuario)
+        if partes == ["clientes"] and metodo == "POST":
+            datos = self.leer_cuerpo()
+            return 201, escritor.ejecutar(main.alta_cliente, datos.get("nombre", ""), datos.get("proxima_visita", ""),
+                                          usuario=self.usuario)
+        if partes == ["clientes", "visitas"] and metodo == "GET":
+            return 200, main.clientes_con_visita(consulta.get("desde"), consulta.get("hasta"))
+        if partes == ["metricas"] and metodo == "GET":
+            solo_admin(self.usuario)
+            return 200, dict(metricas.resumen(consulta.get("desde") != "volcado"), perfil=metricas.ultimo_perfil)
+        if partes[:1] == ["reportes"] and len(partes) == 2 and metodo == "GET":
+            return 200, self.reporte(partes[1], consulta)
+        return 404, {"error": "Ruta no encontrada."}
+
+    def productos(self, metodo, resto, consulta):
+        if not resto:
+            if metodo == "GET":
+                if "bajo" in consulta:
+                    return 200, main.productos_con_stock_menor(int(consulta["bajo"]))
+                if "al" in consulta:
+                    return 200, main.inventario_al(consulta["al"])
+                if "buscar" in consulta:
+                    return 200, main.buscar_productos(consulta["buscar"], int(consulta.get("limite", main.MAX_RESULTADOS)))
+                return 200, list(main.inventario)
+            if metodo == "POST":
+                datos = self.leer_cuerpo()
+                producto = escritor.ejecutar(main.alta_producto, datos.get("nombre", ""), datos.get("precio"), datos.get("stock"),
+                                             datos.get("codigos", ()), usuario=self.usuario)
+                return 201, producto
+            return 405, {"error": "Método no permitido."}
+        if resto == ["lote"] and metodo == "POST":
+            datos = self.leer_cuerpo()
+            movimientos = [self.movimiento(i, m) for i, m in enumerate(lista_de_objetos(datos.get("movimientos", []), "movimientos"), start=1)]
+            return 200, {"productos": escritor.ejecutar(main.aplicar_lote, movimientos, "servicio HTTP", usuario=self.usuario)}
+        if resto in (["deshacer"], ["rehacer"]) and metodo == "POST":
+            solo_admin(self.usuario)
+            return 200, escritor.ejecutar(main.deshacer, resto == ["rehacer"], usuario=self.usuario)
+        if len(resto) == 2 and resto[0] == "codigo" and metodo == "GET":
+            producto = main.buscar_por_codigo(main.normalizar_codigo(resto[1]))
+            return (200, producto) if producto else (404, {"error": "Código no registrado."})
+        if len(resto) != 1 or not resto[0].isdigit():
+            return 404, {"error": "Ruta no encontrada."}
+        pid = int(resto[0])
+        if metodo == "GET":
+            producto = main.buscar_producto(pid)
+            return (200, producto) if producto else (404, {"error": "ID no encontrado."})
+        if metodo == "PATCH":
+            datos = self.leer_cuerpo()
+            producto = escritor.ejecutar(self.modificar, pid, datos, usuario=self.usuario)
+            return 200, producto
+        if metodo == "DELETE":
+            solo_admin(self.usuario)
+            return 200, escritor.ejecutar(main.baja_producto, pid, usuario=self.usuario)
+        return 405, {"error": "Método no permitido."}
+
+    @staticmethod
+    def vender(items, cliente, proxima_visita):
+        # Los códigos y nombres se resuelven en el escritor: entre medio otro cambio podría renombrar o borrar
+        return main.vender([(main.id_de_item(i), i.get("cantidad")) for i in items], cliente, proxima_visita)
+
+    @staticmethod
+    def movimiento(numero, datos):
+        """(línea, id, nombre, delta de stock, % de precio) de un movimiento del lote, como los de main.validar_lote."""
+        try:
+            pid = int(datos["id"]) if datos.get("id") is not None else None
+            return numero, pid, str(datos.get("nombre", "")), int(datos.get("stock") or 0), float(datos.get("porcentaje") or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f"Movimiento {numero}: id, stock o porcentaje no válidos.") from None
+
+    @staticmethod
+    def modificar(pid, datos):
+        if "nombre" in datos or "precio" in datos:
+            main.editar_producto(pid, datos.get("nombre"), datos.get("precio"))
+        if "stock" in datos:
+            main.fijar_stock(pid, datos["stock"])
+        if "codigos" in datos:
+            main.fijar_codigos(pid, datos["codigos"])
+        producto = main.buscar_producto(pid)
+        if producto is None:
+            raise ValueError("ID no encontrado.")
+        return producto
+
+    def reporte(self, nombre, consulta):
+        if nombre == "general":
+            return main.datos_reporte_general()
+        if nombre == "fecha":
+            return main.datos_ventas_por_fecha(consulta.get("desde"), consulta.get("hasta"))
+        if nombre == "producto":
+            return main.datos_historial_producto(consulta.get("nombre", ""))
+        if nombre == "nunca-vendidos":
+            return main.datos_nunca_vendidos()
+        if nombre == "periodo":
+            return [{"periodo": clave, "total": total}
+                    for clave, total in main.datos_ventas_por_periodo(consulta.get("periodo", "dia"), consulta.get("desde"),
+                                                                      consulta.get("hasta"))]
+        if nombre == "caja":
+            return main.datos_caja()
+        if nombre == "cierres":
+            return main.datos_cierres(consulta.get("desde"), consulta.get("hasta"), consulta.get("caja"))
+        if nombre == "reposicion":
+            return main.datos_reposicion(int(consulta.get("plazo", main.reposicion.PLAZO_ENTREGA)),
+                                         int(consulta.get("seguridad", main.reposicion.DIAS_SEGURIDAD)),
+                                         int(consulta.get("cobertura", main.reposicion.DIAS_COBERTURA)))
+        if nombre == "analisis":
+            return main.datos_analisis(consulta.get("desde"), consulta.get("hasta"), consulta.get("periodo", "mes"),
+                                       int(consulta.get("top", 10)), int(consulta.get("ventana", 7)))
+        raise ValueError("Reporte no válido.")
+
+
+def iniciar(host="127.0.0.1", puerto=8765):
+    main.cargar_inventario()
+    main.cargar_ventas()
+    main.cargar_usuarios()
+    main.cargar_clientes()
+    main.cargar_caja()
+    main.liberar_reservas(todas=not main.MULTITERMINAL)
+    main.iniciar_metricas()
+    escritor.start()
+    servidor = ThreadingHTTPServer((host, puerto), Manejador)
+    servidor.daemon_threads = True
+    print(f"Servicio escuchando en http://{host}:{puerto} (Ctrl+C para detener)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        main.vaciar_pendientes()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON del sistema de inventario y ventas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    args = parser.parse_args()
+    iniciar(args.host, args.puerto)
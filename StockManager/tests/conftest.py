@@ -0,0 +1,67 @@
+"""
+Cada prueba usa main.py sobre una carpeta temporal propia: las rutas de datos apuntan
+a tmp_path y el estado en memoria del módulo vuelve al de recién importado (monkeypatch
+lo deja como estaba al terminar). Por defecto corre con los dos almacenes, JSON y SQLite.
+"""
+
+import copy
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+import ventas_compactas  # noqa: E402
+
+# Constantes con rutas dentro de BASE_DIR -> nombre del archivo
+RUTAS = {nombre: os.path.basename(valor) for nombre, valor in vars(main).items()
+         if nombre.isupper() and isinstance(valor, str) and os.path.dirname(valor) == main.BASE_DIR}
+# Estado en memoria (inventario, ventas, índices, ...) tal como queda al importar main
+ESTADO = {nombre: copy.deepcopy(valor) for nombre, valor in vars(main).items()
+          if not nombre.isupper() and not nombre.startswith("__")
+          and isinstance(valor, (list, dict, set, int, float, type(None), ventas_compactas.Ventas))}
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def almacen(request):
+    return request.param
+
+
+@pytest.fixture
+def main_vacio(tmp_path, monkeypatch, almacen):
+    """main.py apuntando a tmp_path, sin datos cargados."""
+    for nombre, archivo in RUTAS.items():
+        monkeypatch.setattr(main, nombre, str(tmp_path / archivo))
+    for nombre, valor in ESTADO.items():
+        monkeypatch.setattr(main, nombre, copy.deepcopy(valor))
+    monkeypatch.setattr(main, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "ALMACEN", almacen)
+    monkeypatch.setattr(main, "MULTITERMINAL", False)
+    monkeypatch.setattr(main, "VENTANA_ESCRITURA", 3600)  # lo diferido se escribe con vaciar_pendientes()
+    yield tmp_path
+    main.vaciar_pendientes()
+    main.vaciar_bitacora()
+    if main._conexion is not None:
+        main._conexion.close()
+
+
+@pytest.fixture
+def datos(main_vacio):
+    """main.py con un inventario vacío ya cargado (y las ventas y clientes, vacíos también)."""
+    with open(main_vacio / "inventario.json", "w", encoding="utf-8") as f:
+        json.dump({"inventario": [], "siguiente_id": 1}, f)
+    main.cargar_inventario()
+    main.cargar_ventas()
+    main.cargar_clientes()
+    return main_vacio
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    """La hora de main.timestamp(): reloj[0], en 2030 (después de la instantánea inicial)."""
+    ahora = ["2030-01-01 10:00:00"]
+    monkeypatch.setattr(main, "timestamp", lambda: ahora[0])
+    return ahora
@@ -0,0 +1,70 @@
+import json
+import sqlite3
+
+import pytest
+
+import almacen_sqlite
+import main
+
+
+@pytest.fixture
+def almacen():
+    return "sqlite"
+
+
+def test_la_primera_conexion_importa_los_archivos_json(main_vacio):
+    with open(main.INVENTARIO_FILE, "w", encoding="utf-8") as f:
+        json.dump({"inventario": [{"id": 4, "nombre": "Yerba", "precio": 10.5, "stock": 3}], "siguiente_id": 5}, f)
+    with open(main.VENTAS_FILE, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"fecha": "2030-01-01 10:00:00", "items": [{"nombre": "Yerba", "cantidad": 2, "subtotal": 21.0}],
+                            "total": 21.0, "cliente": "", "proxima_visita": ""}) + "\n")
+    main.cargar_inventario()
+    main.cargar_ventas()
+    assert main.buscar_producto(4)["precio"] == 10.5
+    assert main.siguiente_id == 5
+    assert main.datos_reporte_general()["total"] == 21.0
+
+
+def test_los_montos_se_guardan_en_centavos_enteros(datos, reloj):
+    producto = main.alta_producto("Yerba", "10.10", 10)
+    main.vender([(producto["id"], 3)])
+    con = main.conexion()
+    assert tuple(con.execute("SELECT typeof(precio), precio FROM productos").fetchone()) == ("integer", 1010)
+    assert tuple(con.execute("SELECT typeof(total), total FROM ventas").fetchone()) == ("integer", 3030)
+    assert con.execute("SELECT subtotal FROM items_venta").fetchone()[0] == 3030
+
+
+def test_una_base_con_montos_real_se_pasa_a_centavos(tmp_path):
+    ruta = str(tmp_path / "vieja.db")
+    con = sqlite3.connect(ruta)
+    con.executescript("""
+        CREATE TABLE meta (clave TEXT PRIMARY KEY, valor TEXT);
+        CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL, nombre_clave TEXT NOT NULL,
+                                precio REAL NOT NULL, stock INTEGER NOT NULL);
+        CREATE TABLE ventas (id INTEGER PRIMARY KEY AUTOINCREMENT, fecha TEXT NOT NULL, total REAL NOT NULL,
+                             cliente TEXT, proxima_visita TEXT);
+        CREATE TABLE items_venta (venta_id INTEGER NOT NULL REFERENCES ventas(id), nombre TEXT NOT NULL,
+                                  cantidad INTEGER NOT NULL, subtotal REAL NOT NULL);
+        INSERT INTO productos VALUES (1, 'Yerba', 'yerba', 0.1, 5);
+        INSERT INTO ventas VALUES (7, '2030-01-01 10:00:00', 0.30000000000000004, '', '');
+        INSERT INTO items_venta VALUES (7, 'Yerba', 1, 0.1), (7, 'Yerba', 2, 0.2);
+    """)
+    con.commit()
+    con.close()
+    con = almacen_sqlite.conectar(ruta)
+    assert con.execute("SELECT precio FROM productos").fetchone()[0] == 10
+    assert tuple(con.execute("SELECT typeof(total), total FROM ventas").fetchone()) == ("integer", 30)
+    assert [f[0] for f in con.execute("SELECT subtotal FROM items_venta ORDER BY rowid")] == [10, 20]
+    assert almacen_sqlite._insertar_venta(con, {"fecha": "2030-01-02 10:00:00", "items": [], "total": 1}) == 8
+    con.close()
+
+
+def test_al_iniciar_no_se_cargan_las_ventas_en_memoria(datos, reloj):
+    producto = main.alta_producto("Azúcar", 80, 10)
+    main.vender([(producto["id"], 1)])
+    main.vender([(producto["id"], 2)])
+    main.cargar_ventas()
+    assert len(main.ventas) == 0
+    assert main.datos_reporte_general()["ventas"] == 2
+    assert main.datos_historial_producto("azucar")["cantidad"] == 3
+    assert [v["total"] for v in main.datos_ventas_por_fecha("2030-01-01", "2030-01-01")["ventas"]] == [80.0, 160.0]
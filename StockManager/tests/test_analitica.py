@@ -0,0 +1,54 @@
+import pytest
+
+import analitica
+import main
+
+VENTAS = [
+    {"fecha": "2030-01-01 10:00:00", "items": [{"nombre": "Yerba", "cantidad": 2, "subtotal": 200.0}], "total": 200.0},
+    {"fecha": "2030-01-01 11:00:00", "items": [{"nombre": "Sal", "cantidad": 5, "subtotal": 50.0},
+                                               {"nombre": "yerba", "cantidad": 1, "subtotal": 100.0}], "total": 150.0},
+    {"fecha": "2030-01-04 10:00:00", "items": [{"nombre": "Sal", "cantidad": 1, "subtotal": 10.0}], "total": 10.0},
+    {"fecha": "2030-02-01 10:00:00", "items": [{"nombre": "Café", "cantidad": 1, "subtotal": 900.0}], "total": 900.0},
+]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def tabla(request, monkeypatch):
+    if request.param == "numpy" and analitica.np is None:
+        pytest.skip("NumPy no está instalado")
+    monkeypatch.setattr(analitica, "USAR_NUMPY", request.param == "numpy")
+    return analitica.agregar(analitica.nueva_tabla(), VENTAS)
+
+
+def test_ingresos_por_periodo_y_rango(tabla):
+    assert analitica.por_periodo(tabla, "mes") == [("2030-01", 360.0), ("2030-02", 900.0)]
+    assert analitica.por_periodo(tabla, "dia", "2030-01-02", "2030-01-31") == [("2030-01-04", 10.0)]
+    with pytest.raises(ValueError):
+        analitica.por_periodo(tabla, "anio")
+
+
+def test_mas_vendidos_por_cantidad_y_por_ingreso(tabla):
+    assert analitica.mas_vendidos(tabla, 2) == [{"nombre": "Sal", "cantidad": 6, "ingreso": 60.0},
+                                                {"nombre": "Yerba", "cantidad": 3, "ingreso": 300.0}]
+    assert [d["nombre"] for d in analitica.mas_vendidos(tabla, 3, "ingreso")] == ["Café", "Yerba", "Sal"]
+    assert analitica.mas_vendidos(tabla, 5, desde="2030-03-01") == []
+
+
+def test_percentiles_como_numpy_y_media_movil_con_dias_sin_ventas(tabla):
+    assert analitica.percentiles(tabla, (0, 50, 100)) == {0: 10.0, 50: 175.0, 100: 900.0}
+    assert analitica.percentiles(tabla, desde="2031-01-01") == {}
+    medias = analitica.media_movil(tabla, 3, hasta="2030-01-31")
+    assert medias == [("2030-01-03", 350.0 / 3), ("2030-01-04", 10.0 / 3)]
+
+
+def test_el_analisis_de_main_agrega_solo_las_ventas_nuevas(datos, reloj):
+    yerba = main.alta_producto("Yerba", 100, 50)
+    main.vender([(yerba["id"], 2)])
+    assert main.datos_analisis()["periodos"] == [("2030-01", 200.0)]
+    tabla = main.tabla_analitica
+    reloj[0] = "2030-02-01 10:00:00"
+    main.vender([(yerba["id"], 1)])
+    analisis = main.datos_analisis(top=1)
+    assert main.tabla_analitica is tabla
+    assert analisis["periodos"] == [("2030-01", 200.0), ("2030-02", 100.0)]
+    assert analisis["mas_vendidos"] == [{"nombre": "Yerba", "cantidad": 3, "ingreso": 300.0}]
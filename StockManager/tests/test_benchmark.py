@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+
+import benchmark
+import main
+
+BENCHMARK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark.py")
+
+
+def test_los_datos_sinteticos_son_validos_y_cronologicos(tmp_path):
+    inventario = benchmark.generar_inventario(str(tmp_path), 25)
+    assert all(main.normalizar_codigo(p["codigos"][0]) == p["codigos"][0] for p in inventario)
+    cantidad = benchmark.generar_ventas(str(tmp_path), inventario, 0.02, 4)
+    with open(tmp_path / "registro_ventas.txt", encoding="utf-8") as f:
+        ventas = [json.loads(linea) for linea in f]
+    assert cantidad == len(ventas) == 7 * 4
+    assert [v["fecha"] for v in ventas] == sorted(v["fecha"] for v in ventas)
+
+
+def test_una_corrida_chica_guarda_y_compara_resultados(tmp_path, almacen):
+    comando = [sys.executable, BENCHMARK, "--productos", "30", "--anios", "0.02", "--ventas-dia", "5",
+               "--repeticiones", "1", "--almacen", almacen]
+    primera = subprocess.run(comando + ["--salida", "antes.json"], cwd=tmp_path, capture_output=True, text=True, timeout=120)
+    assert primera.returncode == 0, primera.stderr
+    with open(tmp_path / "antes.json", encoding="utf-8") as f:
+        resultados = json.load(f)["resultados"]
+    operaciones = {r["operacion"] for r in resultados}
+    assert {"registrar_venta (por venta)", "cargar_ventas (sin copia, lee todo)", "buscar_productos"} <= operaciones
+    assert all(r["almacen"] == almacen and r["ventas"] == 35 and r["mediana_ms"] >= 0 for r in resultados)
+    segunda = subprocess.run(comando + ["--comparar", "antes.json"], cwd=tmp_path, capture_output=True, text=True, timeout=120)
+    assert segunda.returncode == 0, segunda.stderr
+    assert "vs anterior" in segunda.stdout
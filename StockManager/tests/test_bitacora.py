@@ -0,0 +1,68 @@
+import os
+
+import bitacora
+import main
+
+
+def escribir(ruta, registros, **opciones):
+    escritor = bitacora.Escritor(str(ruta), **opciones)
+    escritor.start()
+    for registro in registros:
+        escritor.registrar(registro)
+    escritor.vaciar()
+
+
+def test_los_cambios_quedan_a_nombre_del_usuario_y_del_producto(datos, reloj, monkeypatch):
+    monkeypatch.setattr(main, "usuario_actual", {"nombre": "ana", "rol": "admin"})
+    producto = main.alta_producto("Yerba", 100, 10)
+    main.fijar_stock(producto["id"], 12)
+    main.vaciar_bitacora()
+    registros = list(bitacora.consultar(main.LOG_FILE, usuario="ANA", producto=producto["id"]))
+    assert [r["evento"] for r in registros] == ["Alta producto", "Actualización stock"]
+    assert registros[1] == {"fecha": "2030-01-01 10:00:00", "evento": "Actualización stock", "usuario": "ana",
+                            "producto": producto["id"], "detalle": "Yerba | Antes: 10 | Ahora: 12"}
+
+
+def test_al_cambiar_el_dia_se_rota_a_un_segmento_comprimido(tmp_path):
+    ruta = tmp_path / "bitacora.jsonl"
+    escribir(ruta, [{"fecha": "2030-01-01 10:00:00", "evento": "Login"}, {"fecha": "2030-01-01 18:00:00", "evento": "Logout"}])
+    escribir(ruta, [{"fecha": "2030-01-02 09:00:00", "evento": "Login"}])
+    assert [(desde, hasta, os.path.basename(archivo)) for desde, hasta, archivo in bitacora.segmentos(str(ruta))] == [
+        ("2030-01-01 10:00:00", "2030-01-01 18:00:00", "bitacora.20300101T100000_20300101T180000.jsonl.gz")]
+    assert [r["fecha"] for r in bitacora.consultar(str(ruta), evento="login")] == ["2030-01-01 10:00:00", "2030-01-02 09:00:00"]
+    assert [r["evento"] for r in bitacora.consultar(str(ruta), desde="2030-01-01", hasta="2030-01-01")] == ["Login", "Logout"]
+
+
+def test_la_consulta_solo_abre_los_segmentos_del_rango(tmp_path, monkeypatch):
+    ruta = tmp_path / "bitacora.jsonl"
+    for dia in ("01", "02", "03"):
+        escribir(ruta, [{"fecha": f"2030-01-{dia} 10:00:00", "evento": "Login"}])
+    abiertos = []
+    abrir = bitacora.gzip.open
+
+    def abrir_anotando(archivo, *args, **kwargs):
+        abiertos.append(archivo)
+        return abrir(archivo, *args, **kwargs)
+    monkeypatch.setattr(bitacora.gzip, "open", abrir_anotando)
+    assert len(list(bitacora.consultar(str(ruta), desde="2030-01-02", hasta="2030-01-02"))) == 1
+    assert [os.path.basename(a)[:18] for a in abiertos] == ["bitacora.20300102T"]
+
+
+def test_al_pasar_el_tamano_maximo_se_rota(tmp_path):
+    ruta = tmp_path / "bitacora.jsonl"
+    for hora in range(10, 14):
+        escribir(ruta, [{"fecha": f"2030-01-01 {hora}:00:00", "evento": "Venta", "detalle": "x" * 50}], tamano_maximo=100)
+    assert len(bitacora.segmentos(str(ruta))) == 3
+    assert len(list(bitacora.consultar(str(ruta)))) == 4
+
+
+def test_la_bitacora_de_texto_anterior_se_migra(tmp_path):
+    texto = tmp_path / "bitacora_sesiones.txt"
+    texto.write_text("2025-05-18 00:54:48 | Login: ana\n"
+                     "2025-05-18 00:55:10 | Venta | 1 x Yerba ($100.00) | Usuario: ana | Total: $100.00\n", encoding="utf-8")
+    ruta = str(tmp_path / "bitacora.jsonl")
+    assert bitacora.migrar_texto(str(texto), ruta) == 2
+    assert list(bitacora.consultar(ruta)) == [
+        {"fecha": "2025-05-18 00:54:48", "evento": "Login", "usuario": "ana"},
+        {"fecha": "2025-05-18 00:55:10", "evento": "Venta", "usuario": "ana", "detalle": "1 x Yerba ($100.00) | Total: $100.00"}]
+    assert os.path.exists(f"{texto}.bak") and not texto.exists()
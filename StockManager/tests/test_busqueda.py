@@ -0,0 +1,39 @@
+import main
+
+
+def nombres(resultados):
+    return [p["nombre"] for p in resultados]
+
+
+def test_prefijo_tildes_y_errores_de_tipeo(datos):
+    for nombre in ("Harina 000", "Harina integral", "Azúcar", "Arroz largo fino", "Yerba"):
+        main.alta_producto(nombre, 100, 1)
+    assert nombres(main.buscar_productos("har")) == ["Harina 000", "Harina integral"]
+    assert nombres(main.buscar_productos("AZUCAR")) == ["Azúcar"]
+    assert nombres(main.buscar_productos("harna integral"))[0] == "Harina integral"
+    assert nombres(main.buscar_productos("fino")) == ["Arroz largo fino"]
+    assert main.buscar_productos("zzz") == [] and main.buscar_productos("  ") == []
+
+
+def test_un_numero_busca_tambien_por_id(datos):
+    main.alta_producto("Yerba", 100, 1)
+    main.alta_producto("Sal", 100, 1)
+    assert nombres(main.buscar_productos("2"))[0] == "Sal"
+
+
+def test_el_indice_sigue_las_altas_cambios_y_bajas(datos):
+    yerba = main.alta_producto("Yerba", 100, 1)
+    assert nombres(main.buscar_productos("yerba")) == ["Yerba"]  # aquí se arma el índice
+    main.alta_producto("Yerba mate", 100, 1)
+    main.editar_producto(yerba["id"], nombre="Té verde")
+    assert nombres(main.buscar_productos("yerba")) == ["Yerba mate"]
+    assert nombres(main.buscar_productos("te verde")) == ["Té verde"]
+    main.baja_producto(yerba["id"])
+    assert main.buscar_productos("verde") == []
+
+
+def test_el_limite_de_resultados(datos):
+    for i in range(15):
+        main.alta_producto(f"Galletas {i}", 100, 1)
+    assert len(main.buscar_productos("galletas")) == main.MAX_RESULTADOS
+    assert len(main.buscar_productos("galletas", limite=3)) == 3
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import main
+import ventas_compactas
+
+
+@pytest.fixture
+def almacen():
+    return "json"  # con SQLite las ventas no se cargan en memoria y no hay copia binaria
+
+
+@pytest.fixture
+def con_ventas(datos, monkeypatch):
+    """Tres ventas registradas y la copia binaria escrita con ellas."""
+    monkeypatch.setattr(main, "CACHE_MINIMO", 1)
+    producto = main.alta_producto("Yerba", 100, 50)
+    for cantidad in (1, 2, 3):
+        main.vender([(producto["id"], cantidad)])
+    main.cargar_ventas()
+    assert os.path.exists(main.VENTAS_CACHE)
+    return producto
+
+
+def totales():
+    return [v["total"] for v in main.ventas]
+
+
+def test_la_copia_se_usa_y_se_completa_con_las_ventas_nuevas(con_ventas):
+    copia, _ = main.leer_cache_ventas()
+    assert [v["total"] for v in copia] == [100.0, 200.0, 300.0]
+    main.vender([(con_ventas["id"], 4)])
+    assert main.leer_cache_ventas() is not None  # agregar ventas no invalida lo que la copia cubre
+    main.cargar_ventas()
+    assert totales() == [100.0, 200.0, 300.0, 400.0]
+
+
+def test_reescribir_ventas_invalida_la_copia(con_ventas):
+    cambiadas = list(main.ventas)
+    cambiadas[0] = dict(cambiadas[0], total=150.0, items=[dict(cambiadas[0]["items"][0], subtotal=150.0)])
+    main.ventas = ventas_compactas.Ventas(cambiadas)
+    main.guardar_ventas()
+    assert main.leer_cache_ventas() is None
+    main.cargar_ventas()
+    assert totales() == [150.0, 200.0, 300.0]
+
+
+def test_copia_de_otra_version_no_se_usa(con_ventas, monkeypatch):
+    monkeypatch.setattr(main, "CACHE_VERSION", main.CACHE_VERSION + 1)
+    assert main.leer_cache_ventas() is None
+
+
+def test_copia_danada_no_se_usa(con_ventas):
+    with open(main.VENTAS_CACHE, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        ultimo = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([ultimo[0] ^ 0xFF]))
+    assert main.leer_cache_ventas() is None
+    main.cargar_ventas()
+    assert totales() == [100.0, 200.0, 300.0]
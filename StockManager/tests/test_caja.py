@@ -0,0 +1,70 @@
+import datetime
+import json
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def yerba(datos, reloj, monkeypatch):
+    monkeypatch.setattr(main, "TERMINAL", "caja-1")
+    return main.alta_producto("Yerba", 100, 50)
+
+
+def test_la_sesion_suma_sus_ventas_y_el_cierre_da_la_diferencia(yerba, reloj):
+    main.abrir_caja(1000, "ana")
+    main.vender([(yerba["id"], 2)])
+    main.vender([(yerba["id"], 1)])
+    assert main.datos_caja()["total_ventas"] == 300.0
+    reloj[0] = "2030-01-01 20:00:00"
+    reporte = main.cerrar_caja(1290.5)
+    assert reporte["ventas"] == 2 and reporte["ticket_promedio"] == 150.0
+    assert reporte["monto_final"] == 1300.0 and reporte["diferencia"] == -9.5
+    assert reporte["cierre"] == "2030-01-01 20:00:00"
+    assert main.datos_caja() is None
+
+
+def test_abrir_y_cerrar_se_validan(yerba):
+    with pytest.raises(ValueError, match="No hay una caja abierta"):
+        main.cerrar_caja()
+    with pytest.raises(ValueError, match="positivo"):
+        main.abrir_caja(-1, "ana")
+    main.abrir_caja(0, "ana")
+    with pytest.raises(ValueError, match="ya está abierta"):
+        main.abrir_caja(100, "ana")
+    assert main.cerrar_caja()["diferencia"] is None  # sin contar el efectivo no hay diferencia
+
+
+def test_la_sesion_abierta_sobrevive_al_reinicio(yerba, monkeypatch):
+    sesion = main.abrir_caja(500, "ana")
+    main.vender([(yerba["id"], 3)])
+    main.vaciar_pendientes()
+    monkeypatch.setattr(main, "sesion_caja", None)
+    main.cargar_caja()
+    assert main.datos_caja()["sesion"] == sesion["id"]
+    assert main.datos_caja()["ventas"] == 1 and main.datos_caja()["monto_final"] == 800.0
+
+
+def test_los_cierres_se_filtran_por_fecha_y_por_caja(yerba, reloj, monkeypatch):
+    for dia, caja in (("2030-01-01", "caja-1"), ("2030-01-02", "caja-2"), ("2030-01-03", "caja-1")):
+        monkeypatch.setattr(main, "TERMINAL", caja)
+        reloj[0] = f"{dia} 08:00:00"
+        main.abrir_caja(100, "ana")
+        main.cerrar_caja()
+    assert [r["sesion"] for r in main.datos_cierres()] == [1, 2, 3]
+    assert [r["sesion"] for r in main.datos_cierres("2030-01-02")] == [2, 3]
+    assert [r["sesion"] for r in main.datos_cierres(fecha_fin="2030-01-02", caja="caja-1")] == [1]
+    with pytest.raises(ValueError, match="YYYY-MM-DD"):
+        main.datos_cierres("02/01/2030")
+
+
+@pytest.mark.parametrize("almacen", ["json"])
+def test_el_registro_de_caja_anterior_de_hoy_se_convierte_en_sesion(yerba):
+    hoy = datetime.date.today().isoformat()
+    with open(main.CAJA_FILE, "w", encoding="utf-8") as f:
+        json.dump({"fecha": hoy, "monto_inicial": 250.0}, f)
+    main.cargar_caja()
+    assert main.datos_caja()["monto_inicial"] == 250.0 and main.datos_caja()["apertura"] == f"{hoy} 00:00:00"
+    with open(main.CAJA_FILE, encoding="utf-8") as f:
+        assert "anterior" not in json.load(f)
@@ -0,0 +1,42 @@
+import main
+
+
+def test_buscar_por_id_y_por_nombre_sin_distinguir_mayusculas(datos):
+    yerba = main.alta_producto("Yerba", 100, 10)
+    main.alta_producto("Azúcar", 80, 5)
+    assert main.buscar_producto(yerba["id"]) is yerba
+    assert main.buscar_producto(999) is None
+    assert main.buscar_producto_por_nombre("  yERBA ") is yerba
+    assert main.buscar_producto_por_nombre("Fideos") is None
+
+
+def test_renombrar_y_eliminar_mantienen_los_indices(datos):
+    yerba = main.alta_producto("Yerba", 100, 10)
+    main.editar_producto(yerba["id"], nombre="Yerba mate")
+    assert main.buscar_producto_por_nombre("Yerba") is None
+    assert main.buscar_producto_por_nombre("yerba mate") is yerba
+    main.baja_producto(yerba["id"])
+    assert main.buscar_producto(yerba["id"]) is None
+    assert main.buscar_producto_por_nombre("Yerba mate") is None
+    assert main.orden_stock == []
+
+
+def test_stock_bajo_ordenado_y_al_dia_tras_cada_cambio(datos):
+    a = main.alta_producto("A", 1, 7)
+    b = main.alta_producto("B", 1, 2)
+    c = main.alta_producto("C", 1, 20)
+    assert main.productos_con_stock_menor(10) == [b, a]
+    main.fijar_stock(c["id"], 1)
+    main.vender([(a["id"], 6)])
+    assert main.productos_con_stock_menor(10) == [a, c, b]
+    assert main.productos_con_stock_menor(1) == []
+
+
+def test_los_indices_se_arman_al_cargar_el_inventario(datos):
+    for nombre in ("C", "A", "B"):
+        main.alta_producto(nombre, 1, len(nombre))
+    main.vaciar_pendientes()
+    main.cargar_inventario()
+    assert [p["id"] for p in main.inventario] == [1, 2, 3]
+    assert main.buscar_producto_por_nombre("b") is main.buscar_producto(3)
+    assert sorted(main.orden_stock) == main.orden_stock
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import main
+
+
+def nombres(clientes):
+    return [c["nombre"] for c in clientes]
+
+
+def test_el_mismo_cliente_escrito_distinto_no_se_repite(datos):
+    jose = main.alta_cliente("José Pérez", "2030-01-10")
+    assert main.alta_cliente("  jose perez ") is jose and jose["proxima_visita"] == "2030-01-10"
+    assert main.alta_cliente("JOSÉ PÉREZ", "2030-01-05") is jose
+    assert jose["nombre"] == "José Pérez" and jose["proxima_visita"] == "2030-01-05"
+    assert len(main.clientes) == 1
+    with pytest.raises(ValueError, match="YYYY-MM-DD"):
+        main.alta_cliente("Ana", "10/01/2030")
+    with pytest.raises(ValueError, match="Nombre"):
+        main.alta_cliente("  ")
+    assert len(main.clientes) == 1
+
+
+def test_visitas_entre_fechas_en_orden_y_el_indice_sigue_los_cambios(datos):
+    main.alta_cliente("Ana", "2030-01-20")
+    main.alta_cliente("Beto", "2030-01-05")
+    main.alta_cliente("Carla", "2030-01-12")
+    main.alta_cliente("Dario")
+    assert nombres(main.clientes_con_visita()) == ["Beto", "Carla", "Ana"]
+    assert nombres(main.clientes_con_visita("2030-01-05", "2030-01-12")) == ["Beto", "Carla"]
+    assert nombres(main.clientes_con_visita(fecha_fin="2030-01-04")) == []
+    main.alta_cliente("beto", "2030-02-01")
+    assert nombres(main.clientes_con_visita("2030-01-06")) == ["Carla", "Ana", "Beto"]
+    main.vaciar_pendientes()
+    main.cargar_clientes()
+    assert nombres(main.clientes_con_visita("2030-01-06")) == ["Carla", "Ana", "Beto"]
+
+
+@pytest.mark.parametrize("almacen", ["json"])
+def test_al_cargar_se_unen_los_repetidos_de_antes(main_vacio):
+    with open(main.CLIENTES_FILE, "w", encoding="utf-8") as f:
+        json.dump([{"nombre": "Ana", "proxima_visita": "2030-01-10"},
+                   {"nombre": "Beto", "proxima_visita": "el martes"},  # escrita a mano antes de validarlas
+                   {"nombre": "ana", "proxima_visita": "2030-03-01"},
+                   {"nombre": "ANA", "proxima_visita": ""}], f)
+    main.cargar_clientes()
+    assert [(c["id"], c["nombre"], c["proxima_visita"]) for c in main.clientes] == \
+        [(1, "Ana", "2030-03-01"), (2, "Beto", "el martes")]
+    assert nombres(main.clientes_con_visita()) == ["Ana"]
+    assert main.alta_cliente("Carla")["id"] == 3
+    main.vaciar_pendientes()
+    with open(main.CLIENTES_FILE, encoding="utf-8") as f:
+        assert len(json.load(f)) == 3
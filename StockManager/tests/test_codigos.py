@@ -0,0 +1,46 @@
+import pytest
+
+import main
+
+EAN13 = "7790001000019"
+UPC_A = "036000291452"
+EAN8 = "96385074"
+
+
+def test_normalizar_valida_el_digito_verificador():
+    assert main.normalizar_codigo(f" {EAN13} ") == EAN13
+    assert main.normalizar_codigo(UPC_A) == "0" + UPC_A
+    assert main.normalizar_codigo(EAN8) == "00000" + EAN8
+    with pytest.raises(ValueError, match="verificador"):
+        main.normalizar_codigo("7790001000010")
+    for invalido in ("123", "77900010000١٩", "779000100001x"):
+        with pytest.raises(ValueError):
+            main.normalizar_codigo(invalido)
+
+
+def test_buscar_por_codigo_con_cualquiera_de_sus_formas(datos):
+    producto = main.alta_producto("Gaseosa", 100, 10, codigos=[UPC_A, EAN13])
+    assert producto["codigos"] == ["0" + UPC_A, EAN13]
+    assert main.buscar_por_codigo(UPC_A) is producto
+    assert main.buscar_por_codigo("0" + UPC_A) is producto
+    assert main.id_de_item({"codigo": EAN13, "cantidad": 1}) == producto["id"]
+    with pytest.raises(ValueError, match="no registrado"):
+        main.id_de_item({"codigo": EAN8})
+
+
+def test_un_codigo_no_puede_ser_de_dos_productos(datos):
+    main.alta_producto("Gaseosa", 100, 10, codigos=[EAN13])
+    with pytest.raises(ValueError, match="ya es de 'Gaseosa'"):
+        main.alta_producto("Agua", 100, 10, codigos=[EAN13])
+    assert main.buscar_producto_por_nombre("Agua") is None
+
+
+def test_cambiar_los_codigos_actualiza_el_indice_y_se_guarda(datos):
+    producto = main.alta_producto("Gaseosa", 100, 10, codigos=[EAN13])
+    main.fijar_codigos(producto["id"], [EAN8])
+    assert main.buscar_por_codigo(EAN13) is None
+    main.vaciar_pendientes()
+    main.cargar_inventario()
+    assert main.buscar_por_codigo(EAN8)["nombre"] == "Gaseosa"
+    main.baja_producto(producto["id"])
+    assert main.buscar_por_codigo(EAN8) is None
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import comandos
+import main
+import metricas
+
+
+@pytest.fixture
+def correr(datos, reloj, capsys):
+    """Corre comandos.py con esos argumentos: (código de salida, salida estándar, errores)."""
+    def correr(*argv):
+        codigo = comandos.ejecutar(list(argv))
+        salida = capsys.readouterr()
+        return codigo, salida.out, salida.err
+    yield correr
+    metricas.detener_volcado()
+
+
+def test_los_nombres_en_ingles_hacen_lo_mismo(correr):
+    codigo, salida, _ = correr("producto", "alta", "--nombre", "Yerba", "--precio", "100", "--stock", "5")
+    assert codigo == 0 and json.loads(salida)["id"] == 1
+    assert correr("product", "add", "--name", "Sal", "--price", "50", "--stock", "20")[0] == 0
+    assert correr("stock", "set", "1", "2")[0] == 0
+    _, salida, _ = correr("product", "list", "--bajo", "10")
+    assert [(p["nombre"], p["stock"]) for p in json.loads(salida)] == [("Yerba", 2)]
+    assert correr("producto", "deshacer")[0] == 0
+    assert [p["stock"] for p in json.loads(correr("producto", "listar")[1])] == [5, 20]
+
+
+def test_reporte_en_json_y_en_csv(correr):
+    yerba = main.alta_producto("Yerba", 100, 50)
+    main.vender([(yerba["id"], 2)])
+    main.vaciar_pendientes()
+    _, salida, _ = correr("report", "--period", "mes")
+    assert json.loads(salida) == [{"periodo": "2030-01", "total": 200.0}]
+    _, salida, _ = correr("--format", "csv", "reporte", "fecha", "--desde", "2030-01-01", "--hasta", "2030-01-01")
+    assert salida.splitlines() == ["fecha,producto,cantidad,subtotal,venta", "2030-01-01 10:00:00,Yerba,2,200.00,1"]
+    codigo, _, errores = correr("--formato", "csv", "reporte", "analisis")
+    assert codigo == 1 and "solo se puede pedir en JSON" in errores
+
+
+def test_venta_repetir_sigue_despues_de_una_linea_con_error(correr, tmp_path):
+    main.alta_producto("Yerba", 100, 50, codigos=["7790001000019"])
+    main.vaciar_pendientes()
+    archivo = tmp_path / "ventas.jsonl"
+    archivo.write_text('{"items": [{"id": 1, "cantidad": 2}]}\n'
+                       'no es json\n'
+                       '\n'
+                       '{"items": [{"id": "uno", "cantidad": 1}]}\n'
+                       '{"items": [{"codigo": "7790001000019", "cantidad": 1}], "cliente": "Ana"}\n', encoding="utf-8")
+    codigo, salida, _ = correr("sale", "replay", str(archivo))
+    resultados = json.loads(salida)
+    assert codigo == 1
+    assert [(r["linea"], r["total"]) for r in resultados] == [(1, 200.0), (2, None), (4, None), (5, 100.0)]
+    assert "JSON" in resultados[1]["error"] and "ID" in resultados[2]["error"]
+    assert main.buscar_producto_por_nombre("Yerba")["stock"] == 47
+
+
+def test_un_error_sale_por_stderr_con_codigo_1(correr, tmp_path):
+    codigo, salida, errores = correr("importar-csv", "precios", str(tmp_path / "no-existe.csv"))
+    assert codigo == 1 and salida == "" and errores.startswith("Error:")
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import credenciales
+import main
+
+
+@pytest.fixture(autouse=True)
+def costo_bajo(monkeypatch):
+    """Hashes baratos: el costo real tarda decenas de milisegundos por contraseña."""
+    monkeypatch.setattr(credenciales, "COSTO_SCRYPT", 10)
+    monkeypatch.setattr(credenciales, "ITERACIONES_PBKDF2", 1000)
+
+
+def test_hash_con_sal_y_verificacion():
+    uno, otro = credenciales.hashear("secreta"), credenciales.hashear("secreta")
+    assert uno != otro and credenciales.es_hash(uno) and not credenciales.es_hash("secreta")
+    assert credenciales.verificar("secreta", uno) and not credenciales.verificar("Secreta", uno)
+    assert not credenciales.verificar("secreta", "basura$1$2")
+
+
+def test_alta_y_verificacion_de_usuarios(datos, reloj):
+    usuario = main.alta_usuario(" ana ", "clave", "cajero")
+    assert usuario["nombre"] == "ana" and credenciales.es_hash(usuario["password"])
+    assert main.verificar_credenciales("ana", "clave") is usuario
+    with pytest.raises(ValueError, match="incorrectos"):
+        main.verificar_credenciales("ana", "otra")
+    for nombre, password, rol in (("ana", "x", "cajero"), ("beto", "", "cajero"), ("beto", "x", "jefe")):
+        with pytest.raises(ValueError):
+            main.alta_usuario(nombre, password, rol)
+
+
+def test_la_espera_crece_con_los_fallos_hasta_el_maximo():
+    libres = main.INTENTOS_LIBRES
+    assert main.espera_por_fallos(libres - 1) == 0
+    assert [main.espera_por_fallos(libres + i) for i in range(3)] == [main.ESPERA_BASE * 2 ** i for i in range(3)]
+    assert main.espera_por_fallos(libres + 50) == main.ESPERA_MAXIMA
+
+
+def test_los_fallos_bloquean_y_un_ingreso_correcto_los_borra(datos, reloj):
+    main.alta_usuario("ana", "clave", "cajero")
+    for _ in range(main.INTENTOS_LIBRES):
+        with pytest.raises(ValueError, match="incorrectos"):
+            main.verificar_credenciales("ana", "otra")
+    with pytest.raises(ValueError, match=f"en {main.ESPERA_BASE} segundos"):
+        main.verificar_credenciales("ana", "clave")  # bloqueado aun con la contraseña correcta
+    main.vaciar_pendientes()
+    main.cargar_usuarios()
+    assert main.usuarios_por_nombre["ana"]["fallos"] == main.INTENTOS_LIBRES  # el bloqueo se guarda
+    reloj[0] = "2030-01-01 10:00:06"
+    usuario = main.verificar_credenciales("ana", "clave")
+    assert usuario["fallos"] == 0 and usuario["bloqueado_hasta"] is None
+
+
+def test_los_nombres_inexistentes_tambien_se_bloquean_pero_con_limite(datos, reloj, monkeypatch):
+    monkeypatch.setattr(main, "DESCONOCIDOS_MAXIMO", 2)
+    for _ in range(main.INTENTOS_LIBRES):
+        with pytest.raises(ValueError, match="incorrectos"):
+            main.verificar_credenciales("nadie", "x")
+    with pytest.raises(ValueError, match="Demasiados intentos"):
+        main.verificar_credenciales("nadie", "x")
+    for nombre in ("uno", "dos"):
+        with pytest.raises(ValueError):
+            main.verificar_credenciales(nombre, "x")
+    assert list(main.fallos_desconocidos) == ["nadie", "dos"]  # "uno" no estaba bloqueado: se olvidó primero
+
+
+def test_el_hash_se_recalcula_si_cambia_el_costo(datos, reloj, monkeypatch):
+    anterior = main.alta_usuario("ana", "clave", "cajero")["password"]
+    monkeypatch.setattr(credenciales, "COSTO_SCRYPT", 11)
+    monkeypatch.setattr(credenciales, "ITERACIONES_PBKDF2", 2000)
+    nuevo = main.verificar_credenciales("ana", "clave")["password"]
+    assert nuevo != anterior and not credenciales.necesita_rehash(nuevo)
+    assert credenciales.verificar("clave", nuevo)
+
+
+@pytest.mark.parametrize("almacen", ["json"])
+def test_las_contrasenas_en_texto_plano_se_migran_al_cargar(main_vacio, reloj):
+    with open(main.USUARIOS_FILE, "w", encoding="utf-8") as f:
+        json.dump([{"nombre": "ana", "password": "clave", "rol": "admin"}], f)
+    main.cargar_usuarios()
+    main.vaciar_pendientes()
+    with open(main.USUARIOS_FILE, encoding="utf-8") as f:
+        assert credenciales.es_hash(json.load(f)[0]["password"])
+    assert main.verificar_credenciales("ana", "clave")["rol"] == "admin"
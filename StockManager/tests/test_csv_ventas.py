@@ -0,0 +1,88 @@
+import csv
+import gzip
+
+import pytest
+
+import main
+
+
+def leer_csv(ruta):
+    abrir = gzip.open if str(ruta).endswith(".gz") else open
+    with abrir(ruta, "rt", encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))
+
+
+def escribir_csv(ruta, filas):
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(filas)
+
+
+@pytest.fixture
+def con_ventas(datos, reloj):
+    """Dos ventas en la misma fecha y hora y una al día siguiente."""
+    yerba = main.alta_producto("Yerba", 100, 50)
+    sal = main.alta_producto("Sal", 25, 50)
+    main.vender([(yerba["id"], 1), (sal["id"], 2)])
+    main.vender([(yerba["id"], 1)])
+    reloj[0] = "2030-01-02 09:00:00"
+    main.vender([(sal["id"], 4)])
+    return datos
+
+
+def test_exportar_una_fila_por_item_con_numero_de_venta(con_ventas):
+    ruta = con_ventas / "ventas.csv.gz"
+    assert main.exportar_ventas(str(ruta)) == 4
+    assert leer_csv(ruta) == [
+        ["Fecha", "Producto", "Cantidad", "Subtotal", "Venta"],
+        ["2030-01-01 10:00:00", "Yerba", "1", "100.00", "1"],
+        ["2030-01-01 10:00:00", "Sal", "2", "50.00", "1"],
+        ["2030-01-01 10:00:00", "Yerba", "1", "100.00", "2"],
+        ["2030-01-02 09:00:00", "Sal", "4", "100.00", "1"],
+    ]
+    assert main.exportar_ventas(str(ruta), "2030-01-02", producto="sal") == 1
+
+
+def test_la_exportacion_incremental_agrega_solo_lo_nuevo(con_ventas, reloj):
+    ruta = str(con_ventas / "ventas.csv")
+    assert main.exportar_ventas(ruta, incremental=True) == 4
+    assert main.exportar_ventas(ruta, incremental=True) == 0
+    main.vender([(1, 1)])  # misma fecha y hora que la última exportada: es la venta 2 de ese momento
+    assert main.exportar_ventas(ruta, incremental=True) == 1
+    assert leer_csv(ruta)[-1] == ["2030-01-02 09:00:00", "Yerba", "1", "100.00", "2"]
+
+
+def test_importar_lo_exportado_no_duplica_ventas(con_ventas):
+    ruta = str(con_ventas / "ventas.csv")
+    main.exportar_ventas(ruta)
+    assert main.importar_ventas_csv(ruta) == (0, 3)
+    assert main.datos_reporte_general()["ventas"] == 3
+
+
+def test_importar_ventas_anteriores_las_intercala(con_ventas):
+    ruta = str(con_ventas / "viejas.csv")
+    escribir_csv(ruta, [["Fecha", "Producto", "Cantidad", "Subtotal"],
+                        ["2029-12-31 18:00:00", "Yerba", "3", "300"],
+                        ["2029-12-31 18:00:00", "Sal", "1", "25"]])
+    assert main.importar_ventas_csv(ruta) == (1, 0)
+    assert main.datos_ventas_por_periodo("dia")[0] == ("2029-12-31", 325.0)
+    assert main.datos_reporte_general()["total"] == 675.0
+    assert [v["fecha"] for v in main.iterar_ventas()][0] == "2029-12-31 18:00:00"
+
+
+def test_una_linea_invalida_no_importa_nada(con_ventas):
+    ruta = str(con_ventas / "malas.csv")
+    escribir_csv(ruta, [["Fecha", "Producto", "Cantidad", "Subtotal"],
+                        ["2030-02-01 10:00:00", "Yerba", "1", "100"],
+                        ["2030-02-01 11:00:00", "Yerba", "uno", "100"]])
+    with pytest.raises(ValueError, match="Línea 3"):
+        main.importar_ventas_csv(ruta)
+    assert main.datos_reporte_general()["ventas"] == 3
+
+
+def test_importar_precios_por_id_o_nombre(datos):
+    main.alta_producto("Yerba", 100, 5)
+    main.alta_producto("Sal", 25, 5)
+    ruta = str(datos / "precios.csv")
+    escribir_csv(ruta, [["ID", "Producto", "Precio"], ["1", "", "$120,50"], ["", "sal", "30"], ["", "Fideos", "80"]])
+    assert main.importar_precios_csv(ruta) == (2, [4])
+    assert [p["precio"] for p in main.inventario] == [120.5, 30.0]
@@ -0,0 +1,70 @@
+import glob
+import json
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def almacen():
+    return "json"  # el diario JSON Lines es el almacén de ventas sin SQLite
+
+
+def lineas_diario():
+    with open(main.VENTAS_FILE, "rb") as f:
+        return f.read().splitlines(keepends=True)
+
+
+def venta(fecha, total):
+    return {"fecha": fecha, "items": [{"nombre": "Yerba", "cantidad": 1, "subtotal": total}], "total": total,
+            "cliente": "", "proxima_visita": ""}
+
+
+def test_cada_venta_agrega_una_linea_sin_reescribir_las_anteriores(datos):
+    producto = main.alta_producto("Yerba", 100, 10)
+    main.vender([(producto["id"], 1)])
+    antes = lineas_diario()
+    main.vender([(producto["id"], 2)])
+    despues = lineas_diario()
+    assert despues[:-1] == antes
+    assert json.loads(despues[-1])["total"] == 200.0
+
+
+def test_el_arreglo_json_anterior_se_migra_al_diario(main_vacio):
+    with open(main.VENTAS_FILE, "w", encoding="utf-8") as f:
+        json.dump([venta("2030-01-01 10:00:00", 100.0), venta("2030-01-02 10:00:00", 50.0)], f)
+    main.cargar_ventas()
+    assert [v["total"] for v in main.ventas] == [100.0, 50.0]
+    assert [json.loads(l)["total"] for l in lineas_diario()] == [100.0, 50.0]
+    with open(main.VENTAS_ANTIGUO, encoding="utf-8") as f:
+        assert len(json.load(f)) == 2
+
+
+def test_una_ultima_linea_a_medio_escribir_se_descarta(main_vacio):
+    with open(main.VENTAS_FILE, "w", encoding="utf-8") as f:
+        f.write(json.dumps(venta("2030-01-01 10:00:00", 100.0)) + "\n" + '{"fecha": "2030-01-02')
+    main.cargar_ventas()
+    assert len(main.ventas) == 1
+    assert len(lineas_diario()) == 1
+
+
+def test_una_linea_ilegible_queda_aparte_y_se_cargan_las_demas(main_vacio):
+    with open(main.VENTAS_FILE, "w", encoding="utf-8") as f:
+        f.write(json.dumps(venta("2030-01-01 10:00:00", 100.0)) + "\n")
+        f.write("esto no es json\n")
+        f.write(json.dumps(venta("2030-01-03 10:00:00", 30.0)) + "\n")
+    main.cargar_ventas()
+    assert [v["total"] for v in main.ventas] == [100.0, 30.0]
+    assert len(lineas_diario()) == 2
+    assert len(glob.glob(main.VENTAS_FILE + ".danado-*")) == 1
+
+
+def test_el_diario_se_compacta_cada_tantas_ventas(datos, monkeypatch):
+    monkeypatch.setattr(main, "COMPACTAR_CADA", 3)
+    producto = main.alta_producto("Yerba", 100, 10)
+    for _ in range(3):
+        main.vender([(producto["id"], 1)])
+    assert main.ventas_agregadas == 0
+    main.cargar_ventas()
+    assert len(main.ventas) == 3
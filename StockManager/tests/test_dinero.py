@@ -0,0 +1,32 @@
+import pytest
+
+import dinero
+
+
+@pytest.mark.parametrize("monto, esperado", [
+    (2.675, 268),    # el decimal escrito, no el binario del float (2.67499...)
+    (1.005, 101),
+    (0.125, 13),     # mitad hacia arriba, no al par
+    (-0.125, -13),
+    (10, 1000),
+    ("3.14159", 314),
+    (19.99, 1999),
+])
+def test_centavos_redondea_mitad_hacia_arriba(monto, esperado):
+    assert dinero.centavos(monto) == esperado
+
+
+def test_centavos_rechaza_montos_no_validos():
+    for monto in ("abc", None, float("nan")):
+        with pytest.raises(ValueError):
+            dinero.centavos(monto)
+
+
+def test_sumar_no_acumula_error():
+    assert dinero.sumar([0.1] * 10) == 100
+    assert dinero.pesos(dinero.sumar([0.1, 0.2])) == 0.3
+
+
+def test_con_porcentaje():
+    assert dinero.con_porcentaje(100, 10) == 11000
+    assert dinero.con_porcentaje(0.05, 50) == 8  # 7.5 centavos -> 8
@@ -0,0 +1,65 @@
+import glob
+import json
+import os
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def almacen():
+    return "json"  # en SQLite cada cambio es su propia transacción
+
+
+def inventario_en_disco():
+    with open(main.INVENTARIO_FILE, encoding="utf-8") as f:
+        return json.load(f)["inventario"]
+
+
+def test_varios_cambios_se_escriben_juntos_al_vaciar(datos, monkeypatch):
+    escrituras = []
+    escribir = main.escribir_json_atomico
+
+    def escribir_anotando(ruta, *args, **kwargs):
+        escrituras.append(ruta)
+        escribir(ruta, *args, **kwargs)
+    monkeypatch.setattr(main, "escribir_json_atomico", escribir_anotando)
+    producto = main.alta_producto("Yerba", 100, 10)
+    for stock in (11, 12, 13):
+        main.fijar_stock(producto["id"], stock)
+    assert escrituras == [] and inventario_en_disco() == []
+    main.vaciar_pendientes()
+    assert escrituras == [main.INVENTARIO_FILE]
+    assert [p["stock"] for p in inventario_en_disco()] == [13]
+
+
+def test_una_escritura_fallida_no_pisa_el_archivo_y_queda_pendiente(datos, monkeypatch):
+    main.alta_producto("Yerba", 100, 10)
+    main.vaciar_pendientes()
+    main.alta_producto("Sal", 50, 10)
+    disco_lleno = [True]
+    fsync = os.fsync
+
+    def fsync_que_falla(fd):
+        if disco_lleno[0]:
+            raise OSError("disco lleno")
+        fsync(fd)
+    monkeypatch.setattr(main.os, "fsync", fsync_que_falla)
+    with pytest.raises(OSError):
+        main.vaciar_pendientes()
+    assert [p["nombre"] for p in inventario_en_disco()] == ["Yerba"]
+    assert "inventario" in main.pendientes
+    disco_lleno[0] = False
+    main.vaciar_pendientes()  # el reintento reemplaza también el temporal que quedó a medias
+    assert [p["nombre"] for p in inventario_en_disco()] == ["Yerba", "Sal"]
+    assert glob.glob(main.INVENTARIO_FILE + ".*.tmp") == []
+
+
+def test_un_inventario_ilegible_se_aparta_y_se_empieza_vacio(main_vacio):
+    with open(main.INVENTARIO_FILE, "w", encoding="utf-8") as f:
+        f.write('{"inventario": [')
+    main.cargar_inventario()
+    assert main.inventario == []
+    assert not os.path.exists(main.INVENTARIO_FILE)
+    assert len(glob.glob(main.INVENTARIO_FILE + ".danado-*")) == 1
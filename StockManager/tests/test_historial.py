@@ -0,0 +1,68 @@
+import pytest
+
+import historial
+import main
+
+
+def test_deshacer_y_rehacer_un_ajuste_de_stock(datos, reloj):
+    producto = main.alta_producto("Yerba", 100, 10)
+    main.fijar_stock(producto["id"], 25)
+    main.deshacer()
+    assert main.buscar_producto(producto["id"])["stock"] == 10
+    main.deshacer(rehacer=True)
+    assert main.buscar_producto(producto["id"])["stock"] == 25
+
+
+def test_deshacer_un_ajuste_no_devuelve_lo_vendido(datos, reloj):
+    producto = main.alta_producto("Yerba", 100, 10)
+    main.fijar_stock(producto["id"], 20)
+    main.vender([(producto["id"], 4)])
+    main.deshacer()  # el +10: quedan las 6 que no se vendieron
+    assert main.buscar_producto(producto["id"])["stock"] == 6
+
+
+def test_no_se_deshace_el_alta_de_un_producto_que_cambio_despues(datos, reloj):
+    producto = main.alta_producto("Yerba", 100, 10)
+    main.fijar_stock(producto["id"], 20)
+    main.vender([(producto["id"], 4)])
+    main.deshacer()
+    with pytest.raises(ValueError):
+        main.deshacer()  # restaurarlo después traería de vuelta las 4 vendidas
+    assert main.buscar_producto(producto["id"])["stock"] == 6
+    assert [p["stock"] for p in main.inventario_al("2030-01-01 10:59:00")] == [6]
+
+
+def test_deshacer_y_rehacer_un_alta_sin_cambios_posteriores(datos, reloj):
+    producto = main.alta_producto("Yerba", 100, 10)
+    main.deshacer()
+    assert main.buscar_producto(producto["id"]) is None
+    main.deshacer(rehacer=True)
+    assert main.buscar_producto(producto["id"])["stock"] == 10
+
+
+def test_no_se_rehace_una_baja_tras_nuevos_cambios(datos, reloj):
+    producto = main.alta_producto("Yerba", 100, 10)
+    main.baja_producto(producto["id"])
+    main.deshacer()
+    assert main.buscar_producto(producto["id"])["stock"] == 10
+    main.vender([(producto["id"], 3)])
+    with pytest.raises(ValueError):
+        main.deshacer(rehacer=True)
+    assert main.buscar_producto(producto["id"])["stock"] == 7
+
+
+def test_inventario_a_una_fecha(datos, reloj, monkeypatch):
+    monkeypatch.setattr(historial, "INSTANTANEA_CADA", 2)  # que la consulta parta de instantáneas intermedias
+    producto = main.alta_producto("Yerba", 100, 10)
+    reloj[0] = "2030-01-01 11:00:00"
+    main.fijar_stock(producto["id"], 7)
+    reloj[0] = "2030-01-01 12:00:00"
+    main.vender([(producto["id"], 2)])
+    reloj[0] = "2030-01-02 09:00:00"
+    main.fijar_stock(producto["id"], 30)
+    stock_al = {momento: [p["stock"] for p in main.inventario_al(momento)]
+                for momento in ("2030-01-01 10:30:00", "2030-01-01 11:30:00", "2030-01-01", "2030-01-02")}
+    assert stock_al == {"2030-01-01 10:30:00": [10], "2030-01-01 11:30:00": [7],
+                        "2030-01-01": [5], "2030-01-02": [30]}
+    with pytest.raises(ValueError):
+        main.inventario_al("2020-01-01")  # antes de que empezara el historial
@@ -0,0 +1,48 @@
+import pytest
+
+import main
+
+
+@pytest.fixture
+def cincuenta(datos):
+    for i in range(1, 51):
+        main.alta_producto(f"Producto {i:02d}", i, 100 - i)
+    return main.inventario
+
+
+def paginas_vistas(monkeypatch, capsys, productos, comandos):
+    """Ids de cada tabla que muestra paginar_productos() con esos comandos (y Enter al final)."""
+    respuestas = iter(comandos + [""])
+    monkeypatch.setattr("builtins.input", lambda mensaje="": next(respuestas))
+    main.paginar_productos(productos)
+    tablas = capsys.readouterr().out.split("| ID")[1:]
+    return [[int(linea.split("|")[1]) for linea in tabla.splitlines() if linea.startswith("| ")] for tabla in tablas]
+
+
+def test_se_muestra_una_pagina_por_vez(cincuenta, monkeypatch, capsys):
+    vistas = paginas_vistas(monkeypatch, capsys, cincuenta, ["s", "s", "s", "1"])
+    assert [len(v) for v in vistas] == [20, 20, 10, 10, 20]
+    assert vistas[2] == list(range(41, 51))
+
+
+def test_ordenar_y_filtrar(cincuenta, monkeypatch, capsys):
+    vistas = paginas_vistas(monkeypatch, capsys, cincuenta, ["stock", "stock", "f producto 1", "f"])
+    assert vistas[1][:3] == [50, 49, 48]     # stock ascendente
+    assert vistas[2][:3] == [1, 2, 3]        # otra vez stock: descendente
+    assert vistas[3] == list(range(10, 20))  # el filtro conserva el orden
+    assert len(vistas[4]) == 20
+
+
+def test_un_inventario_chico_se_muestra_sin_preguntar(datos, monkeypatch, capsys):
+    main.alta_producto("Yerba", 100, 1)
+    assert paginas_vistas(monkeypatch, capsys, main.inventario, []) == [[1]]
+
+
+def test_la_fila_se_vuelve_a_formatear_solo_si_el_producto_cambio(cincuenta):
+    producto = cincuenta[0]
+    fila = main.fila_producto(producto, 2)
+    assert main.fila_producto(producto, 2) is fila
+    main.fijar_stock(producto["id"], 7)
+    assert "|   7   |" in main.fila_producto(producto, 2)
+    main.baja_producto(producto["id"])
+    assert producto["id"] not in main.filas_formateadas
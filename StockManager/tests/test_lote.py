@@ -0,0 +1,52 @@
+import csv
+
+import pytest
+
+import csv_ventas
+import main
+
+
+@pytest.fixture
+def productos(datos):
+    return main.alta_producto("Yerba", 100, 10), main.alta_producto("Sal", 25, 5)
+
+
+def test_el_lote_suma_stock_y_aplica_porcentajes(productos):
+    yerba, sal = productos
+    assert main.aplicar_lote([(2, yerba["id"], "", 24, 10), (3, None, "sal", -3, 0), (4, yerba["id"], "", 0, 10)]) == 2
+    assert (yerba["stock"], yerba["precio"]) == (34, 121.0)
+    assert (sal["stock"], sal["precio"]) == (2, 25.0)
+    assert main.productos_con_stock_menor(3) == [sal]
+
+
+def test_con_un_error_no_se_aplica_nada(productos):
+    yerba, sal = productos
+    with pytest.raises(ValueError) as error:
+        main.aplicar_lote([(2, yerba["id"], "", 5, 0), (3, 99, "", 1, 0), (4, None, "Sal", -6, 0), (5, yerba["id"], "", 0, -100)])
+    mensajes = str(error.value).splitlines()
+    assert mensajes[0].startswith("Línea 3: producto no encontrado")
+    assert mensajes[1].startswith("Línea 5: el precio de Yerba")
+    assert mensajes[2].startswith("El stock de Sal")
+    assert (yerba["stock"], sal["stock"], yerba["precio"]) == (10, 5, 100.0)
+
+
+def test_el_lote_se_guarda_y_se_deshace_entero(productos):
+    yerba, sal = productos
+    main.aplicar_lote([(2, yerba["id"], "", 5, 20), (3, sal["id"], "", 1, 0)])
+    main.vaciar_pendientes()
+    main.cargar_inventario()
+    assert [(p["stock"], p["precio"]) for p in main.inventario] == [(15, 120.0), (6, 25.0)]
+    main.deshacer()
+    assert [(p["stock"], p["precio"]) for p in main.inventario] == [(10, 100.0), (5, 25.0)]
+
+
+def test_leer_movimientos_de_un_csv(tmp_path):
+    ruta = str(tmp_path / "lote.csv")
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows([["ID", "Producto", "Stock", "Porcentaje"],
+                                 ["1", "", "+24", ""], ["", "Sal", "-3", "5,5%"], [], ["", "", "1", ""]])
+    movimientos = csv_ventas.leer_movimientos(ruta)
+    assert next(movimientos) == (2, 1, "", 24, 0.0)
+    assert next(movimientos) == (3, None, "Sal", -3, 5.5)
+    with pytest.raises(ValueError, match="Línea 5"):
+        next(movimientos)
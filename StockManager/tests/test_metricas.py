@@ -0,0 +1,86 @@
+import json
+import os
+
+import pytest
+
+import main
+import metricas
+
+
+@pytest.fixture(autouse=True)
+def sin_mediciones(monkeypatch):
+    """Cada prueba arranca sin mediciones, sin perfiles pedidos y sin volcado periódico."""
+    metricas.reiniciar()
+    monkeypatch.setattr(metricas, "_perfilar", {})
+    monkeypatch.setattr(metricas, "ultimo_perfil", None)
+    yield
+    metricas.detener_volcado()
+    metricas.reiniciar()
+
+
+def test_los_percentiles_del_histograma_tienen_el_error_de_una_cubeta():
+    histograma = metricas.Histograma()
+    assert histograma.percentil(50) == 0.0
+    for ms in range(1, 1001):
+        histograma.registrar(float(ms))
+    for p in (50, 95, 99):
+        assert 10 * p <= histograma.percentil(p) <= 10 * p * metricas.FACTOR
+    assert histograma.percentil(100) == 1000.0  # nunca más que el máximo medido
+    datos = histograma.datos()
+    assert datos["cantidad"] == 1000 and datos["promedio_ms"] == 500.5 and len(histograma.cubetas) < 70
+
+
+def test_medir_registra_tambien_lo_que_falla():
+    @metricas.medido("sumar")
+    def sumar(a, b):
+        return a + b
+
+    assert sumar(2, 3) == 5 and sumar.__name__ == "sumar"
+    with pytest.raises(ZeroDivisionError):
+        with metricas.medir("dividir"):
+            1 / 0
+    metricas.contar("filas", 3)
+    metricas.contar("filas")
+    datos = metricas.resumen()
+    assert datos["operaciones"]["sumar"]["cantidad"] == 1 and datos["operaciones"]["dividir"]["cantidad"] == 1
+    assert datos["contadores"] == {"filas": 4}
+
+
+def test_el_volcado_agrega_solo_lo_del_ultimo_intervalo(tmp_path):
+    ruta = str(tmp_path / "metricas.jsonl")
+    metricas.registrar("venta", 2.0)
+    assert metricas.volcar(ruta, {"terminal": "caja-1"})
+    assert not metricas.volcar(ruta)  # sin actividad nueva no se escribe
+    metricas.registrar("venta", 4.0)
+    metricas.volcar(ruta)
+    volcados = list(metricas.leer_volcados(ruta))
+    assert [v["operaciones"]["venta"]["cantidad"] for v in volcados] == [1, 1]
+    assert volcados[0]["terminal"] == "caja-1" and "terminal" not in volcados[1]
+    assert metricas.resumen()["operaciones"]["venta"]["cantidad"] == 2
+    assert metricas.resumen(desde_inicio=False)["operaciones"] == {}
+
+
+def test_el_perfil_captura_una_sola_ejecucion(tmp_path):
+    metricas.perfilar("reporte", str(tmp_path))
+    assert metricas.perfiles_pedidos() == ["reporte"]
+    for _ in range(2):
+        with metricas.medir("reporte"):
+            sorted(range(1000))
+    assert metricas.perfiles_pedidos() == []
+    perfil = metricas.ultimo_perfil
+    assert perfil["operacion"] == "reporte" and os.path.exists(perfil["archivo"])
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".prof")]) == 1
+    assert "function calls" in perfil["resumen"]
+
+
+def test_las_operaciones_de_main_quedan_medidas(datos, reloj):
+    yerba = main.alta_producto("Yerba", 100, 50)
+    main.vender([(yerba["id"], 1)])
+    main.vender([(yerba["id"], 2)])
+    operaciones = metricas.resumen()["operaciones"]
+    assert operaciones["venta"]["cantidad"] == 2
+    main.iniciar_metricas()
+    metricas.detener_volcado()  # al salir se vuelca lo que quedaba
+    with open(main.METRICAS_FILE, encoding="utf-8") as f:
+        volcado = json.loads(f.readline())
+    assert volcado["almacen"] == main.ALMACEN and volcado["operaciones"]["venta"]["cantidad"] == 2
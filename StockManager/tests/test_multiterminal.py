@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+
+import main
+
+# Una caja más: main.py en otro proceso, con las rutas en la carpeta de la prueba y modo multiterminal
+OTRA_CAJA = """
+import os, sys
+sys.path.insert(0, {raiz!r})
+import main
+carpeta, almacen, terminal = sys.argv[1:]
+for nombre, valor in list(vars(main).items()):
+    if nombre.isupper() and isinstance(valor, str) and os.path.dirname(valor) == main.BASE_DIR:
+        setattr(main, nombre, os.path.join(carpeta, os.path.basename(valor)))
+main.BASE_DIR, main.ALMACEN, main.MULTITERMINAL, main.TERMINAL = carpeta, almacen, True, terminal
+main.cargar_inventario()
+main.cargar_ventas()
+vendidas = 0
+for _ in range(20):
+    try:
+        main.vender([(1, 1)])
+        vendidas += 1
+    except ValueError:
+        pass
+main.vaciar_pendientes()
+main.vaciar_bitacora()
+print(vendidas)
+""".format(raiz=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_reservar_aparta_stock_y_liberar_lo_devuelve(datos):
+    producto = main.alta_producto("Yerba", 100, 5)
+    assert main.reservar_stock(producto["id"], 3) is producto
+    assert producto["stock"] == 2
+    assert main.reservar_stock(producto["id"], 3) is None
+    main.liberar_reservas()
+    assert main.buscar_producto(producto["id"])["stock"] == 5
+
+
+def test_las_reservas_vencidas_de_otra_caja_vuelven_al_stock(datos, reloj, monkeypatch):
+    producto = main.alta_producto("Yerba", 100, 5)
+    monkeypatch.setattr(main, "TERMINAL", "otra-caja")
+    reloj[0] = "2000-01-01 10:00:00"
+    main.reservar_stock(producto["id"], 2)
+    reloj[0] = "2030-01-01 10:00:00"
+    main.reservar_stock(producto["id"], 1)
+    monkeypatch.setattr(main, "TERMINAL", "esta-caja")
+    main.liberar_reservas()  # devuelve la vencida; la reciente sigue apartada por la otra caja
+    assert main.buscar_producto(producto["id"])["stock"] == 4
+    main.liberar_reservas(todas=True)
+    assert main.buscar_producto(producto["id"])["stock"] == 5
+
+
+def test_dos_cajas_a_la_vez_no_venden_mas_que_el_stock(datos, almacen):
+    main.alta_producto("Yerba", 100, 30)
+    main.vaciar_pendientes()
+    cajas = [subprocess.Popen([sys.executable, "-c", OTRA_CAJA, str(datos), almacen, f"caja-{n}"],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) for n in (1, 2)]
+    salidas = [caja.communicate(timeout=60) for caja in cajas]
+    assert all(caja.returncode == 0 for caja in cajas), [error for _, error in salidas]
+    vendidas = [int(salida.split()[-1]) for salida, _ in salidas]
+    assert sum(vendidas) == 30
+    main.cargar_inventario()
+    main.cargar_ventas()
+    assert main.buscar_producto(1)["stock"] == 0
+    assert main.datos_reporte_general()["ventas"] == 30
+    if not main.usa_sqlite():
+        with open(main.VENTAS_FILE, encoding="utf-8") as f:
+            fechas = [json.loads(linea)["fecha"] for linea in f]
+        assert len(fechas) == 30 and fechas == sorted(fechas)
@@ -0,0 +1,53 @@
+import csv
+import datetime
+
+import pytest
+
+import main
+import reposicion
+
+
+def estado_de(ventas_por_dia):
+    estados = {}
+    for dia, cantidad in ventas_por_dia:
+        reposicion.registrar(estados, "yerba", dia, cantidad)
+    return estados["yerba"]
+
+
+def test_la_velocidad_sigue_las_ventas_y_baja_sin_ventas():
+    estado = estado_de((dia, 10) for dia in range(1, 61))
+    assert reposicion.velocidad(estado, 61) == pytest.approx(10)
+    assert reposicion.velocidad(estado, 63) == pytest.approx(10 * (1 - reposicion.ALFA) ** 2)
+    assert reposicion.velocidad(None, 61) == 0.0
+
+
+def test_una_venta_importada_tarde_cuenta_como_si_hubiera_llegado_en_orden():
+    en_orden = estado_de([(1, 5), (2, 7), (3, 4), (6, 2)])
+    tarde = estado_de([(1, 5), (3, 4), (6, 2), (2, 7)])
+    assert tarde[1:] == en_orden[1:]
+    assert tarde[0] == pytest.approx(en_orden[0])
+
+
+def test_sugerencias_del_mas_urgente_al_menos_urgente():
+    productos = [{"id": 1, "nombre": "Yerba", "stock": 20}, {"id": 2, "nombre": "Sal", "stock": 3},
+                 {"id": 3, "nombre": "Café", "stock": 500}, {"id": 4, "nombre": "Té", "stock": 0}]
+    estados = {"yerba": [10.0, 100, 0], "sal": [2.0, 100, 0], "café": [10.0, 100, 0]}  # día 100 todavía abierto
+    lista = reposicion.sugerencias(productos, estados, 100)
+    assert [(s["nombre"], s["cantidad"]) for s in lista] == [("Sal", 31), ("Yerba", 150)]
+    assert lista[0]["dias_restantes"] == pytest.approx(1.5)
+
+
+def test_orden_de_compra_con_las_ventas_registradas(datos, reloj):
+    hoy = datetime.date.today()
+    yerba = main.alta_producto("Yerba", 100, 200)
+    main.alta_producto("Sal", 100, 200)
+    for dias in range(30, 0, -1):
+        reloj[0] = f"{hoy - datetime.timedelta(days=dias)} 10:00:00"
+        main.vender([(yerba["id"], 6)])
+    ruta = str(datos / reposicion.nombre_orden())
+    assert main.generar_orden_compra(ruta) == 1
+    with open(ruta, encoding="utf-8", newline="") as f:
+        filas = list(csv.reader(f))
+    assert filas[0] == reposicion.ENCABEZADO_ORDEN
+    assert filas[1][:4] == ["1", "Yerba", "20", "6.00"] and int(filas[1][5]) == 6 * 17 - 20
+    assert main.dias_de_stock(yerba) == pytest.approx(20 / 6)
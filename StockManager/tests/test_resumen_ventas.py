@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+import main
+
+
+def vender_en(reloj, fecha, producto, cantidad):
+    reloj[0] = fecha
+    return main.vender([(producto["id"], cantidad)])
+
+
+def recargar():
+    main.vaciar_pendientes()
+    main.cargar_inventario()
+    main.cargar_ventas()
+
+
+def test_los_acumulados_suman_cada_venta_por_periodo(datos, reloj):
+    yerba = main.alta_producto("Yerba", 100, 50)
+    vender_en(reloj, "2030-01-30 10:00:00", yerba, 1)
+    vender_en(reloj, "2030-01-31 10:00:00", yerba, 2)
+    vender_en(reloj, "2030-02-01 10:00:00", yerba, 3)
+    general = main.datos_reporte_general()
+    assert general["ventas"] == 3 and general["total"] == 600.0
+    assert general["mas_vendido"] == {"nombre": "Yerba", "cantidad": 6, "ingreso": 600.0}
+    assert main.datos_ventas_por_periodo("mes") == [("2030-01", 300.0), ("2030-02", 300.0)]
+    assert main.datos_ventas_por_periodo("dia", "2030-01-31", "2030-02-01") == [("2030-01-31", 200.0), ("2030-02-01", 300.0)]
+
+
+def test_ventas_por_fecha_y_rango_invalido(datos, reloj):
+    yerba = main.alta_producto("Yerba", 100, 50)
+    vender_en(reloj, "2030-01-01 10:00:00", yerba, 1)
+    vender_en(reloj, "2030-01-03 10:00:00", yerba, 2)
+    encontradas = main.datos_ventas_por_fecha("2030-01-02", "2030-01-03")
+    assert [v["total"] for v in encontradas["ventas"]] == [200.0] and encontradas["total"] == 200.0
+    with pytest.raises(ValueError, match="inicio"):
+        main.datos_ventas_por_fecha("2030-01-03", "2030-01-01")
+
+
+def test_historial_y_nunca_vendidos_sin_distinguir_tildes(datos, reloj):
+    azucar = main.alta_producto("Azúcar", 80, 10)
+    main.alta_producto("Sal", 50, 10)
+    vender_en(reloj, "2030-01-01 10:00:00", azucar, 2)
+    historial = main.datos_historial_producto("azucar")
+    assert historial["cantidad"] == 2 and historial["ingreso"] == 160.0
+    assert main.datos_nunca_vendidos() == ["Sal"]
+
+
+def test_los_acumulados_se_retoman_o_se_rearman_al_cargar(datos, reloj):
+    yerba = main.alta_producto("Yerba", 100, 50)
+    vender_en(reloj, "2030-01-01 10:00:00", yerba, 1)
+    vender_en(reloj, "2030-01-02 10:00:00", yerba, 1)
+    esperado = main.datos_ventas_por_periodo("dia")
+    recargar()
+    assert main.datos_ventas_por_periodo("dia") == esperado
+    if not main.usa_sqlite():
+        os.remove(main.RESUMEN_FILE)  # sin el archivo se arman de nuevo desde el diario
+        recargar()
+        assert main.datos_ventas_por_periodo("dia") == esperado
+        assert main.datos_reporte_general()["ventas"] == 2
@@ -0,0 +1,91 @@
+import base64
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import credenciales
+import main
+import servidor
+
+ADMIN = ("ana", "clave-ana")
+CAJERO = ("beto", "clave-beto")
+
+
+@pytest.fixture
+def puerto(datos, monkeypatch):
+    """servidor.py escuchando en un puerto libre, con un admin y un cajero."""
+    monkeypatch.setattr(credenciales, "COSTO_SCRYPT", 10)  # hashes rápidos para las pruebas
+    monkeypatch.setattr(servidor, "_verificados", {})
+    main.alta_usuario(*ADMIN, "admin")
+    main.alta_usuario(*CAJERO, "cajero")
+    if not servidor.escritor.is_alive():
+        servidor.escritor.start()
+    servicio = ThreadingHTTPServer(("127.0.0.1", 0), servidor.Manejador)
+    servicio.daemon_threads = True
+    threading.Thread(target=servicio.serve_forever, args=(0.05,), daemon=True).start()
+    yield servicio.server_address[1]
+    servicio.shutdown()
+    servicio.server_close()
+
+
+def pedir(puerto, metodo, ruta, datos=None, usuario=ADMIN, cuerpo=None):
+    cabeceras = {}
+    if usuario:
+        credencial = base64.b64encode(":".join(usuario).encode("utf-8")).decode("ascii")
+        cabeceras["Authorization"] = f"Basic {credencial}"
+    if datos is not None:
+        cuerpo = json.dumps(datos)
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=10)
+    conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+    respuesta = conexion.getresponse()
+    resultado = respuesta.status, json.loads(respuesta.read() or b"null"), respuesta.getheader("WWW-Authenticate")
+    conexion.close()
+    return resultado
+
+
+def test_sin_credenciales_validas_responde_401(puerto):
+    estado, _, desafio = pedir(puerto, "GET", "/productos", usuario=None)
+    assert estado == 401 and desafio.startswith("Basic")
+    assert pedir(puerto, "GET", "/productos", usuario=("ana", "otra"))[0] == 401
+    assert pedir(puerto, "GET", "/productos")[0] == 200
+
+
+def test_las_rutas_de_admin_responden_403_a_un_cajero(puerto):
+    producto = main.alta_producto("Yerba", 100, 10)
+    assert pedir(puerto, "DELETE", f"/productos/{producto['id']}", usuario=CAJERO)[0] == 403
+    assert pedir(puerto, "GET", "/metricas", usuario=CAJERO)[0] == 403
+    assert pedir(puerto, "POST", "/productos/deshacer", usuario=CAJERO)[0] == 403
+    assert pedir(puerto, "DELETE", f"/productos/{producto['id']}")[0] == 200
+    assert main.buscar_producto(producto["id"]) is None
+
+
+def test_el_admin_con_la_contrasena_inicial_no_puede_usar_el_servicio(puerto):
+    main.alta_usuario("admin", main.PASSWORD_INICIAL, "admin")
+    assert pedir(puerto, "GET", "/productos", usuario=("admin", main.PASSWORD_INICIAL))[0] == 403
+
+
+def test_alta_venta_y_reporte(puerto):
+    estado, yerba, _ = pedir(puerto, "POST", "/productos", {"nombre": "Yerba", "precio": 100, "stock": 10,
+                                                              "codigos": ["7790001000019"]})
+    assert estado == 201
+    estado, venta, _ = pedir(puerto, "POST", "/ventas", {"items": [{"codigo": "7790001000019", "cantidad": 2},
+                                                                   {"nombre": "yerba", "cantidad": 1}]},
+                             usuario=CAJERO)
+    assert estado == 201 and venta["total"] == 300.0
+    assert pedir(puerto, "GET", f"/productos/{yerba['id']}")[1]["stock"] == 7
+    assert pedir(puerto, "GET", "/reportes/general")[1]["total"] == 300.0
+    assert pedir(puerto, "POST", "/ventas", {"items": [{"id": yerba["id"], "cantidad": 8}]})[0] == 400
+
+
+def test_pedidos_mal_formados_responden_400(puerto):
+    main.alta_producto("Yerba", 100, 10)
+    assert pedir(puerto, "POST", "/ventas", {"items": "yerba"})[0] == 400
+    assert pedir(puerto, "POST", "/productos", cuerpo="[1, 2]")[0] == 400
+    estado, error, _ = pedir(puerto, "POST", "/productos/lote", {"movimientos": [{"id": 1, "stock": "mucho"}]})
+    assert estado == 400 and error["error"].startswith("Movimiento 1")
+    estado, error, _ = pedir(puerto, "POST", "/productos/lote", cuerpo='{"movimientos": [{"id": 1, "porcentaje": NaN}]}')
+    assert estado == 400 and "porcentaje" in error["error"]
+    assert main.buscar_producto(1)["precio"] == 100.0
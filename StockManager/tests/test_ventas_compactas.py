@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+import main
+import ventas_compactas
+
+RUIDO = 0.1 + 0.2  # 0.30000000000000004
+
+VENTAS = [
+    {"fecha": "2030-01-02 10:00:00", "items": [{"nombre": "Yerba", "cantidad": 1, "subtotal": 100.0},
+                                               {"nombre": "Sal", "cantidad": 2, "subtotal": 20.5}],
+     "total": 120.5, "cliente": "Ana", "proxima_visita": "2030-02-01"},
+    {"fecha": "2030-01-01 09:00:00", "items": [{"nombre": "Yerba", "cantidad": 3, "subtotal": 300.0}], "total": 300.0},
+    {"fecha": "2030-01-03 18:30:00", "items": [{"nombre": "Sal", "cantidad": 1, "subtotal": 10.25}], "total": 10.25},
+]
+
+
+@pytest.fixture
+def almacen():
+    return "json"  # con SQLite las ventas no se cargan en memoria
+
+
+def test_se_usa_como_la_lista_de_diccionarios():
+    ventas = ventas_compactas.Ventas(VENTAS)
+    assert len(ventas) == 3 and list(ventas) == VENTAS
+    assert ventas[-1] == VENTAS[-1] and ventas[1:] == VENTAS[1:]
+    assert "cliente" not in ventas[1]  # un campo que la venta no tenía no aparece
+    with pytest.raises(IndexError):
+        ventas[3]
+    assert ventas._textos == ["Yerba", "Sal", "Ana", "2030-02-01"]  # cada nombre una sola vez
+
+
+def test_los_datos_que_no_van_en_columnas_se_conservan():
+    venta = {"fecha": "2030-01-01 10:00:00", "items": [{"nombre": "Yerba", "cantidad": 1, "subtotal": 100.0,
+                                                        "costo": 60.0}], "total": 100.0, "nota": "fiado"}
+    assert list(ventas_compactas.Ventas([venta])) == [venta]
+
+
+def test_rangos_de_fechas_y_totales_sin_armar_las_ventas():
+    ventas = ventas_compactas.Ventas(VENTAS)
+    ventas.sort()
+    assert [v["fecha"][:10] for v in ventas] == ["2030-01-01", "2030-01-02", "2030-01-03"]
+    assert ventas.entre("2030-01-02", "2030-01-03") == (1, 3)
+    assert ventas.entre("2030-02-01", "2030-02-28") == (3, 3)
+    assert ventas.posicion("2030-01-02 10:00:00") == 1
+    assert ventas.posicion("2030-01-02 10:00:01") == 2
+    assert ventas.total_centavos() == 43075 and ventas.total_centavos(1, 2) == 12050
+
+
+def test_montos_sin_centavos_justos_se_redondean_y_se_cuentan():
+    venta = {"fecha": "2030-01-01 10:00:00", "items": [{"nombre": "Yerba", "cantidad": 1, "subtotal": 0.1},
+                                                       {"nombre": "Sal", "cantidad": 1, "subtotal": 0.2}],
+             "total": RUIDO}
+    ventas = ventas_compactas.Ventas(VENTAS + [venta])
+    assert ventas.redondeadas == 1
+    assert ventas[-1]["total"] == 0.3
+
+
+def test_las_fechas_se_normalizan_o_no_se_cargan():
+    ventas = ventas_compactas.Ventas()
+    ventas.append({"fecha": "2030-01-01T09:00:00", "items": [], "total": 0.0})
+    ventas.append({"fecha": "2030-01-02", "items": [], "total": 0.0})
+    assert [v["fecha"] for v in ventas] == ["2030-01-01 09:00:00", "2030-01-02 00:00:00"]
+    with pytest.raises(ValueError, match="no válida"):
+        ventas.append({"fecha": "ayer", "items": [{"nombre": "Yerba", "cantidad": 1, "subtotal": 1.0}], "total": 1.0})
+    assert len(ventas) == 2 and ventas.total_centavos() == 0
+
+
+def test_el_estado_guardado_reconstruye_las_mismas_ventas():
+    ventas = ventas_compactas.Ventas(VENTAS)
+    estado = ventas.estado()
+    assert list(ventas_compactas.Ventas.desde_estado(estado)) == VENTAS
+    estado["formato"] = [ventas_compactas.FORMATO + 1, estado["formato"][1]]
+    with pytest.raises(ValueError, match="Formato"):
+        ventas_compactas.Ventas.desde_estado(estado)
+
+
+def test_el_diario_se_reescribe_con_los_montos_redondeados(datos, capsys):
+    venta = {"fecha": "2030-01-01 10:00:00", "items": [{"nombre": "Yerba", "cantidad": 1, "subtotal": RUIDO}],
+             "total": RUIDO}
+    with open(main.VENTAS_FILE, "w", encoding="utf-8") as f:
+        f.write(json.dumps(venta) + "\n")
+    main.cargar_ventas()
+    assert "redondeados" in capsys.readouterr().out
+    with open(main.VENTAS_FILE, encoding="utf-8") as f:
+        assert json.loads(f.readline())["total"] == 0.3
+    assert main.ventas.redondeadas == 0
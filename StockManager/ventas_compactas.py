@@ -0,0 +1,216 @@
+"""
+Almacenamiento compacto de las ventas en memoria.
+
+Con millones de líneas de venta, un diccionario por venta y otro por ítem (cada uno
+con su propia copia del nombre del producto y sus floats) ocupa gigabytes. `Ventas`
+guarda lo mismo en columnas de `array`: la fecha como entero AAAAMMDDhhmmss, los
+montos en centavos enteros, y el producto, el cliente y la próxima visita como
+códigos de una tabla de textos donde cada nombre se guarda una sola vez.
+Los montos que no venían en centavos justos se redondean con dinero.centavos() y
+se cuentan en `redondeadas`, para que el diario se pueda reescribir ya corregido;
+el total de esas ventas se vuelve a sumar de los subtotales ya redondeados.
+Una fecha ISO con otro formato se normaliza; una que no es fecha no se carga (ValueError).
+
+Se usa como la lista de antes: `ventas[i]`, los recortes y la iteración arman al
+vuelo el diccionario de siempre ({"fecha", "items", "total", ...}), y append, extend
+y sort reciben diccionarios, así que leer y escribir el diario JSON no cambia.
+"""
+
+import bisect
+import datetime
+from array import array
+
+import dinero
+
+CAMPOS = ("fecha", "items", "total", "cliente", "proxima_visita")
+CAMPOS_ITEM = ("nombre", "cantidad", "subtotal")
+FORMATO = 2  # versión de estado()/desde_estado(); cambiarla invalida las copias guardadas
+AUSENTE = -1  # código de un campo que la venta no tenía (las ventas viejas no guardan cliente)
+
+_SEPARADORES = str.maketrans("", "", "- :")
+
+def fecha_a_numero(fecha):
+    """'2025-05-18 01:17:34' -> 20250518011734, o None si no tiene ese formato."""
+    if isinstance(fecha, str) and len(fecha) == 19 and fecha[4] == fecha[7] == "-" and fecha[10] == " " and fecha[13] == fecha[16] == ":":
+        digitos = fecha.translate(_SEPARADORES)
+        if len(digitos) == 14 and digitos.isdigit():
+            return int(digitos)
+    return None
+
+def fecha_normalizada(fecha):
+    """Número AAAAMMDDhhmmss de una fecha ISO con otro formato ('2025-05-18T01:17:34', sin hora, ...).
+
+    ValueError si no es una fecha: guardarla como 0 rompería el orden que usan entre() y posicion().
+    """
+    try:
+        momento = datetime.datetime.fromisoformat(fecha)
+    except (TypeError, ValueError):
+        raise ValueError(f"Fecha de venta no válida ({fecha!r}).") from None
+    return int(momento.strftime("%Y%m%d%H%M%S"))
+
+def numero_a_fecha(numero):
+    s = str(numero)
+    return f"{s[0:4]}-{s[4:6]}-{s[6:8]} {s[8:10]}:{s[10:12]}:{s[12:14]}"
+
+
+class Ventas:
+    """Secuencia de ventas guardada por columnas (ver el docstring del módulo)."""
+
+    _COLUMNAS = ("_fecha", "_total", "_cliente", "_visita", "_inicio", "_producto", "_cantidad", "_subtotal")
+    __slots__ = _COLUMNAS + ("_textos", "_codigos", "_extras", "_extras_items", "redondeadas")
+
+    def __init__(self, ventas=()):
+        self._fecha = array("q")      # AAAAMMDDhhmmss de cada venta
+        self._total = array("q")      # centavos
+        self._cliente = array("l")    # código en _textos o AUSENTE
+        self._visita = array("l")
+        self._inicio = array("q", [0])  # la venta i tiene los ítems _inicio[i]:_inicio[i + 1]
+        self._producto = array("l")   # por ítem: código del nombre en _textos
+        self._cantidad = array("q")
+        self._subtotal = array("q")   # centavos
+        self._textos = []             # código -> texto (nombres, clientes, fechas de visita)
+        self._codigos = {}            # texto -> código
+        self._extras = {}             # índice -> datos que no entran en las columnas (raros)
+        self._extras_items = {}       # índice de ítem -> datos del ítem que no entran en las columnas
+        self.redondeadas = 0          # ventas con algún monto que no estaba en centavos justos
+        self.extend(ventas)
+
+    # --- carga ---
+
+    def _codigo(self, texto):
+        codigo = self._codigos.get(texto)
+        if codigo is None:
+            codigo = self._codigos[texto] = len(self._textos)
+            self._textos.append(texto)
+        return codigo
+
+    def append(self, venta):
+        """Agrega una venta; ValueError si su fecha no se puede leer (no se agrega nada)."""
+        indice = len(self._fecha)
+        numero = fecha_a_numero(venta["fecha"])
+        if numero is None:
+            numero = fecha_normalizada(venta["fecha"])
+        redondeada = False
+        total = round(venta["total"] * 100)
+        if total / 100 != venta["total"]:
+            total, redondeada = dinero.centavos(venta["total"]), True
+        filas = []
+        for item in venta["items"]:
+            centavos = round(item["subtotal"] * 100)
+            if centavos / 100 != item["subtotal"]:
+                centavos, redondeada = dinero.centavos(item["subtotal"]), True
+            filas.append((item["nombre"], item["cantidad"], centavos,
+                          {k: v for k, v in item.items() if k not in CAMPOS_ITEM} if len(item) > 3 else None))
+        if redondeada:
+            # Redondeando el total aparte puede quedar un centavo distinto de la suma de los
+            # subtotales: si la venta cuadraba antes de redondear, el total sale de esa suma
+            suma = sum(fila[2] for fila in filas)
+            if abs(total - suma) <= len(filas):
+                total = suma
+        # La venta se agrega recién acá, ya validada, y la fecha al final: hasta entonces
+        # len() no la cuenta y nadie lee columnas a medio llenar
+        codigos, producto, cantidad, subtotal = self._codigos, self._producto, self._cantidad, self._subtotal
+        for nombre, unidades, centavos, extras in filas:
+            if extras:
+                self._extras_items[len(producto)] = extras
+            codigo = codigos.get(nombre)
+            producto.append(codigo if codigo is not None else self._codigo(nombre))
+            cantidad.append(unidades)
+            subtotal.append(centavos)
+        self.redondeadas += redondeada
+        self._total.append(total)
+        self._cliente.append(self._codigo(venta["cliente"]) if "cliente" in venta else AUSENTE)
+        self._visita.append(self._codigo(venta["proxima_visita"]) if "proxima_visita" in venta else AUSENTE)
+        if len(venta) > 3 + ("cliente" in venta) + ("proxima_visita" in venta):
+            self._extras[indice] = {k: v for k, v in venta.items() if k not in CAMPOS}
+        self._inicio.append(len(producto))
+        self._fecha.append(numero)
+
+    def extend(self, ventas):
+        for venta in ventas:
+            self.append(venta)
+
+    def sort(self, key=None):
+        """Reordena (por fecha si no se da `key`, como el diario); el orden entre iguales se mantiene."""
+        ventas = list(self)
+        ventas.sort(key=key or (lambda v: v["fecha"]))
+        self.__init__(ventas)
+
+    def estado(self):
+        """Columnas como bytes y tablas como listas y diccionarios, para guardar con marshal."""
+        return {"formato": [FORMATO, array("l").itemsize],
+                "columnas": {nombre: getattr(self, nombre).tobytes() for nombre in self._COLUMNAS},
+                "textos": self._textos, "extras": self._extras, "extras_items": self._extras_items}
+
+    @classmethod
+    def desde_estado(cls, estado):
+        """Ventas armadas con lo que devolvió estado(); ValueError si es de otro formato."""
+        if estado.get("formato") != [FORMATO, array("l").itemsize]:
+            raise ValueError("Formato de ventas guardado distinto.")
+        ventas = cls()
+        for nombre in cls._COLUMNAS:
+            columna = getattr(ventas, nombre)
+            del columna[:]
+            columna.frombytes(estado["columnas"][nombre])
+        ventas._textos = list(estado["textos"])
+        ventas._codigos = {texto: codigo for codigo, texto in enumerate(ventas._textos)}
+        ventas._extras = dict(estado["extras"])
+        ventas._extras_items = dict(estado["extras_items"])
+        return ventas
+
+    # --- lectura ---
+
+    def __len__(self):
+        return len(self._fecha)
+
+    def _venta(self, i):
+        textos, producto, cantidad, subtotal = self._textos, self._producto, self._cantidad, self._subtotal
+        items = [{"nombre": textos[producto[j]], "cantidad": cantidad[j], "subtotal": subtotal[j] / 100}
+                 for j in range(self._inicio[i], self._inicio[i + 1])]
+        if self._extras_items:
+            for j, item in enumerate(items, self._inicio[i]):
+                item.update(self._extras_items.get(j, ()))
+        venta = {"fecha": numero_a_fecha(self._fecha[i]), "items": items, "total": self._total[i] / 100}
+        if self._cliente[i] != AUSENTE:
+            venta["cliente"] = textos[self._cliente[i]]
+        if self._visita[i] != AUSENTE:
+            venta["proxima_visita"] = textos[self._visita[i]]
+        if self._extras:
+            venta.update(self._extras.get(i, ()))
+        return venta
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self._venta(i) for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("venta fuera de rango")
+        return self._venta(indice)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._venta(i)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def entre(self, fecha_inicio, fecha_fin):
+        """Posiciones (desde, hasta) de las ventas entre dos días 'YYYY-MM-DD' inclusive; las ventas deben estar en orden."""
+        inicio = int(fecha_inicio.replace("-", "")) * 1000000
+        fin = int(fecha_fin.replace("-", "")) * 1000000 + 999999
+        return bisect.bisect_left(self._fecha, inicio), bisect.bisect_right(self._fecha, fin)
+
+    def posicion(self, momento):
+        """Posición de la primera venta con fecha >= `momento` ('YYYY-MM-DD hh:mm:ss')."""
+        return bisect.bisect_left(self._fecha, fecha_a_numero(momento))
+
+    def total_centavos(self, desde=0, hasta=None):
+        """Suma exacta de los totales de las ventas desde:hasta, sin armar ninguna venta."""
+        return sum(self._total[desde:hasta])
+
+    def bytes_usados(self):
+        """Memoria aproximada de las columnas y la tabla de textos."""
+        columnas = [getattr(self, nombre) for nombre in self._COLUMNAS]
+        return (sum(c.itemsize * len(c) for c in columnas)
+                + sum(len(t.encode("utf-8")) + 49 for t in self._textos) + 8 * len(self._textos))